@@ -0,0 +1,107 @@
+import threading
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from users_app.models import K9User
+from .models import GoogleScope, GrantedScope, OAuthClient
+
+# Both tables hold a handful of rows that practically never change, so their
+# rows/ids are kept per process instead of being joined on every read.
+_clients = {}
+_scope_ids = {}
+_lock = threading.Lock()
+
+
+def get_oauth_client(client_id, client_secret, token_uri):
+    """Returns the shared OAuthClient row for these client settings, creating or updating it once.
+
+    Args:
+        client_id (str): The Google OAuth client id.
+        client_secret (str): Its secret.
+        token_uri (str): Google's token endpoint used to refresh tokens.
+
+    Returns:
+        OAuthClient: The (cached) row.
+    """
+    key = (client_id, client_secret, token_uri)
+    client = _clients.get(key)
+    if client is None:
+        client, _ = OAuthClient.objects.update_or_create(
+            client_id=client_id,
+            defaults={'client_secret': client_secret, 'token_uri': token_uri},
+        )
+        # Only once the row is committed: a rolled-back transaction must not leave a
+        # cached client whose row doesn't exist.
+        transaction.on_commit(lambda: _remember_client(key, client))
+    return client
+
+
+def _remember_client(key, client):
+    with _lock:
+        _clients[key] = client
+
+
+def get_client_by_id(pk):
+    """Returns an OAuthClient by primary key from the per-process cache (a query on first use)."""
+    for client in list(_clients.values()):
+        if client.pk == pk:
+            return client
+    client = OAuthClient.objects.get(pk=pk)
+    _remember_client((client.client_id, client.client_secret, client.token_uri), client)
+    return client
+
+
+def scope_ids(uris):
+    """Maps scope URIs to GoogleScope ids, registering unknown scopes.
+
+    Returns:
+        dict[str, int]: uri -> GoogleScope id.
+    """
+    uris = set(uris)
+    missing = uris - _scope_ids.keys()
+    ids = {uri: _scope_ids[uri] for uri in uris - missing}
+    if missing:
+        GoogleScope.objects.bulk_create([GoogleScope(uri=uri) for uri in missing], ignore_conflicts=True)
+        found = dict(GoogleScope.objects.filter(uri__in=missing).values_list('uri', 'id'))
+        ids.update(found)
+        # Cached once committed, like the clients above.
+        transaction.on_commit(lambda: _remember_scope_ids(found))
+    return ids
+
+
+def _remember_scope_ids(found):
+    with _lock:
+        _scope_ids.update(found)
+
+
+def set_granted_scopes(credentials_obj, uris):
+    """Makes `uris` the exact set of scopes granted by `credentials_obj` (two queries)."""
+    ids = scope_ids(uris).values()
+    GrantedScope.objects.filter(credentials=credentials_obj).exclude(scope_id__in=ids).delete()
+    GrantedScope.objects.bulk_create(
+        [GrantedScope(credentials=credentials_obj, scope_id=scope_id) for scope_id in ids],
+        ignore_conflicts=True,
+    )
+
+
+def get_granted_scopes(credentials_obj):
+    """Returns the scope URIs granted by `credentials_obj`."""
+    return list(GrantedScope.objects.filter(credentials=credentials_obj).values_list('scope__uri', flat=True))
+
+
+def users_with_scope(uri):
+    """Users who granted `uri`: an index range scan on GrantedScope (scope, credentials)."""
+    return K9User.objects.filter(google_credentials__scope_grants__scope__uri=uri)
+
+
+def clear_caches():
+    with _lock:
+        _clients.clear()
+        _scope_ids.clear()
+
+
+@receiver([post_save, post_delete], sender=OAuthClient)
+@receiver([post_save, post_delete], sender=GoogleScope)
+def _clear_on_change(sender, **kwargs):
+    # Covers edits in the admin and test databases being flushed and recreated.
+    clear_caches()
@@ -0,0 +1,222 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import timezone
+from typing import NamedTuple
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone as django_timezone
+from google.auth.exceptions import RefreshError
+from google.oauth2.credentials import Credentials
+from .clients import get_client_by_id, set_granted_scopes
+from .models import GoogleCredentials
+from .transport import GoogleAuthRequest
+import logging
+logger = logging.getLogger(__name__)
+
+
+class CachedToken(NamedTuple):
+    token: str
+    expires_at: object  # aware datetime
+
+
+class TokenCache:
+    """Thread-safe LRU cache of CachedToken entries that drops entries once they're due for refresh."""
+
+    def __init__(self, maxsize, refresh_margin):
+        self.maxsize = maxsize
+        self.refresh_margin = refresh_margin
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def is_fresh(self, entry, now=None):
+        return entry.expires_at - self.refresh_margin > (now or django_timezone.now())
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if not self.is_fresh(entry):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def refresh_credentials(credentials_obj, request=None, token_uri=None):
+    """Refreshes a GoogleCredentials row's access token with Google, in place.
+
+    Only the model attributes that actually changed are updated; the caller
+    persists them with `save(update_fields=...)` (or `bulk_update`). If Google
+    reports a different set of granted scopes, the grants are rewritten here.
+
+    Args:
+        credentials_obj (GoogleCredentials): The stored credentials to refresh.
+        request (google.auth.transport.Request, optional): Transport to use.
+            Defaults to the shared pooled transport.
+        token_uri (str, optional): Token endpoint to use instead of the client's
+            (e.g. a local fake).
+
+    Returns:
+        list[str]: Names of the fields that changed.
+
+    Raises:
+        google.auth.exceptions.RefreshError: If there's no refresh token or Google
+            rejects it (e.g. the user revoked access).
+    """
+    if not credentials_obj.refresh_token:
+        raise RefreshError(f"No refresh token stored for user {credentials_obj.user_id}")
+    # The shared client row comes from a per-process cache, not a join per credentials row.
+    client = get_client_by_id(credentials_obj.oauth_client_id)
+    # Uses the prefetched grants when the caller loaded them with prefetch_related('granted_scopes').
+    scopes = [scope.uri for scope in credentials_obj.granted_scopes.all()]
+    g_creds = Credentials(
+        token=credentials_obj.access_token,
+        refresh_token=credentials_obj.refresh_token,
+        token_uri=token_uri or client.token_uri,
+        client_id=client.client_id,
+        client_secret=client.client_secret,
+        scopes=scopes or None,
+    )
+    g_creds.refresh(request or GoogleAuthRequest())
+
+    updates = {
+        'access_token': g_creds.token,
+        # google-auth reports expiry as a naive UTC datetime.
+        'expires_at': g_creds.expiry.replace(tzinfo=timezone.utc),
+    }
+    # Google may rotate the refresh token or narrow the granted scopes.
+    if g_creds.refresh_token:
+        updates['refresh_token'] = g_creds.refresh_token
+    if g_creds.granted_scopes and set(g_creds.granted_scopes) != set(scopes):
+        set_granted_scopes(credentials_obj, g_creds.granted_scopes)
+
+    changed = [field for field, value in updates.items() if getattr(credentials_obj, field) != value]
+    for field in changed:
+        setattr(credentials_obj, field, updates[field])
+    return changed
+
+
+class CredentialsManager:
+    """
+    Hands out valid Google access tokens per user, refreshing them ahead of expiry.
+
+    Tokens are kept in an in-process LRU cache until `REFRESH_MARGIN` before they
+    expire, so the common case costs no DB query and no Google round-trip.
+    Concurrent misses for the same user are collapsed into a single DB read and
+    at most one refresh call (single-flight); the other callers wait for its result.
+
+    A load only caches what it read if no invalidation happened meanwhile (a global
+    generation counter, so an unrelated user's change costs at most an extra miss);
+    otherwise a callback storing new tokens mid-load would be overwritten in the
+    cache by the older row.
+    """
+
+    def __init__(self, maxsize=None, refresh_margin=None):
+        config = settings.GOOGLE_CREDENTIALS_CACHE
+        self.cache = TokenCache(
+            maxsize=maxsize or config['MAXSIZE'],
+            refresh_margin=refresh_margin or config['REFRESH_MARGIN'],
+        )
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        self._generation = 0
+        self._generation_lock = threading.Lock()
+
+    def get_access_token(self, user):
+        """Returns a currently valid access token for `user` (a K9User or its id).
+
+        Raises:
+            GoogleCredentials.DoesNotExist: If the user hasn't linked a Google account.
+            google.auth.exceptions.RefreshError: If the token had to be refreshed and
+                Google refused.
+        """
+        user_id = getattr(user, 'pk', user)
+        entry = self.cache.get(user_id)
+        if entry is None:
+            entry = self._single_flight(user_id)
+        return entry.token
+
+    def invalidate(self, user_id):
+        with self._generation_lock:
+            self._generation += 1
+            self.cache.delete(user_id)
+
+    def _single_flight(self, user_id):
+        with self._inflight_lock:
+            future = self._inflight.get(user_id)
+            leader = future is None
+            if leader:
+                future = self._inflight[user_id] = Future()
+        if not leader:
+            return future.result()
+        try:
+            entry = self._load(user_id)
+            future.set_result(entry)
+            return entry
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                del self._inflight[user_id]
+
+    def _load(self, user_id):
+        generation = self._generation
+        credentials_obj = GoogleCredentials.objects.get(user_id=user_id)
+        entry = CachedToken(credentials_obj.access_token, credentials_obj.expires_at)
+        if not self.cache.is_fresh(entry):
+            changed = refresh_credentials(credentials_obj)
+            if changed:
+                credentials_obj.save(update_fields=changed)
+            logger.info("Refreshed Google access token for user %s", user_id)
+            entry = CachedToken(credentials_obj.access_token, credentials_obj.expires_at)
+            # The row now holds this token; only invalidations after the save (its own
+            # included, unless it's deferred to an outer commit) make it stale.
+            generation = self._generation
+        with self._generation_lock:
+            if self._generation == generation:
+                self.cache.set(user_id, entry)
+        return entry
+
+
+credentials_manager = CredentialsManager()
+
+
+def get_access_token(user):
+    """Shortcut for `credentials_manager.get_access_token(user)`."""
+    return credentials_manager.get_access_token(user)
+
+
+@receiver([post_save, post_delete], sender=GoogleCredentials)
+def _invalidate_cached_token(sender, instance, **kwargs):
+    # Covers re-linking via the OAuth callback, refreshes done elsewhere and unlinking.
+    # After commit: evicting earlier lets a concurrent load re-cache the pre-commit row.
+    user_id = instance.user_id
+    transaction.on_commit(lambda: credentials_manager.invalidate(user_id))
+
+
+@receiver(setting_changed)
+def _reset_credentials_cache(sender, setting, **kwargs):
+    if setting == 'GOOGLE_CREDENTIALS_CACHE':
+        global credentials_manager
+        credentials_manager = CredentialsManager()
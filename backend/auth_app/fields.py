@@ -0,0 +1,99 @@
+import base64
+import threading
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import models, transaction
+from django.dispatch import receiver
+
+# Every Fernet token starts with this (version byte 0x80, base64-encoded).
+FERNET_PREFIX = 'gAAAAA'
+
+_cipher = None
+_cipher_lock = threading.Lock()
+
+
+def derive_key(secret):
+    """Turns a configured secret of any length into a Fernet key (HKDF-SHA256)."""
+    key = HKDF(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=b'k9.field-encryption',
+        info=b'fernet',
+    ).derive(secret.encode())
+    return base64.urlsafe_b64encode(key)
+
+
+def get_cipher():
+    """
+    Returns the process-wide MultiFernet for `settings.FIELD_ENCRYPTION_KEYS`.
+
+    Keys are derived once per process, not per field access. The first key encrypts;
+    every key can decrypt, so a new key can be put in front while rows written with the
+    old ones stay readable until `reencrypt_google_credentials` rewrites them.
+    """
+    global _cipher
+    if _cipher is None:
+        with _cipher_lock:
+            if _cipher is None:
+                _cipher = MultiFernet([Fernet(derive_key(secret)) for secret in settings.FIELD_ENCRYPTION_KEYS])
+    return _cipher
+
+
+@receiver(setting_changed)
+def _reset_cipher(sender, setting, **kwargs):
+    global _cipher
+    if setting in ('FIELD_ENCRYPTION_KEYS', 'SECRET_KEY'):
+        _cipher = None
+
+
+class EncryptedTextField(models.TextField):
+    """
+    A TextField stored encrypted with Fernet (AES-128-CBC + HMAC-SHA256).
+
+    None and '' are stored as-is, so `isnull` and `=''` lookups still work. Any other
+    lookup can't match, since every encryption uses a fresh IV. Values that aren't
+    Fernet tokens are returned unchanged: those are plaintext rows written before the
+    field was encrypted, and they get encrypted on their next save.
+    """
+
+    def get_prep_value(self, value):
+        value = super().get_prep_value(value)
+        if value is None or value == '':
+            return value
+        return get_cipher().encrypt(value.encode()).decode()
+
+    def from_db_value(self, value, expression, connection):
+        if value is None or value == '' or not value.startswith(FERNET_PREFIX):
+            return value
+        try:
+            return get_cipher().decrypt(value.encode()).decode()
+        except InvalidToken:
+            # Neither a current key nor a legacy plaintext value: refuse to guess.
+            raise ValueError(f"Can't decrypt {self.model.__name__}.{self.name}; is the key in FIELD_ENCRYPTION_KEYS?")
+
+
+def reencrypt(model, field_names, batch_size=500):
+    """Rewrites `field_names` of every `model` row with the current primary key.
+
+    Walks the table in primary key order, `batch_size` rows at a time (never holding
+    more than one batch in memory), and saves each batch with one bulk_update in its
+    own transaction. Rows still encrypted with an older key, or not encrypted at all,
+    come out encrypted with FIELD_ENCRYPTION_KEYS[0].
+
+    Yields:
+        int: The number of rows rewritten by each batch.
+    """
+    queryset = model._base_manager.order_by('pk').only('pk', *field_names)
+    last_pk = None
+    while True:
+        page = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        with transaction.atomic():
+            batch = list(page[:batch_size])
+            if not batch:
+                return
+            model._base_manager.bulk_update(batch, field_names)
+        last_pk = batch[-1].pk
+        yield len(batch)
@@ -0,0 +1,104 @@
+import os
+import statistics
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+from backend import loadtest
+from auth_app.state import SignedStateStore
+from auth_app.stubs import FakeGoogleServer
+from users_app.models import K9User
+
+BENCH_DOMAIN = 'bench-db.k9.invalid'
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive parallel signups and Google OAuth callbacks (both write to the DB) against the "
+        "database profile selected by DATABASE_ENGINE, e.g. compare `SQLITE_WAL=False`, the "
+        "default SQLite WAL profile and `DATABASE_ENGINE=postgres [DB_POOL=True]`."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=400, help="Total requests, half signups and half callbacks.")
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument(
+            '--real-hashing', action='store_true',
+            help="Hash signup passwords with the configured hasher instead of a fast one (measures CPU, not the DB).",
+        )
+
+    @loadtest.throwaway_database()
+    def handle(self, *args, **options):
+        os.environ.setdefault('OAUTHLIB_INSECURE_TRANSPORT', '1')
+        # Lets the in-process test clients through ALLOWED_HOSTS.
+        setup_test_environment()
+        database = settings.DATABASES['default']
+        self.stdout.write(
+            f"profile: {database['ENGINE'].rsplit('.', 1)[-1]}, CONN_MAX_AGE={database.get('CONN_MAX_AGE')}, "
+            f"OPTIONS={database.get('OPTIONS', {})}"
+        )
+        overrides = {'GOOGLE_OAUTH_STATE': {**settings.GOOGLE_OAUTH_STATE, 'BACKEND': 'signed'}}
+        if not options['real_hashing']:
+            overrides['PASSWORD_HASHERS'] = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+        callbacks = options['requests'] // 2
+        users = K9User.objects.bulk_create(
+            K9User(username=f'cb{i}@{BENCH_DOMAIN}', email=f'cb{i}@{BENCH_DOMAIN}', first_name='Bench', last_name='Db')
+            for i in range(callbacks)
+        )
+        tasks = []
+        for i, user in enumerate(users):
+            tasks.append(('callback', {
+                'auth': f'Bearer {RefreshToken.for_user(user).access_token}',
+                'state': SignedStateStore().issue(SimpleNamespace(user=user)),
+            }))
+            tasks.append(('signup', {'email': f'su{i}@{BENCH_DOMAIN}'}))
+
+        try:
+            with FakeGoogleServer() as server:
+                with override_settings(GOOGLE_OAUTH2_TOKEN_URI=server.token_uri, **overrides):
+                    started = time.perf_counter()
+                    with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+                        results = list(pool.map(self.call, tasks))
+                    elapsed = time.perf_counter() - started
+        finally:
+            teardown_test_environment()
+
+        self.stdout.write(f"total: {len(results) / elapsed:,.1f} req/s")
+        by_kind = defaultdict(list)
+        for kind, latency, status_code in results:
+            by_kind[kind].append((latency, status_code))
+        for kind, rows in sorted(by_kind.items()):
+            latencies = sorted(latency for latency, _ in rows)
+            errors = sum(1 for _, status_code in rows if status_code >= 400)
+            p99 = latencies[max(int(len(latencies) * 0.99) - 1, 0)]
+            self.stdout.write(
+                f"{kind}: p50 {statistics.median(latencies) * 1000:.1f} ms, p99 {p99 * 1000:.1f} ms, "
+                f"{errors}/{len(rows)} errors"
+            )
+
+    def call(self, task):
+        kind, data = task
+        started = time.perf_counter()
+        try:
+            if kind == 'signup':
+                response = Client().post(reverse('sign_up'), {
+                    'email': data['email'], 'password': 'Bench-Passw0rd!', 'password2': 'Bench-Passw0rd!',
+                    'first_name': 'Bench', 'last_name': 'Db',
+                }, content_type='application/json')
+            else:
+                response = Client().post(
+                    reverse('google_callback'), {'code': 'fake-code', 'state': data['state']},
+                    content_type='application/json', HTTP_AUTHORIZATION=data['auth'],
+                )
+            return kind, time.perf_counter() - started, response.status_code
+        finally:
+            # Worker threads don't go through request_finished for their own connection lifetime.
+            connections.close_all()
@@ -0,0 +1,34 @@
+import time
+from django.core.management.base import BaseCommand
+from google_auth_oauthlib.flow import Flow
+from auth_app.views import get_google_flow
+from auth_app.oauth import get_flow_template
+
+
+def uncached_flow():
+    """The pre-cache construction path: rebuild the client config and Flow from settings."""
+    template = get_flow_template()
+    return Flow.from_client_config(
+        client_config={"web": dict(template.client_config["web"])},
+        scopes=list(template.scopes),
+        redirect_uri=template.redirect_uri,
+    )
+
+
+class Command(BaseCommand):
+    help = "Microbenchmark Google OAuth Flow construction: cached template vs. rebuilding per request."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20000)
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        for label, factory in (('uncached', uncached_flow), ('cached', get_google_flow)):
+            factory()  # warm up imports / template
+            started = time.perf_counter()
+            for _ in range(iterations):
+                factory()
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{label:>9}: {iterations / elapsed:,.0f} flows/s ({elapsed / iterations * 1e6:.1f} us per flow)"
+            )
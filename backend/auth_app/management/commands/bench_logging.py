@@ -0,0 +1,101 @@
+import logging
+import os
+import statistics
+import tempfile
+import time
+from types import SimpleNamespace
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+from auth_app.state import SignedStateStore
+from auth_app.stubs import FakeGoogleServer
+from backend import loadtest
+from backend.log import QueueJSONHandler
+from users_app.models import K9User
+
+BENCH_EMAIL = 'bench-logging@k9.invalid'
+
+
+class SlowStream:
+    """File wrapper whose writes block for `latency` seconds."""
+
+    def __init__(self, stream, latency):
+        self.stream = stream
+        self.latency = latency
+
+    def write(self, text):
+        if self.latency:
+            time.sleep(self.latency)
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare Google OAuth callback latency with logging off, a synchronous StreamHandler "
+        "and the queued JSON handler (both writing to a temporary file)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument(
+            '--sink-latency', type=float, default=0.0,
+            help="Seconds each log write blocks for, e.g. 0.002 to mimic a stalled stdout pipe or collector.",
+        )
+
+    @loadtest.throwaway_database()
+    def handle(self, *args, **options):
+        os.environ.setdefault('OAUTHLIB_INSECURE_TRANSPORT', '1')
+        # Lets the in-process test client through ALLOWED_HOSTS.
+        setup_test_environment()
+        user = K9User.objects.create(
+            email=BENCH_EMAIL, username=BENCH_EMAIL, first_name='Bench', last_name='Logging',
+        )
+        client = Client(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+        body = {'code': 'fake-code', 'state': SignedStateStore().issue(SimpleNamespace(user=user))}
+        state_settings = {**settings.GOOGLE_OAUTH_STATE, 'BACKEND': 'signed'}
+        # The loggers a callback writes to (views, the request logger on errors, and the root).
+        loggers = [logging.getLogger(), logging.getLogger('auth_app'), logging.getLogger('django.request')]
+        saved = [(logger, logger.handlers[:], logger.level) for logger in loggers]
+        try:
+            with tempfile.NamedTemporaryFile('w', suffix='.log') as log_file, FakeGoogleServer() as server:
+                with override_settings(GOOGLE_OAUTH2_TOKEN_URI=server.token_uri, GOOGLE_OAUTH_STATE=state_settings):
+                    for mode in ('off', 'sync', 'queued'):
+                        handler = self.make_handler(mode, SlowStream(log_file, options['sink_latency']))
+                        for logger in loggers:
+                            logger.handlers = [handler] if handler else []
+                            logger.setLevel(logging.INFO)
+                        logging.disable(logging.CRITICAL if mode == 'off' else logging.NOTSET)
+                        latencies = []
+                        for _ in range(options['requests']):
+                            started = time.perf_counter()
+                            response = client.post(reverse('google_callback'), body, content_type='application/json')
+                            latencies.append(time.perf_counter() - started)
+                            assert response.status_code == 200, response.content
+                        if handler:
+                            handler.close()
+                        latencies.sort()
+                        self.stdout.write(
+                            f"{mode}: p50 {statistics.median(latencies) * 1000:.2f} ms, "
+                            f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.2f} ms"
+                        )
+        finally:
+            logging.disable(logging.NOTSET)
+            for logger, handlers, level in saved:
+                logger.handlers = handlers
+                logger.setLevel(level)
+            teardown_test_environment()
+
+    def make_handler(self, mode, log_file):
+        if mode == 'off':
+            return None
+        if mode == 'sync':
+            handler = logging.StreamHandler(log_file)
+            handler.setFormatter(logging.Formatter('{levelname} {asctime} {module} {message}', style='{'))
+            return handler
+        return QueueJSONHandler(stream=log_file)
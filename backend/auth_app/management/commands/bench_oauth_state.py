@@ -0,0 +1,71 @@
+import os
+import time
+from urllib.parse import parse_qs, urlsplit
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+from backend import loadtest
+from auth_app.state import STATE_STORES
+from auth_app.stubs import FakeGoogleServer
+from users_app.models import K9User
+
+BENCH_EMAIL = 'bench-state@k9.invalid'
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the Google OAuth redirect + callback pair with each OAuth state backend "
+        "(signed, cache, session) against a fake token server: callback req/s and DB queries."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=300)
+        parser.add_argument('--backends', nargs='+', choices=sorted(STATE_STORES), default=sorted(STATE_STORES))
+
+    @loadtest.throwaway_database()
+    def handle(self, *args, **options):
+        os.environ.setdefault('OAUTHLIB_INSECURE_TRANSPORT', '1')
+        # Lets the in-process test client through ALLOWED_HOSTS.
+        setup_test_environment()
+        user = K9User.objects.create(
+            email=BENCH_EMAIL, username=BENCH_EMAIL, first_name='Bench', last_name='State',
+        )
+        auth_header = f'Bearer {RefreshToken.for_user(user).access_token}'
+        try:
+            with FakeGoogleServer() as server:
+                for backend in options['backends']:
+                    state_settings = {**settings.GOOGLE_OAUTH_STATE, 'BACKEND': backend}
+                    with override_settings(GOOGLE_OAUTH2_TOKEN_URI=server.token_uri, GOOGLE_OAUTH_STATE=state_settings):
+                        self.run_backend(backend, auth_header, options['requests'])
+        finally:
+            teardown_test_environment()
+
+    def run_backend(self, backend, auth_header, requests):
+        # One client per backend so the session backend keeps its cookie across the pair.
+        client = Client(HTTP_AUTHORIZATION=auth_header)
+        redirect_queries = callback_queries = 0
+        callback_time = 0.0
+        for _ in range(requests):
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get(reverse('google_redirect'))
+            redirect_queries += len(queries)
+            state = parse_qs(urlsplit(response.json()['authorization_url']).query)['state'][0]
+
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = client.post(
+                    reverse('google_callback'), {'code': 'fake-code', 'state': state},
+                    content_type='application/json',
+                )
+                callback_time += time.perf_counter() - started
+            callback_queries += len(queries)
+            if response.status_code != 200:
+                raise CommandError(f"{backend}: callback returned {response.status_code}: {response.content[:200]}")
+        self.stdout.write(
+            f"{backend}: callback {requests / callback_time:,.0f} req/s, "
+            f"{redirect_queries / requests:.1f} queries/redirect, {callback_queries / requests:.1f} queries/callback"
+        )
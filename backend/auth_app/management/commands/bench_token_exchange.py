@@ -0,0 +1,53 @@
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from google_auth_oauthlib.flow import Flow
+from auth_app.oauth import get_flow_template
+from auth_app.stubs import FakeGoogleServer
+from auth_app.transport import get_timeout, reset_transport
+from auth_app.views import get_google_flow
+
+
+def unpooled_flow():
+    """The pre-pooling path: a brand new session (and TCP connection) per exchange."""
+    template = get_flow_template()
+    return Flow.from_client_config(template.client_config, scopes=list(template.scopes), redirect_uri=template.redirect_uri)
+
+
+class Command(BaseCommand):
+    help = "Benchmark Google token exchanges against a local stand-in token endpoint, with and without pooling."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--latency', type=float, default=0.0, help="Artificial server latency in seconds.")
+
+    def handle(self, *args, **options):
+        # The stub speaks plain HTTP; oauthlib refuses that unless explicitly allowed.
+        os.environ.setdefault('OAUTHLIB_INSECURE_TRANSPORT', '1')
+        with FakeGoogleServer(latency=options['latency']) as server:
+            with override_settings(GOOGLE_OAUTH2_TOKEN_URI=server.token_uri):
+                for label, factory in (('unpooled', unpooled_flow), ('pooled', get_google_flow)):
+                    server.connections.clear()
+                    self.run(label, factory, server, options)
+        reset_transport()
+
+    def run(self, label, factory, server, options):
+        def exchange(_):
+            started = time.perf_counter()
+            factory().fetch_token(code='fake-code', timeout=get_timeout())
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            latencies = sorted(pool.map(exchange, range(options['requests'])))
+        elapsed = time.perf_counter() - started
+        p99 = latencies[int(len(latencies) * 0.99) - 1]
+        self.stdout.write(
+            f"{label:>9}: {len(latencies) / elapsed:,.0f} req/s, "
+            f"p50 {statistics.median(latencies) * 1000:.2f} ms, p99 {p99 * 1000:.2f} ms, "
+            f"{len(server.connections)} TCP connections"
+        )
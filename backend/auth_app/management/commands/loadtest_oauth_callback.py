@@ -0,0 +1,103 @@
+import asyncio
+import os
+import statistics
+import time
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import AsyncClient, Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+from backend import loadtest
+from auth_app.state import SignedStateStore
+from auth_app.stubs import FakeGoogleServer
+from users_app.models import K9User
+
+LOADTEST_EMAIL = 'loadtest@k9.invalid'
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test the Google OAuth callback against a fake token server: the sync view on a "
+        "fixed pool of WSGI worker threads vs. the async view on a single ASGI event loop."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=50, help="In-flight requests.")
+        parser.add_argument('--wsgi-workers', type=int, default=4, help="Threads serving the sync view.")
+        parser.add_argument('--latency', type=float, default=0.2, help="Fake Google token latency in seconds.")
+
+    @loadtest.throwaway_database()
+    def handle(self, *args, **options):
+        os.environ.setdefault('OAUTHLIB_INSECURE_TRANSPORT', '1')
+        # Lets the in-process test clients through ALLOWED_HOSTS.
+        setup_test_environment()
+        user = K9User.objects.create(
+            email=LOADTEST_EMAIL, username=LOADTEST_EMAIL, first_name='Load', last_name='Test',
+        )
+        self.auth_header = f'Bearer {RefreshToken.for_user(user).access_token}'
+        # One valid signed state is enough: the signed store doesn't consume it.
+        self.state = SignedStateStore().issue(SimpleNamespace(user=user))
+        state_settings = {**settings.GOOGLE_OAUTH_STATE, 'BACKEND': 'signed'}
+        try:
+            with FakeGoogleServer(latency=options['latency']) as server:
+                with override_settings(GOOGLE_OAUTH2_TOKEN_URI=server.token_uri, GOOGLE_OAUTH_STATE=state_settings):
+                    self.report('wsgi', self.run_wsgi(options))
+                    self.report('asgi', asyncio.run(self.run_asgi(options)))
+        finally:
+            teardown_test_environment()
+
+    def run_wsgi(self, options):
+        url = reverse('google_callback')
+        workers = min(options['wsgi_workers'], options['concurrency'])
+
+        def call(_):
+            started = time.perf_counter()
+            response = Client().post(
+                url, {'code': 'fake-code', 'state': self.state},
+                content_type='application/json', HTTP_AUTHORIZATION=self.auth_header,
+            )
+            return time.perf_counter() - started, response.status_code
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(call, range(options['requests'])))
+            elapsed = time.perf_counter() - started
+            loadtest.close_worker_connections(pool, workers)
+        return results, elapsed
+
+    async def run_asgi(self, options):
+        url = reverse('google_callback_async')
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(options['concurrency'])
+
+        async def call():
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post(
+                    url, {'code': 'fake-code', 'state': self.state},
+                    content_type='application/json', headers={'Authorization': self.auth_header},
+                )
+                return time.perf_counter() - started, response.status_code
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(call() for _ in range(options['requests'])))
+        elapsed = time.perf_counter() - started
+        # The ORM ran on sync_to_async's shared thread; its connection would outlive the run.
+        await sync_to_async(connections.close_all)()
+        return results, elapsed
+
+    def report(self, label, result):
+        results, elapsed = result
+        latencies = sorted(latency for latency, _ in results)
+        errors = sum(1 for _, status_code in results if status_code != 200)
+        p99 = latencies[max(int(len(latencies) * 0.99) - 1, 0)]
+        self.stdout.write(
+            f"{label}: {len(latencies) / elapsed:,.1f} req/s, "
+            f"p50 {statistics.median(latencies) * 1000:.1f} ms, p99 {p99 * 1000:.1f} ms, {errors} errors"
+        )
@@ -0,0 +1,33 @@
+import time
+from django.core.management.base import BaseCommand
+from auth_app.fields import reencrypt
+from auth_app.models import GoogleCredentials, OAuthClient
+
+# Encrypted fields per model.
+SECRET_FIELDS = {
+    OAuthClient: ['client_secret'],
+    GoogleCredentials: ['access_token', 'refresh_token'],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-encrypt every GoogleCredentials/OAuthClient secret with the first FIELD_ENCRYPTION_KEYS key, "
+        "in streamed batches. Run after prepending a new key; old keys can be removed afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        total = 0
+        started = time.perf_counter()
+        for model, fields in SECRET_FIELDS.items():
+            for count in reencrypt(model, fields, options['batch_size']):
+                total += count
+                if options['verbosity'] > 1:
+                    self.stdout.write(f"{total} rows...")
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Re-encrypted {total} rows in {elapsed:.2f}s ({total / elapsed if elapsed else 0:,.0f} rows/s)"
+        ))
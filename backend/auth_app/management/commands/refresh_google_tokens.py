@@ -0,0 +1,78 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+from auth_app.credentials import refresh_credentials
+from auth_app.models import GoogleCredentials
+from backend.loadtest import close_worker_connections
+import logging
+logger = logging.getLogger(__name__)
+
+REFRESH_FIELDS = ['access_token', 'expires_at', 'refresh_token']
+
+
+class Command(BaseCommand):
+    help = "Refresh Google access tokens that expire soon, in indexed batches with a bounded pool of workers."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--within', type=int, default=15, help="Refresh tokens expiring within this many minutes.")
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--workers', type=int, default=8, help="Concurrent refresh calls to Google.")
+        parser.add_argument('--token-uri', help="Send refreshes to this token endpoint instead of each row's token_uri (e.g. a local fake).")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() + timedelta(minutes=options['within'])
+        candidates = (
+            GoogleCredentials.objects
+            .filter(expires_at__lte=cutoff)
+            .exclude(refresh_token__isnull=True).exclude(refresh_token='')
+            .order_by('expires_at', 'id')
+            .prefetch_related('granted_scopes')
+        )
+        refreshed = failed = scanned = 0
+        started = time.perf_counter()
+        last = None
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            while True:
+                batch = candidates
+                if last is not None:
+                    # Keyset pagination over the (expires_at, id) index: no OFFSET scans, and rows
+                    # pushed past the cutoff by this run's own updates can't shift later pages.
+                    batch = batch.filter(Q(expires_at__gt=last[0]) | Q(expires_at=last[0], id__gt=last[1]))
+                batch = list(batch[:options['batch_size']])
+                if not batch:
+                    break
+                last = (batch[-1].expires_at, batch[-1].id)
+                scanned += len(batch)
+
+                updated = []
+                for credentials_obj, error in pool.map(lambda obj: self.refresh(obj, options['token_uri']), batch):
+                    if error is None:
+                        updated.append(credentials_obj)
+                    else:
+                        failed += 1
+                        logger.warning("Failed to refresh Google token for user %s: %s", credentials_obj.user_id, error)
+                if updated:
+                    # bulk_update sends no post_save, which is fine: evicting here would only reach
+                    # this process's token cache. Servers keep their cached tokens, which Google
+                    # accepts until they expire, and drop them REFRESH_MARGIN before that, re-reading
+                    # these rows.
+                    GoogleCredentials.objects.bulk_update(updated, REFRESH_FIELDS)
+                refreshed += len(updated)
+            # Refreshes can query (client rows, scope changes) on the workers' own connections.
+            close_worker_connections(pool, options['workers'])
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"Scanned {scanned} credentials, refreshed {refreshed}, failed {failed} "
+            f"in {elapsed:.2f}s ({refreshed / elapsed if elapsed else 0:,.1f} refreshes/s)"
+        )
+
+    def refresh(self, credentials_obj, token_uri=None):
+        try:
+            refresh_credentials(credentials_obj, token_uri=token_uri)
+            return credentials_obj, None
+        except Exception as e:
+            return credentials_obj, e
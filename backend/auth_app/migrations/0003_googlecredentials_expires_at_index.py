@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:06
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_app', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='googlecredentials',
+            index=models.Index(fields=['expires_at', 'id'], name='googlecreds_expires_at_idx'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:23
+
+import auth_app.fields
+from django.db import migrations
+from django.db.models import Value
+
+SECRET_FIELDS = ['access_token', 'refresh_token', 'client_secret']
+
+
+def encrypt_existing(apps, schema_editor):
+    GoogleCredentials = apps.get_model('auth_app', 'GoogleCredentials')
+    for _ in auth_app.fields.reencrypt(GoogleCredentials, SECRET_FIELDS):
+        pass
+
+
+def decrypt_existing(apps, schema_editor):
+    # Value() bypasses the field's encryption, so the plaintext is written as-is.
+    GoogleCredentials = apps.get_model('auth_app', 'GoogleCredentials')
+    for credentials in GoogleCredentials.objects.only('pk', *SECRET_FIELDS).iterator():
+        GoogleCredentials.objects.filter(pk=credentials.pk).update(**{
+            name: Value(getattr(credentials, name)) for name in SECRET_FIELDS
+        })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_app', '0003_googlecredentials_expires_at_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='googlecredentials',
+            name='access_token',
+            field=auth_app.fields.EncryptedTextField(),
+        ),
+        migrations.AlterField(
+            model_name='googlecredentials',
+            name='client_secret',
+            field=auth_app.fields.EncryptedTextField(),
+        ),
+        migrations.AlterField(
+            model_name='googlecredentials',
+            name='refresh_token',
+            field=auth_app.fields.EncryptedTextField(blank=True, null=True),
+        ),
+        migrations.RunPython(encrypt_existing, decrypt_existing),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:25
+
+import auth_app.fields
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_app', '0004_encrypt_google_credentials'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GoogleScope',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('uri', models.CharField(max_length=255, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='OAuthClient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('client_id', models.CharField(max_length=255, unique=True)),
+                ('client_secret', auth_app.fields.EncryptedTextField()),
+                ('token_uri', models.CharField(max_length=255)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='GrantedScope',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('credentials', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scope_grants', to='auth_app.googlecredentials')),
+                ('scope', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='grants', to='auth_app.googlescope')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='googlecredentials',
+            name='granted_scopes',
+            field=models.ManyToManyField(related_name='credentials', through='auth_app.GrantedScope', to='auth_app.googlescope'),
+        ),
+        migrations.AddField(
+            model_name='googlecredentials',
+            name='oauth_client',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='credentials', to='auth_app.oauthclient'),
+        ),
+        migrations.AddConstraint(
+            model_name='grantedscope',
+            constraint=models.UniqueConstraint(fields=('scope', 'credentials'), name='grantedscope_scope_credentials_uniq'),
+        ),
+    ]
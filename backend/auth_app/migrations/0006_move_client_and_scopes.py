@@ -0,0 +1,73 @@
+from django.db import migrations, transaction
+
+BATCH_SIZE = 2000
+
+
+def batches(queryset):
+    """Yields lists of at most BATCH_SIZE rows in primary key order, one query per batch."""
+    last_pk = 0
+    while True:
+        batch = list(queryset.filter(pk__gt=last_pk).order_by('pk')[:BATCH_SIZE])
+        if not batch:
+            return
+        yield batch
+        last_pk = batch[-1].pk
+
+
+def forwards(apps, schema_editor):
+    GoogleCredentials = apps.get_model('auth_app', 'GoogleCredentials')
+    OAuthClient = apps.get_model('auth_app', 'OAuthClient')
+    GoogleScope = apps.get_model('auth_app', 'GoogleScope')
+    GrantedScope = apps.get_model('auth_app', 'GrantedScope')
+    clients, scopes = {}, {}
+    rows = GoogleCredentials.objects.only('pk', 'client_id', 'client_secret', 'token_uri', 'scopes')
+    for batch in batches(rows):
+        # Each batch commits on its own, so a large table never holds one long write lock.
+        with transaction.atomic():
+            for credentials in batch:
+                if credentials.client_id not in clients:
+                    clients[credentials.client_id], _ = OAuthClient.objects.get_or_create(
+                        client_id=credentials.client_id,
+                        defaults={'client_secret': credentials.client_secret, 'token_uri': credentials.token_uri},
+                    )
+                credentials.oauth_client = clients[credentials.client_id]
+            GoogleCredentials.objects.bulk_update(batch, ['oauth_client'])
+
+            grants = []
+            for credentials in batch:
+                for uri in set(credentials.scopes.split()):
+                    if uri not in scopes:
+                        scopes[uri], _ = GoogleScope.objects.get_or_create(uri=uri)
+                    grants.append(GrantedScope(credentials_id=credentials.pk, scope=scopes[uri]))
+            GrantedScope.objects.bulk_create(grants, ignore_conflicts=True)
+
+
+def backwards(apps, schema_editor):
+    GoogleCredentials = apps.get_model('auth_app', 'GoogleCredentials')
+    GrantedScope = apps.get_model('auth_app', 'GrantedScope')
+    rows = GoogleCredentials.objects.select_related('oauth_client')
+    for batch in batches(rows):
+        with transaction.atomic():
+            granted = {}
+            for credentials_id, uri in GrantedScope.objects.filter(credentials__in=batch).values_list('credentials_id', 'scope__uri'):
+                granted.setdefault(credentials_id, []).append(uri)
+            for credentials in batch:
+                client = credentials.oauth_client
+                credentials.client_id = client.client_id if client else ''
+                credentials.client_secret = client.client_secret if client else ''
+                credentials.token_uri = client.token_uri if client else ''
+                credentials.scopes = " ".join(sorted(granted.get(credentials.pk, [])))
+            GoogleCredentials.objects.bulk_update(batch, ['client_id', 'client_secret', 'token_uri', 'scopes'])
+
+
+class Migration(migrations.Migration):
+    # Batches commit separately (see forwards); the schema steps are in 0005 and 0007.
+    atomic = False
+
+    dependencies = [
+        ('auth_app', '0005_oauthclient_googlescope'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
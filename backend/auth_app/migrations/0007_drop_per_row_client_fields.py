@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:31
+
+import auth_app.fields
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth_app', '0006_move_client_and_scopes'),
+    ]
+
+    operations = [
+        # Defaults first, so unapplying this migration can re-add the columns to existing
+        # rows; 0006's backwards step then fills them in from the shared tables.
+        migrations.AlterField(
+            model_name='googlecredentials',
+            name='client_id',
+            field=models.CharField(default='', max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='googlecredentials',
+            name='client_secret',
+            field=auth_app.fields.EncryptedTextField(default=''),
+        ),
+        migrations.AlterField(
+            model_name='googlecredentials',
+            name='scopes',
+            field=models.TextField(default=''),
+        ),
+        migrations.AlterField(
+            model_name='googlecredentials',
+            name='token_uri',
+            field=models.CharField(default='', max_length=255),
+        ),
+        migrations.RemoveField(
+            model_name='googlecredentials',
+            name='client_id',
+        ),
+        migrations.RemoveField(
+            model_name='googlecredentials',
+            name='client_secret',
+        ),
+        migrations.RemoveField(
+            model_name='googlecredentials',
+            name='scopes',
+        ),
+        migrations.RemoveField(
+            model_name='googlecredentials',
+            name='token_uri',
+        ),
+        migrations.AlterField(
+            model_name='googlecredentials',
+            name='oauth_client',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='credentials', to='auth_app.oauthclient'),
+        ),
+    ]
@@ -1,16 +1,54 @@
 from django.db import models
 from users_app.models import K9User
+from .fields import EncryptedTextField
 
 # Create your models here.
+class OAuthClient(models.Model):
+    """The app's OAuth client as registered with Google; shared by every user's credentials."""
+    client_id = models.CharField(max_length=255, unique=True)
+    client_secret = EncryptedTextField()
+    token_uri = models.CharField(max_length=255)
+
+    def __str__(self):
+        return self.client_id
+
+
+class GoogleScope(models.Model):
+    """One Google API scope URI. Grants point here instead of repeating the URI per user."""
+    uri = models.CharField(max_length=255, unique=True)
+
+    def __str__(self):
+        return self.uri
+
+
 class GoogleCredentials(models.Model):
     user = models.OneToOneField(K9User, on_delete=models.CASCADE, related_name='google_credentials')
-    access_token = models.CharField(max_length=255)
-    refresh_token = models.CharField(max_length=255, null=True, blank=True)  # Refresh tokens are crucial
+    # Secrets are encrypted at rest (see auth_app.fields); they can't be used in filters.
+    access_token = EncryptedTextField()
+    refresh_token = EncryptedTextField(null=True, blank=True)  # Refresh tokens are crucial
     expires_at = models.DateTimeField() # Store expiry time
-    token_uri = models.CharField(max_length=255)
-    client_id = models.CharField(max_length=255)
-    client_secret = models.CharField(max_length=255)
-    scopes = models.TextField() # Store the scopes granted
+    # The client id/secret and token URI are the same for every user, so they live in one shared row.
+    oauth_client = models.ForeignKey(OAuthClient, on_delete=models.PROTECT, related_name='credentials')
+    # Store the scopes granted, as narrow (credentials, scope) rows (see auth_app.clients.set_granted_scopes)
+    granted_scopes = models.ManyToManyField(GoogleScope, through='GrantedScope', related_name='credentials')
+
+    class Meta:
+        indexes = [
+            # Lets the background refresher walk soon-to-expire rows in (expires_at, id) order.
+            models.Index(fields=['expires_at', 'id'], name='googlecreds_expires_at_idx'),
+        ]
 
     def __str__(self):
-        return f"Google credentials for {self.user.get_full_name()}"
\ No newline at end of file
+        return f"Google credentials for {self.user.get_full_name()}"
+
+
+class GrantedScope(models.Model):
+    """A scope a user granted; one narrow row per (credentials, scope) pair."""
+    credentials = models.ForeignKey(GoogleCredentials, on_delete=models.CASCADE, related_name='scope_grants')
+    scope = models.ForeignKey(GoogleScope, on_delete=models.CASCADE, related_name='grants')
+
+    class Meta:
+        constraints = [
+            # Scope first, so "which users granted scope X" is a range scan of this index.
+            models.UniqueConstraint(fields=['scope', 'credentials'], name='grantedscope_scope_credentials_uniq'),
+        ]
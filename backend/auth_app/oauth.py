@@ -0,0 +1,114 @@
+import threading
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from oauthlib.oauth2 import WebApplicationClient
+from requests_oauthlib import OAuth2Session
+from google_auth_oauthlib.flow import Flow
+from .transport import mount_pooled_adapter
+
+# Settings that feed into the cached client config. A change to any of them
+# (e.g. via override_settings in tests) drops every cached template.
+OAUTH_SETTINGS = frozenset({
+    'GOOGLE_OAUTH2_CLIENT_ID',
+    'GOOGLE_OAUTH2_CLIENT_SECRET',
+    'GOOGLE_OAUTH2_REDIRECT_URI',
+    'GOOGLE_CALENDAR_SCOPES',
+    'GOOGLE_OAUTH2_TOKEN_URI',
+    'GOOGLE_HTTP',
+})
+
+
+class FlowTemplate:
+    """Immutable, process-wide description of a Google OAuth Flow for one scope set.
+
+    Parsing settings, validating the client config and constructing the
+    OAuth2Session (a requests.Session with its adapters and connection pools)
+    happens once, when the template is built. `build()` then clones the session
+    and only replaces the pieces that carry per-request state (the oauthlib
+    client holding the token and PKCE verifier, headers, cookies, hooks), so it
+    is cheap to call on every request. Adapters are shared between clones, so
+    every Flow uses the pooled transport; urllib3 connection pools are
+    thread-safe.
+    """
+
+    def __init__(self, scopes):
+        self.scopes = tuple(scopes)
+        self.redirect_uri = settings.GOOGLE_OAUTH2_REDIRECT_URI
+        self.client_id = settings.GOOGLE_OAUTH2_CLIENT_ID
+        # Same layout as a client secrets file downloaded from Google Cloud Console.
+        # Shared by every Flow built from this template, so it must not be mutated.
+        self.client_config = {
+            "web": {
+                "client_id": self.client_id,
+                "client_secret": settings.GOOGLE_OAUTH2_CLIENT_SECRET,
+                # Where the user is sent to log in and grant consent.
+                "auth_uri": "https://accounts.google.com/o/oauth2/auth",
+                # Where the authorization code is exchanged for access/refresh tokens.
+                "token_uri": settings.GOOGLE_OAUTH2_TOKEN_URI,
+                # Must be pre-registered in the Google Cloud Console project settings.
+                "redirect_uris": [self.redirect_uri],
+                "javascript_origins": ["http://127.0.0.1:5173"],
+            }
+        }
+        # Token exchanges go through the shared keep-alive pool (see auth_app.transport).
+        self._session = mount_pooled_adapter(OAuth2Session(
+            client_id=self.client_id,
+            scope=list(self.scopes),
+            redirect_uri=self.redirect_uri,
+        ))
+
+    def _clone_session(self):
+        # requests.Session pickles only a subset of its attributes, so copy.copy()
+        # would drop the OAuth2Session ones; clone the instance dict directly.
+        session = object.__new__(type(self._session))
+        session.__dict__.update(self._session.__dict__)
+        session._client = WebApplicationClient(self.client_id)
+        session.headers = self._session.headers.copy()
+        session.cookies = self._session.cookies.copy()
+        session.hooks = {event: list(hooks) for event, hooks in self._session.hooks.items()}
+        session.compliance_hook = {name: set(hooks) for name, hooks in self._session.compliance_hook.items()}
+        session.auto_refresh_kwargs = {}
+        session.adapters = self._session.adapters.copy()
+        return session
+
+    def build(self):
+        """Returns a fresh Flow sharing this template's (read-only) client config."""
+        return Flow(self._clone_session(), "web", self.client_config, redirect_uri=self.redirect_uri)
+
+
+_templates = {}
+_templates_lock = threading.Lock()
+
+
+def get_flow_template(scopes=None):
+    """Returns the cached FlowTemplate for `scopes`, building it on first use.
+
+    Args:
+        scopes (list[str], optional): The Google API scopes to request. Defaults
+            to `settings.GOOGLE_CALENDAR_SCOPES`.
+
+    Returns:
+        FlowTemplate: The shared template for this scope set.
+    """
+    key = tuple(settings.GOOGLE_CALENDAR_SCOPES if scopes is None else scopes)
+    template = _templates.get(key)
+    if template is None:
+        with _templates_lock:
+            # Re-check under the lock so concurrent first requests build it once.
+            template = _templates.get(key)
+            if template is None:
+                template = _templates[key] = FlowTemplate(key)
+    return template
+
+
+def clear_flow_templates():
+    """Drops every cached FlowTemplate so the next request re-reads settings."""
+    with _templates_lock:
+        _templates.clear()
+
+
+@receiver(setting_changed)
+def _reset_flow_templates(sender, setting, **kwargs):
+    if setting in OAUTH_SETTINGS:
+        clear_flow_templates()
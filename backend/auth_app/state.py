@@ -0,0 +1,144 @@
+import secrets
+from abc import ABC, abstractmethod
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+import logging
+logger = logging.getLogger(__name__)
+
+SESSION_KEY = 'google_oauth_state'
+SIGNING_SALT = 'auth_app.oauth_state'
+
+
+class OAuthStateStore(ABC):
+    """
+    Issues the OAuth `state` value for a redirect and checks it on the callback.
+
+    `issue` returns the value to pass as `state` to Flow.authorization_url; `verify`
+    returns whether the value posted back to the callback belongs to the same user and
+    is still valid. The async variants default to the sync ones for stores that never
+    touch I/O.
+    """
+
+    @abstractmethod
+    def issue(self, request):
+        pass
+
+    @abstractmethod
+    def verify(self, request, state):
+        pass
+
+    async def aissue(self, request):
+        return self.issue(request)
+
+    async def averify(self, request, state):
+        return self.verify(request, state)
+
+
+class SignedStateStore(OAuthStateStore):
+    """
+    Stateless: the state is an HMAC-signed (SECRET_KEY), timestamped token naming the user.
+
+    Nothing is stored, so redirect and callback cost no DB or cache round trip. A token
+    can be replayed until it expires, but only by the same user, and Google accepts each
+    authorization code once anyway.
+    """
+
+    def issue(self, request):
+        # The nonce keeps two states issued for the same user in the same second distinct.
+        return signing.dumps({'u': request.user.pk, 'n': secrets.token_urlsafe(8)}, salt=SIGNING_SALT)
+
+    def verify(self, request, state):
+        try:
+            payload = signing.loads(state, salt=SIGNING_SALT, max_age=settings.GOOGLE_OAUTH_STATE['MAX_AGE'])
+        except signing.BadSignature:
+            # Also covers SignatureExpired.
+            return False
+        return payload.get('u') == request.user.pk
+
+
+class CacheStateStore(OAuthStateStore):
+    """
+    A random state remembered in a Django cache for MAX_AGE seconds, and usable once.
+
+    Needs a cache shared by every worker (e.g. Redis/Memcached) when running more than
+    one process; the default LocMemCache only works with a single process.
+    """
+
+    def _cache(self):
+        return caches[settings.GOOGLE_OAUTH_STATE['CACHE_ALIAS']]
+
+    def _key(self, state):
+        return f'oauth_state:{state}'
+
+    def issue(self, request):
+        state = secrets.token_urlsafe(32)
+        self._cache().set(self._key(state), request.user.pk, settings.GOOGLE_OAUTH_STATE['MAX_AGE'])
+        return state
+
+    def verify(self, request, state):
+        cache, key = self._cache(), self._key(state)
+        user_id = cache.get(key)
+        cache.delete(key)
+        return user_id is not None and user_id == request.user.pk
+
+    async def aissue(self, request):
+        state = secrets.token_urlsafe(32)
+        await self._cache().aset(self._key(state), request.user.pk, settings.GOOGLE_OAUTH_STATE['MAX_AGE'])
+        return state
+
+    async def averify(self, request, state):
+        cache, key = self._cache(), self._key(state)
+        user_id = await cache.aget(key)
+        await cache.adelete(key)
+        return user_id is not None and user_id == request.user.pk
+
+
+class SessionStateStore(OAuthStateStore):
+    """
+    The original behaviour: the state lives in the Django session (SESSION_ENGINE).
+
+    With the DB session engine this costs a session INSERT/UPDATE on the redirect and a
+    read plus write on the callback. A mismatch is only logged, because the SPA's
+    callback request may not carry the session cookie.
+    """
+
+    def issue(self, request):
+        state = secrets.token_urlsafe(32)
+        if not request.session.session_key:
+            request.session.create()
+        request.session[SESSION_KEY] = state
+        request.session.save()
+        return state
+
+    def verify(self, request, state):
+        session_state = request.session.pop(SESSION_KEY, None)
+        if session_state != state:
+            logger.warning("OAuth state mismatch for user %s", request.user.pk)
+        return True
+
+    async def aissue(self, request):
+        state = secrets.token_urlsafe(32)
+        if not request.session.session_key:
+            await request.session.acreate()
+        await request.session.aset(SESSION_KEY, state)
+        await request.session.asave()
+        return state
+
+    async def averify(self, request, state):
+        session_state = await request.session.apop(SESSION_KEY, None)
+        if session_state != state:
+            logger.warning("OAuth state mismatch for user %s", request.user.pk)
+        return True
+
+
+STATE_STORES = {
+    'signed': SignedStateStore(),
+    'cache': CacheStateStore(),
+    'session': SessionStateStore(),
+}
+
+
+def get_state_store():
+    """Returns the OAuthStateStore selected by `GOOGLE_OAUTH_STATE['BACKEND']`."""
+    return STATE_STORES[settings.GOOGLE_OAUTH_STATE['BACKEND']]
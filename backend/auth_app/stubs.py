@@ -0,0 +1,88 @@
+"""Local stand-ins for Google endpoints, used by the benchmark management commands.
+
+Nothing here is imported by the request path. Point the app at a stub with
+e.g. `override_settings(GOOGLE_OAUTH2_TOKEN_URI=server.token_uri)`.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeGoogleHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep connections alive between requests.
+    protocol_version = 'HTTP/1.1'
+    # Buffer each response into a single write; separate header/body segments
+    # interact badly with Nagle + delayed ACKs on reused connections.
+    wbufsize = 64 * 1024
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length)
+
+    def send_json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.read_body()
+        self.server.record_request(self)
+        if self.path.startswith('/token'):
+            time.sleep(self.server.latency)
+            return self.send_json({
+                'access_token': f'ya29.fake-{time.monotonic_ns()}',
+                'refresh_token': 'fake-refresh-token',
+                'expires_in': 3599,
+                'scope': 'https://www.googleapis.com/auth/calendar',
+                'token_type': 'Bearer',
+            })
+        self.send_json({'error': 'not_found'}, status=404)
+
+
+class FakeGoogleServer(ThreadingHTTPServer):
+    """Threaded HTTP server impersonating Google's OAuth endpoints on 127.0.0.1.
+
+    Args:
+        latency (float): Seconds each token response is delayed by, to mimic
+            the round-trip to Google.
+    """
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, latency=0.0, handler_class=FakeGoogleHandler):
+        super().__init__(('127.0.0.1', 0), handler_class)
+        self.latency = latency
+        self.requests = 0
+        self.connections = set()
+        self._stats_lock = threading.Lock()
+        self._thread = None
+
+    def record_request(self, handler):
+        with self._stats_lock:
+            self.requests += 1
+            self.connections.add(handler.client_address)
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def token_uri(self):
+        return f'{self.base_url}/token'
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
@@ -1,3 +1,439 @@
-from django.test import TestCase
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import Value
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+from backend.log import REDACTED, JSONFormatter
+from users_app.models import K9User
+from . import credentials
+from .clients import clear_caches, get_granted_scopes, get_oauth_client, set_granted_scopes, users_with_scope
+from .fields import FERNET_PREFIX
+from .models import GoogleCredentials, OAuthClient
+from .stubs import FakeGoogleServer
+from .state import CacheStateStore, OAuthStateStore, SessionStateStore, SignedStateStore
 
-# Create your tests here.
+
+def state_settings(**overrides):
+    return override_settings(GOOGLE_OAUTH_STATE={**settings.GOOGLE_OAUTH_STATE, **overrides})
+
+
+def migrate_to(*targets):
+    """Migrates the test database to `targets` and returns the app registry at that state."""
+    executor = MigrationExecutor(connection)
+    executor.migrate(list(targets))
+    executor.loader.build_graph()
+    return executor.loader.project_state(list(targets)).apps
+
+
+def stored_value(model, field, pk):
+    """Returns a column's value as stored, bypassing the field's decryption."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT {field} FROM {model._meta.db_table} WHERE id = %s', [pk])
+        return cursor.fetchone()[0]
+
+
+def as_user(pk):
+    return SimpleNamespace(user=SimpleNamespace(pk=pk))
+
+
+class JSONFormatterRedactionTests(SimpleTestCase):
+    def format(self, **extra):
+        record = logging.LogRecord('auth_app.views', logging.INFO, __file__, 1, 'Callback received', (), None)
+        record.__dict__.update(extra)
+        return json.loads(JSONFormatter().format(record))
+
+    def test_secret_fields_are_redacted(self):
+        secrets = ['access_token', 'refresh_token', 'client_secret', 'password', 'Authorization', 'session_id',
+                   'code', 'state', 'oauth_state']
+        entry = self.format(**{key: 'value' for key in secrets})
+        self.assertEqual({key: entry[key] for key in secrets}, dict.fromkeys(secrets, REDACTED))
+
+    def test_fields_merely_containing_a_secret_word_are_kept(self):
+        entry = self.format(status_code=400, state_changed=True, zip_code='12345', tokenizer='word')
+        self.assertEqual(
+            [entry[key] for key in ('status_code', 'state_changed', 'zip_code', 'tokenizer')],
+            [400, True, '12345', 'word'],
+        )
+
+
+class StateStoreTests(SimpleTestCase):
+    def test_base_class_is_abstract(self):
+        with self.assertRaises(TypeError):
+            OAuthStateStore()
+
+    def test_signed_state(self):
+        store = SignedStateStore()
+        state = store.issue(as_user(1))
+        self.assertNotEqual(state, store.issue(as_user(1)))
+        self.assertTrue(store.verify(as_user(1), state))
+        # Not single use: replays by the same user pass until the state expires.
+        self.assertTrue(store.verify(as_user(1), state))
+        self.assertFalse(store.verify(as_user(2), state))
+        tampered = state[:-1] + ('A' if state[-1] != 'A' else 'B')
+        self.assertFalse(store.verify(as_user(1), tampered))
+        later = time.time() + settings.GOOGLE_OAUTH_STATE['MAX_AGE'] + 1
+        with mock.patch('django.core.signing.time.time', return_value=later):
+            self.assertFalse(store.verify(as_user(1), state))
+
+    def test_cache_state_is_single_use(self):
+        store = CacheStateStore()
+        state = store.issue(as_user(1))
+        self.assertTrue(store.verify(as_user(1), state))
+        self.assertFalse(store.verify(as_user(1), state))
+        self.assertFalse(store.verify(as_user(1), 'never-issued'))
+
+    def test_cache_state_is_bound_to_the_user(self):
+        store = CacheStateStore()
+        state = store.issue(as_user(1))
+        self.assertFalse(store.verify(as_user(2), state))
+        # The failed attempt used it up.
+        self.assertFalse(store.verify(as_user(1), state))
+
+    def test_cache_state_expires(self):
+        store = CacheStateStore()
+        with state_settings(MAX_AGE=0):
+            state = store.issue(as_user(1))
+        self.assertFalse(store.verify(as_user(1), state))
+
+    def test_cache_state_async(self):
+        store = CacheStateStore()
+        state = async_to_sync(store.aissue)(as_user(1))
+        self.assertTrue(async_to_sync(store.averify)(as_user(1), state))
+        self.assertFalse(async_to_sync(store.averify)(as_user(1), state))
+
+
+class SessionStateStoreTests(TestCase):
+    def request(self):
+        request = RequestFactory().get('/')
+        SessionMiddleware(lambda request: None).process_request(request)
+        request.user = SimpleNamespace(pk=1)
+        return request
+
+    def test_matching_state_is_consumed(self):
+        store, request = SessionStateStore(), self.request()
+        state = store.issue(request)
+        self.assertTrue(store.verify(request, state))
+        self.assertNotIn('google_oauth_state', request.session)
+
+    def test_mismatch_is_only_logged(self):
+        # The SPA's callback may not carry the session cookie, so this backend doesn't reject.
+        store, request = SessionStateStore(), self.request()
+        store.issue(request)
+        with self.assertLogs('auth_app.state', 'WARNING'):
+            self.assertTrue(store.verify(request, 'other-state'))
+
+
+class CallbackStateTests(TestCase):
+    def setUp(self):
+        self.user = K9User.objects.create_user(
+            username='owner@example.com', email='owner@example.com', password='x', first_name='Ow', last_name='Ner',
+        )
+        self.other = K9User.objects.create_user(
+            username='other@example.com', email='other@example.com', password='x', first_name='Ot', last_name='Her',
+        )
+        self.auth_header = f'Bearer {RefreshToken.for_user(self.user).access_token}'
+
+    def post(self, url_name, state):
+        body = {'code': 'fake-code', **({'state': state} if state is not None else {})}
+        return Client().post(
+            reverse(url_name), body, content_type='application/json', HTTP_AUTHORIZATION=self.auth_header,
+        )
+
+    def test_invalid_state_is_rejected_before_the_token_exchange(self):
+        for backend, store in (('signed', SignedStateStore()), ('cache', CacheStateStore())):
+            others_state = store.issue(SimpleNamespace(user=self.other))
+            for url_name in ('google_callback', 'google_callback_async'):
+                for state in (None, 'forged', others_state):
+                    with self.subTest(backend=backend, view=url_name, state=state), state_settings(BACKEND=backend), \
+                            mock.patch('auth_app.views.get_google_flow') as get_google_flow:
+                        response = self.post(url_name, state)
+                        self.assertEqual(response.status_code, 400)
+                        self.assertEqual(response.json(), {'error': 'Invalid or expired state.'})
+                        get_google_flow.assert_not_called()
+
+    def test_valid_state_is_accepted(self):
+        with FakeGoogleServer() as server, override_settings(
+            GOOGLE_OAUTH2_TOKEN_URI=server.token_uri,
+            GOOGLE_OAUTH2_CLIENT_ID='test-client-id', GOOGLE_OAUTH2_CLIENT_SECRET='test-client-secret',
+        ), mock.patch.dict(os.environ, {'OAUTHLIB_INSECURE_TRANSPORT': '1'}):
+            for url_name in ('google_callback', 'google_callback_async'):
+                with self.subTest(view=url_name):
+                    response = self.post(url_name, SignedStateStore().issue(SimpleNamespace(user=self.user)))
+                    self.assertEqual(response.status_code, 200, response.content)
+
+
+class CredentialsManagerTests(TransactionTestCase):
+    """Threads read through their own DB connections, so rows must be committed."""
+
+    def setUp(self):
+        # The flush between TransactionTestCases sends no delete signals.
+        clear_caches()
+        self.user = K9User.objects.create_user(
+            username='linked@example.com', email='linked@example.com', password='x', first_name='Lin', last_name='Ked',
+        )
+        self.row = GoogleCredentials.objects.create(
+            user=self.user, access_token='old-token', refresh_token='refresh',
+            expires_at=timezone.now() + timedelta(hours=1), oauth_client=get_oauth_client('id', 'secret', 'uri'),
+        )
+        # A fresh manager (and token cache) per test.
+        self.enterContext(override_settings(GOOGLE_CREDENTIALS_CACHE={
+            'MAXSIZE': 100, 'REFRESH_MARGIN': timedelta(minutes=5),
+        }))
+        self.manager = credentials.credentials_manager
+
+    def expire_in(self, delta):
+        GoogleCredentials.objects.filter(pk=self.row.pk).update(expires_at=timezone.now() + delta)
+
+    def fake_refresh(self, calls, delay=0):
+        def refresh(credentials_obj):
+            calls.append(credentials_obj.user_id)
+            time.sleep(delay)
+            credentials_obj.access_token = f'new-token-{len(calls)}'
+            credentials_obj.expires_at = timezone.now() + timedelta(hours=1)
+            return ['access_token', 'expires_at']
+        return refresh
+
+    def test_fresh_token_is_cached(self):
+        self.assertEqual(self.manager.get_access_token(self.user), 'old-token')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.manager.get_access_token(self.user.pk), 'old-token')
+
+    def test_refreshes_ahead_of_expiry(self):
+        # Still valid for a minute, but inside the 5 minute margin.
+        self.expire_in(timedelta(minutes=1))
+        calls = []
+        with mock.patch.object(credentials, 'refresh_credentials', self.fake_refresh(calls)):
+            self.assertEqual(self.manager.get_access_token(self.user), 'new-token-1')
+            self.assertEqual(self.manager.get_access_token(self.user), 'new-token-1')
+        self.assertEqual(calls, [self.user.pk])
+        self.assertEqual(GoogleCredentials.objects.get(pk=self.row.pk).access_token, 'new-token-1')
+
+    def test_concurrent_misses_refresh_once(self):
+        self.expire_in(timedelta(minutes=-1))
+        calls = []
+        barrier = threading.Barrier(8)
+
+        def get_token(_):
+            try:
+                barrier.wait()
+                return self.manager.get_access_token(self.user.pk)
+            finally:
+                connection.close()
+
+        with mock.patch.object(credentials, 'refresh_credentials', self.fake_refresh(calls, delay=0.2)):
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                tokens = list(pool.map(get_token, range(8)))
+        self.assertEqual(calls, [self.user.pk])
+        self.assertEqual(tokens, ['new-token-1'] * 8)
+
+    def test_tokens_stored_during_a_load_are_not_overwritten(self):
+        is_fresh = self.manager.cache.is_fresh
+
+        def store_new_tokens_mid_load(entry, now=None):
+            # What a concurrent OAuth callback does between this load's read and its cache write.
+            row = GoogleCredentials.objects.get(pk=self.row.pk)
+            row.access_token = 'relinked-token'
+            row.save()
+            return is_fresh(entry, now)
+
+        with mock.patch.object(self.manager.cache, 'is_fresh', store_new_tokens_mid_load):
+            self.assertEqual(self.manager.get_access_token(self.user), 'old-token')
+        self.assertEqual(self.manager.get_access_token(self.user), 'relinked-token')
+
+    def test_eviction_waits_for_commit(self):
+        self.manager.get_access_token(self.user)
+        with transaction.atomic():
+            self.row.access_token = 'committed-token'
+            self.row.save()
+            # Not committed yet: a concurrent reader must not see (and re-cache) this row early.
+            self.assertEqual(self.manager.get_access_token(self.user), 'old-token')
+        self.assertEqual(self.manager.get_access_token(self.user), 'committed-token')
+
+
+class EncryptedTextFieldTests(TestCase):
+
+    def setUp(self):
+        clear_caches()
+        self.user = K9User.objects.create_user(
+            username='secret@example.com', email='secret@example.com', password='x', first_name='Sec', last_name='Ret',
+        )
+
+    def create_credentials(self, access_token='access-token', refresh_token=None):
+        return GoogleCredentials.objects.create(
+            user=self.user, access_token=access_token, refresh_token=refresh_token,
+            expires_at=timezone.now(), oauth_client=get_oauth_client('id', 'client-secret', 'uri'),
+        )
+
+    def test_round_trip(self):
+        row = self.create_credentials(refresh_token='refresh-token')
+        stored = stored_value(GoogleCredentials, 'access_token', row.pk)
+        self.assertTrue(stored.startswith(FERNET_PREFIX))
+        self.assertNotIn('access-token', stored)
+        row = GoogleCredentials.objects.get(pk=row.pk)
+        self.assertEqual((row.access_token, row.refresh_token), ('access-token', 'refresh-token'))
+        self.assertEqual(OAuthClient.objects.get().client_secret, 'client-secret')
+
+    def test_empty_values_are_stored_as_is(self):
+        row = self.create_credentials(access_token='')
+        self.assertEqual(stored_value(GoogleCredentials, 'access_token', row.pk), '')
+        self.assertIsNone(stored_value(GoogleCredentials, 'refresh_token', row.pk))
+        self.assertTrue(GoogleCredentials.objects.filter(refresh_token__isnull=True, access_token='').exists())
+
+    def test_reads_legacy_plaintext(self):
+        row = self.create_credentials()
+        # Value() skips get_prep_value, like rows written before the field was encrypted.
+        GoogleCredentials.objects.filter(pk=row.pk).update(access_token=Value('plain-token'))
+        row = GoogleCredentials.objects.get(pk=row.pk)
+        self.assertEqual(row.access_token, 'plain-token')
+        row.save()
+        self.assertTrue(stored_value(GoogleCredentials, 'access_token', row.pk).startswith(FERNET_PREFIX))
+
+    def test_key_rotation(self):
+        with override_settings(FIELD_ENCRYPTION_KEYS=['old-key']):
+            row = self.create_credentials()
+        with override_settings(FIELD_ENCRYPTION_KEYS=['new-key', 'old-key']):
+            self.assertEqual(GoogleCredentials.objects.get(pk=row.pk).access_token, 'access-token')
+            call_command('reencrypt_google_credentials', batch_size=1, stdout=StringIO())
+        with override_settings(FIELD_ENCRYPTION_KEYS=['new-key']):
+            self.assertEqual(GoogleCredentials.objects.get(pk=row.pk).access_token, 'access-token')
+            self.assertEqual(OAuthClient.objects.get().client_secret, 'client-secret')
+        with override_settings(FIELD_ENCRYPTION_KEYS=['old-key']):
+            with self.assertRaisesMessage(ValueError, 'GoogleCredentials.access_token'):
+                GoogleCredentials.objects.get(pk=row.pk)
+
+    def test_unknown_key(self):
+        with override_settings(FIELD_ENCRYPTION_KEYS=['some-key']):
+            row = self.create_credentials()
+        with override_settings(FIELD_ENCRYPTION_KEYS=['other-key']):
+            with self.assertRaises(ValueError):
+                GoogleCredentials.objects.get(pk=row.pk)
+
+
+class EncryptMigrationTests(TransactionTestCase):
+    """Runs 0004_encrypt_google_credentials forwards and backwards over existing rows."""
+
+    before = ('auth_app', '0003_googlecredentials_expires_at_index')
+    after = ('auth_app', '0004_encrypt_google_credentials')
+
+    def tearDown(self):
+        migrate_to(*MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_encrypts_and_decrypts_existing_rows(self):
+        apps = migrate_to(self.before)
+        user = apps.get_model('users_app', 'K9User').objects.create(
+            username='old@example.com', email='old@example.com', first_name='Old', last_name='Row',
+        )
+        row = apps.get_model('auth_app', 'GoogleCredentials').objects.create(
+            user_id=user.pk, access_token='plain-access', refresh_token=None, expires_at=timezone.now(),
+            token_uri='uri', client_id='id', client_secret='plain-secret', scopes='',
+        )
+
+        apps = migrate_to(self.after)
+        for field in ('access_token', 'client_secret'):
+            self.assertTrue(stored_value(GoogleCredentials, field, row.pk).startswith(FERNET_PREFIX))
+        self.assertIsNone(stored_value(GoogleCredentials, 'refresh_token', row.pk))
+        migrated = apps.get_model('auth_app', 'GoogleCredentials').objects.get(pk=row.pk)
+        self.assertEqual((migrated.access_token, migrated.client_secret), ('plain-access', 'plain-secret'))
+
+        migrate_to(self.before)
+        self.assertEqual(stored_value(GoogleCredentials, 'access_token', row.pk), 'plain-access')
+        self.assertEqual(stored_value(GoogleCredentials, 'client_secret', row.pk), 'plain-secret')
+
+
+class MoveClientAndScopesMigrationTests(TransactionTestCase):
+    """Runs 0006_move_client_and_scopes forwards and backwards over existing rows."""
+
+    before = ('auth_app', '0005_oauthclient_googlescope')
+    after = ('auth_app', '0006_move_client_and_scopes')
+
+    def tearDown(self):
+        migrate_to(*MigrationExecutor(connection).loader.graph.leaf_nodes())
+        clear_caches()
+
+    def test_moves_clients_and_scopes_and_back(self):
+        apps = migrate_to(self.before)
+        User = apps.get_model('users_app', 'K9User')
+        GoogleCredentials = apps.get_model('auth_app', 'GoogleCredentials')
+        seeded = {}
+        for i, (client_id, scopes) in enumerate((('id-a', 'cal email'), ('id-a', 'cal'), ('id-b', 'cal cal'), ('id-b', ''))):
+            user = User.objects.create(username=f'u{i}@example.com', email=f'u{i}@example.com', first_name='U', last_name=f'{i}')
+            seeded[i] = GoogleCredentials.objects.create(
+                user_id=user.pk, access_token='token', expires_at=timezone.now(),
+                token_uri=f'uri-{client_id}', client_id=client_id, client_secret=f'secret-{client_id}', scopes=scopes,
+            ).pk
+
+        apps = migrate_to(self.after)
+        OAuthClient = apps.get_model('auth_app', 'OAuthClient')
+        GoogleCredentials = apps.get_model('auth_app', 'GoogleCredentials')
+        GrantedScope = apps.get_model('auth_app', 'GrantedScope')
+        self.assertEqual(
+            sorted(OAuthClient.objects.values_list('client_id', 'client_secret', 'token_uri')),
+            [('id-a', 'secret-id-a', 'uri-id-a'), ('id-b', 'secret-id-b', 'uri-id-b')],
+        )
+        self.assertEqual(sorted(apps.get_model('auth_app', 'GoogleScope').objects.values_list('uri', flat=True)), ['cal', 'email'])
+        clients = dict(GoogleCredentials.objects.values_list('pk', 'oauth_client__client_id'))
+        self.assertEqual([clients[seeded[i]] for i in range(4)], ['id-a', 'id-a', 'id-b', 'id-b'])
+        grants = {}
+        for credentials_id, uri in GrantedScope.objects.values_list('credentials_id', 'scope__uri'):
+            grants.setdefault(credentials_id, set()).add(uri)
+        self.assertEqual([grants.get(seeded[i], set()) for i in range(4)], [{'cal', 'email'}, {'cal'}, {'cal'}, set()])
+
+        # Backwards rebuilds the per-row columns from the shared rows.
+        GoogleCredentials.objects.update(client_id='', client_secret='', token_uri='', scopes='')
+        apps = migrate_to(self.before)
+        rows = {
+            row[0]: row[1:]
+            for row in apps.get_model('auth_app', 'GoogleCredentials').objects.values_list('pk', 'client_id', 'client_secret', 'token_uri', 'scopes')
+        }
+        self.assertEqual([rows[seeded[i]] for i in range(4)], [
+            ('id-a', 'secret-id-a', 'uri-id-a', 'cal email'),
+            ('id-a', 'secret-id-a', 'uri-id-a', 'cal'),
+            ('id-b', 'secret-id-b', 'uri-id-b', 'cal'),
+            ('id-b', 'secret-id-b', 'uri-id-b', ''),
+        ])
+
+
+class GrantedScopesTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        client = get_oauth_client('id', 'secret', 'uri')
+        self.credentials = {}
+        for name in ('ann', 'bob'):
+            user = K9User.objects.create_user(
+                username=f'{name}@example.com', email=f'{name}@example.com', password='x', first_name=name, last_name='Scoped',
+            )
+            self.credentials[name] = GoogleCredentials.objects.create(
+                user=user, access_token='token', expires_at=timezone.now(), oauth_client=client,
+            )
+
+    def test_set_granted_scopes_replaces_the_grants(self):
+        ann = self.credentials['ann']
+        set_granted_scopes(ann, ['calendar', 'email'])
+        self.assertEqual(sorted(get_granted_scopes(ann)), ['calendar', 'email'])
+        set_granted_scopes(ann, ['email', 'profile'])
+        self.assertEqual(sorted(get_granted_scopes(ann)), ['email', 'profile'])
+        set_granted_scopes(ann, [])
+        self.assertEqual(get_granted_scopes(ann), [])
+
+    def test_users_with_scope(self):
+        set_granted_scopes(self.credentials['ann'], ['calendar', 'email'])
+        set_granted_scopes(self.credentials['bob'], ['calendar'])
+        self.assertEqual(sorted(users_with_scope('calendar').values_list('first_name', flat=True)), ['ann', 'bob'])
+        self.assertEqual(list(users_with_scope('email').values_list('first_name', flat=True)), ['ann'])
+        self.assertFalse(users_with_scope('profile').exists())
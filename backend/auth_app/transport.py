@@ -0,0 +1,162 @@
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from google.auth.transport.requests import Request
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from backend import metrics
+
+# Responses worth retrying: rate limiting and transient server-side failures.
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+def get_timeout():
+    """Returns the (connect, read) timeout tuple for outbound Google requests."""
+    config = settings.GOOGLE_HTTP
+    return (config['CONNECT_TIMEOUT'], config['READ_TIMEOUT'])
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that reports each call's duration (retries included) to the request metrics."""
+
+    def send(self, request, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().send(request, **kwargs)
+        finally:
+            metrics.record_http(time.perf_counter() - started)
+
+
+def build_adapter():
+    """Creates a pooled, retrying HTTPAdapter configured from `settings.GOOGLE_HTTP`.
+
+    The adapter owns a urllib3 PoolManager that keeps up to POOL_MAXSIZE
+    keep-alive connections per host, so consecutive requests to the same
+    Google endpoint skip the TCP/TLS handshake. `pool_block=True` bounds the
+    number of concurrent connections instead of opening throwaway extras.
+    """
+    config = settings.GOOGLE_HTTP
+    retry = Retry(
+        total=config['RETRIES'],
+        backoff_factor=config['BACKOFF_FACTOR'],
+        status_forcelist=RETRY_STATUSES,
+        # Only idempotent methods are retried after a read error or a RETRY_STATUSES
+        # response. POSTs (the one-time authorization code exchange, event inserts, batch
+        # requests) may already have been applied, so they're retried only on connect
+        # errors, which urllib3 retries for every method since nothing was sent.
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+        respect_retry_after_header=True,
+        # Hand the final 4xx/5xx response back to the caller instead of raising MaxRetryError.
+        raise_on_status=False,
+    )
+    return TimedHTTPAdapter(
+        pool_connections=config['POOL_CONNECTIONS'],
+        pool_maxsize=config['POOL_MAXSIZE'],
+        max_retries=retry,
+        pool_block=True,
+    )
+
+
+_adapter = None
+_session = None
+_executor = None
+_lock = threading.Lock()
+
+
+def get_adapter():
+    """Returns the process-wide pooled adapter, creating it on first use."""
+    global _adapter
+    if _adapter is None:
+        with _lock:
+            if _adapter is None:
+                _adapter = build_adapter()
+    return _adapter
+
+
+def mount_pooled_adapter(session):
+    """Routes all of `session`'s HTTP(S) traffic through the shared pooled adapter."""
+    adapter = get_adapter()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session():
+    """Returns a shared requests.Session backed by the pooled adapter.
+
+    Use it for plain API calls (Calendar, token refresh). It carries no
+    per-user state; pass credentials explicitly in each request's headers.
+    """
+    global _session
+    if _session is None:
+        session = mount_pooled_adapter(requests.Session())
+        with _lock:
+            if _session is None:
+                _session = session
+    return _session
+
+
+class GoogleAuthRequest(Request):
+    """google-auth transport bound to the shared pooled session and configured timeouts.
+
+    Pass it to `google.oauth2.credentials.Credentials.refresh()` so token refreshes
+    reuse warm connections instead of google-auth's own unpooled default session.
+    """
+
+    def __init__(self):
+        super().__init__(session=get_session())
+
+    def __call__(self, url, method='GET', body=None, headers=None, timeout=None, **kwargs):
+        return super().__call__(url, method=method, body=body, headers=headers, timeout=timeout or get_timeout(), **kwargs)
+
+
+def get_executor():
+    """Returns the bounded thread pool the async views run blocking Google calls on."""
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.GOOGLE_HTTP['ASYNC_WORKERS'],
+                    thread_name_prefix='google-http',
+                )
+    return _executor
+
+
+async def run_blocking(func, /, *args, **kwargs):
+    """Awaits `func(*args, **kwargs)` on the Google HTTP executor.
+
+    Unlike `sync_to_async`, this does not funnel calls through the single
+    thread-sensitive executor, so concurrent requests wait on Google in
+    parallel while the event loop stays free. Concurrency is bounded by
+    `GOOGLE_HTTP['ASYNC_WORKERS']`.
+    """
+    loop = asyncio.get_running_loop()
+    # run_in_executor doesn't carry context variables over; copy them so the call
+    # is still attributed to this request's metrics.
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_executor(), functools.partial(context.run, func, *args, **kwargs))
+
+
+def reset_transport():
+    """Closes the pooled connections and forgets the shared adapter/session/executor."""
+    global _adapter, _session, _executor
+    with _lock:
+        if _adapter is not None:
+            _adapter.close()
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+        _adapter = _session = _executor = None
+
+
+@receiver(setting_changed)
+def _reset_transport(sender, setting, **kwargs):
+    if setting == 'GOOGLE_HTTP':
+        reset_transport()
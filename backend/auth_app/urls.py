@@ -1,7 +1,15 @@
 from django.urls import path
-from .views import GoogleLoginRedirectView, GoogleLoginCallbackView
+from .views import (
+    GoogleLoginRedirectView,
+    GoogleLoginCallbackView,
+    AsyncGoogleLoginRedirectView,
+    AsyncGoogleLoginCallbackView,
+)
 
 urlpatterns = [
     path('google/redirect/', GoogleLoginRedirectView.as_view(), name='google_redirect'),
-    path('google/callback/', GoogleLoginCallbackView.as_view(), name='google_callback')
+    path('google/callback/', GoogleLoginCallbackView.as_view(), name='google_callback'),
+    # ASGI-native variants; same contract, but don't pin a worker during the Google round-trip
+    path('google/async/redirect/', AsyncGoogleLoginRedirectView.as_view(), name='google_redirect_async'),
+    path('google/async/callback/', AsyncGoogleLoginCallbackView.as_view(), name='google_callback_async')
 ]
\ No newline at end of file
@@ -1,23 +1,35 @@
 import os
+import json
 from datetime import datetime, timedelta, timezone
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.db import transaction
+from django.http import JsonResponse
 from django.shortcuts import redirect
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
 from rest_framework import permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt import authentication
-from google_auth_oauthlib.flow import Flow
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from .clients import get_oauth_client, set_granted_scopes
 from .models import GoogleCredentials
+from .oauth import get_flow_template
+from .state import get_state_store
+from .transport import get_timeout, run_blocking
 import logging 
 logger = logging.getLogger(__name__)
 
-def get_google_flow(scopes=settings.GOOGLE_CALENDAR_SCOPES):
+def get_google_flow(scopes=None):
     """Initializes and configures the Google OAuth 2.0 authorization flow.
 
-    This helper function creates a Flow object using application credentials
-    (client ID, client secret) and configuration (auth URI, token URI, redirect URI)
-    loaded from the application settings. It sets up the necessary parameters
-    for initiating the OAuth 2.0 dance with Google APIs.
+    The client configuration (client ID, client secret, auth URI, token URI,
+    redirect URI) is parsed from the application settings once per scope set
+    and cached process-wide (see `auth_app.oauth`). Each call only builds the
+    per-request OAuth session on top of that shared template, so the Flow
+    returned here is safe to mutate (fetch_token, state, code verifier).
 
     Args:
         scopes (list[str], optional): A list of strings representing the Google API
@@ -30,29 +42,51 @@ def get_google_flow(scopes=settings.GOOGLE_CALENDAR_SCOPES):
             for generating the authorization URL and exchanging the authorization
             code for access tokens.
     """
-    return Flow.from_client_config(
-        # create and configure an OAuth 2.0 "Flow" object
-        client_config={
-            "web": { #  These settings are for a web application flow.
-                "client_id": settings.GOOGLE_OAUTH2_CLIENT_ID, # The application's unique public identifier, obtained from Google Cloud Console
-                "client_secret": settings.GOOGLE_OAUTH2_CLIENT_SECRET, # The application's secret key, also from Google Cloud Console
-                "auth_uri": "https://accounts.google.com/o/oauth2/auth", # The Google endpoint URL where the user will be sent to log in and grant consent to the application.
-                # The Google endpoint URL the application will use (behind the scenes) 
-                # to exchange an authorization code (received after user consent) for an access token and potentially a refresh token.
-                "token_uri": "https://oauth2.googleapis.com/token",
-                #  A list containing the URI(s) within the application where Google will redirect the user back after they have authenticated and granted (or denied) permission. 
-                # This URI must be pre-registered in the Google Cloud Console project settings. The code receives the authorization code at this endpoint.
-                "redirect_uris": [settings.GOOGLE_OAUTH2_REDIRECT_URI],
-                # Lists the allowed origins for JavaScript requests, often relevant for client-side operations or CORS (Cross-Origin Resource Sharing) validation
-                "javascript_origins": ["http://127.0.0.1:5173"], 
-            }
-        },
-        # This passes the scopes argument (either the default or the one provided when calling the function) to the Flow object. 
-        # The Flow object will use these scopes when constructing the authorization URL, telling Google what permissions are being requested.
-        scopes=scopes,
-        # This explicitly tells the Flow object which redirect URI to use when generating the authorization URL and validating the callback
-        redirect_uri=settings.GOOGLE_OAUTH2_REDIRECT_URI,
-    )
+    return get_flow_template(scopes).build()
+
+
+def credential_defaults(g_creds):
+    """Maps fetched Google credentials onto GoogleCredentials model fields.
+
+    Args:
+        g_creds (google.oauth2.credentials.Credentials): The credentials returned by
+            `flow.fetch_token()`.
+
+    Returns:
+        dict: Field values for `update_or_create(defaults=...)`. `refresh_token` is only
+            included when Google issued one, so an existing refresh token is never
+            overwritten with None on re-authentication.
+    """
+    defaults = {
+        'access_token': g_creds.token,
+        # Convert the token expiry time to a timezone-aware datetime object (UTC).
+        'expires_at': g_creds.expiry.replace(tzinfo=timezone.utc) if g_creds.expiry else None,
+        # Client id/secret/token URI are the same for every user: point at the shared row.
+        'oauth_client': get_oauth_client(g_creds.client_id, g_creds.client_secret, g_creds.token_uri),
+    }
+    if g_creds.refresh_token:
+        defaults['refresh_token'] = g_creds.refresh_token
+    return defaults
+
+
+def store_credentials(user, g_creds):
+    """Creates or updates `user`'s GoogleCredentials and its granted scopes.
+
+    Args:
+        user (K9User): The user linking their Google account.
+        g_creds (google.oauth2.credentials.Credentials): The fetched credentials.
+
+    Returns:
+        tuple[GoogleCredentials, bool]: The row and whether it was created.
+    """
+    with transaction.atomic():
+        credentials_obj, created = GoogleCredentials.objects.update_or_create(
+            user=user,
+            defaults=credential_defaults(g_creds),
+        )
+        # Prefer what Google reports as actually granted over what was requested.
+        set_granted_scopes(credentials_obj, g_creds.granted_scopes or g_creds.scopes or [])
+    return credentials_obj, created
 
 
 class GoogleLoginRedirectView(APIView):
@@ -85,10 +119,16 @@ class GoogleLoginRedirectView(APIView):
         # This object holds the client ID, client secret, scopes, redirect URI etc.
         flow = get_google_flow() # Assumes default scopes are used here
 
-        # 2. Generate the Google Authorization URL.
+        # 2. Issue the 'state' value for CSRF protection.
+        # The callback view will compare the 'state' returned by Google with this one.
+        # How it's remembered depends on GOOGLE_OAUTH_STATE['BACKEND'] (see auth_app.state):
+        # by default it's a signed, expiring token bound to this user, so nothing is stored.
+        state = get_state_store().issue(request)
+
+        # 3. Generate the Google Authorization URL.
         # This URL is where the user will be sent to authenticate with Google and grant permissions.
-        # Also generate a 'state' value for CSRF protection.
         authorization_url, state = flow.authorization_url(
+            state=state,
             # Request 'offline' access to get a refresh token.
             # Refresh tokens allow accessing Google APIs when the user is not present.
             access_type='offline',
@@ -99,20 +139,11 @@ class GoogleLoginRedirectView(APIView):
             include_granted_scopes='true'
         )
 
-        # 3. Store the 'state' value in the user's session for later verification.
-        # This prevents Cross-Site Request Forgery (CSRF) attacks. The callback view
-        # will compare the 'state' returned by Google with the one stored here.
-        if not request.session.session_key:
-            request.session.create()
-        # Store the generated state parameter in the session.
-        request.session['google_oauth_state'] = state
-        # Explicitly save the session to ensure the state is persisted immediately.
-        request.session.save()
-
         # --- Logging for debugging ---
         # Log relevant information for tracking the flow initiation.        
-        logger.info(f"User: {request.user}, Authenticated: {request.user.is_authenticated}")
-        logger.info(f"Set session state: {state}, Session ID: {request.session.session_key}")
+        # Lazy %-style arguments: nothing is formatted unless the record is emitted,
+        # and then on the logging thread (see backend/log.py).
+        logger.info("Google OAuth redirect issued for user %s", request.user.pk)
         # --- End Logging ---
 
         # 4. Return the Authorization URL to the client.
@@ -150,19 +181,15 @@ class GoogleLoginCallbackView(APIView):
                       or potentially a Redirect response (currently commented out).
         """
         # --- 1. Security Check: Validate the 'state' parameter (CSRF Protection) ---
-        logger.info(f"Callback received for User: {request.user}, Session ID: {request.session.session_key}")
-        logger.debug(f"Request data: {request.data}") # Log full data only in debug
+        logger.info("Callback received for user %s", request.user.pk)
 
         # Extract the 'state' parameter from the POST request data.
         state = request.data.get('state')
-        logger.info(f"Extracted state directly: {state}")
 
-        # Retrieve the 'state' value that was stored in the session earlier.
-        session_state = request.session.get('google_oauth_state')
-        logger.info(f"Received state: {state}, Session state: {session_state}, Session ID: {request.session.session_key}") 
-
-        # Attempt to remove the 'google_oauth_state' from the session after retrieving it
-        request.session.pop('google_oauth_state', None)
+        # Check it against the one issued by the redirect view (signature/expiry/user for
+        # the default signed state, a single-use cache entry or the session otherwise).
+        if not state or not get_state_store().verify(request, state):
+            return Response({"error": "Invalid or expired state."}, status=status.HTTP_400_BAD_REQUEST)
 
 
         # --- 2. Extract Authorization Code ---
@@ -177,15 +204,16 @@ class GoogleLoginCallbackView(APIView):
             # Get the configured Google OAuth Flow object.
             flow = get_google_flow()
             # Use the received authorization code to fetch access and refresh tokens from Google.
-            # This involves a server-to-server call to Google's token endpoint.
-            flow.fetch_token(code=code)
+            # This involves a server-to-server call to Google's token endpoint, made over
+            # the shared keep-alive connection pool with bounded timeouts and retries.
+            flow.fetch_token(code=code, timeout=get_timeout())
             # Store the obtained credentials (tokens, expiry, scopes etc.) in the 'g_creds' object.
             g_creds = flow.credentials
-            logger.info(f"Google credentials fetched: Access Token={g_creds.token[:10]}...")
+            logger.info("Google credentials fetched for user %s", request.user.pk)
 
         # Handle errors during the token exchange process.
         except Exception as e:
-            logger.error(f"Error fetching token: {e}") 
+            logger.error("Error fetching token: %s", e)
             # Specifically check if the error is due to an invalid/expired code.
             if 'invalid_grant' in str(e):
                 return Response({"error": "Authorization code invalid or already used"}, status=status.HTTP_400_BAD_REQUEST)
@@ -203,43 +231,142 @@ class GoogleLoginCallbackView(APIView):
 
         # --- 5. Store Credentials ---
         try:
-            # Convert the token expiry time to a timezone-aware datetime object (UTC).
-            expiry_datetime = g_creds.expiry.replace(tzinfo=timezone.utc) if g_creds.expiry else None
             # Store or update the Google credentials in the database, linked to the Django user.
             # `update_or_create` finds a record based on `user=request.user` or creates a new one.
-            # `defaults` specifies the fields to set/update.
-            credentials_obj, created = GoogleCredentials.objects.update_or_create(
-                user=request.user,
-                defaults={
-                    'access_token': g_creds.token,
-                    'refresh_token': g_creds.refresh_token, # Store the refresh token if available.
-                    'expires_at': expiry_datetime,
-                    'token_uri': g_creds.token_uri,
-                    'client_id': g_creds.client_id,
-                    'client_secret': g_creds.client_secret,
-                    'scopes': " ".join(g_creds.scopes or []), # Convert scopes list to string.
-                }
-            )
+            # `defaults` specifies the fields to set/update. If Google didn't send a refresh token
+            # this time, it is left out of `defaults` so the one already stored is preserved.
+            credentials_obj, created = store_credentials(request.user, g_creds)
 
-            # --- 6. Attempt to Preserve Existing Refresh Token ---
-            # If Google didn't send a refresh token this time (`g_creds.refresh_token` is None),
-            # AND if this wasn't the first time linking (`created` is False),
-            # AND if the object retrieved/updated (`credentials_obj`) currently holds a refresh token...
-            if not g_creds.refresh_token and not created and credentials_obj.refresh_token:
-                # ...then explicitly re-fetch the object from the DB to get the *stored* refresh token...
-                 # (This assumes `update_or_create` might have temporarily set it to None in memory based on `defaults`)
-                 # ...and save it back to the object, updating only that field in the DB.
-                 # This prevents losing the original refresh token on subsequent authentications.
-                credentials_obj.refresh_token = GoogleCredentials.objects.get(pk=credentials_obj.pk).refresh_token
-                credentials_obj.save(update_fields=['refresh_token'])
-
-            logger.info(f"Google credentials {'created' if created else 'updated'} for user {request.user.email}")
+            logger.info("Google credentials %s for user %s", 'created' if created else 'updated', request.user.pk)
             # Return a JSON success message to the frontend.
             return Response({"message": "Google account linked successfully"}, status=status.HTTP_200_OK)
 
         # Handle potential errors during database interaction (saving credentials).
         except Exception as e:
-            logger.error(f"Error storing credentials: {e}")
+            logger.error("Error storing credentials: %s", e)
             # Return a JSON error message.
             return Response({"error": "Failed to store credentials"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
+
+
+class AsyncJWTAuthentication(authentication.JWTAuthentication):
+    """
+    JWTAuthentication for native async views.
+
+    Token parsing and signature checks are CPU-only and run inline; the user lookup
+    is `objects.aget()`, which Django runs on its sync_to_async thread rather than
+    blocking the event loop.
+    """
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        try:
+            user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken("Token contained no recognizable user identification") from e
+        try:
+            user = await self.user_model.objects.aget(**{jwt_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed("User not found", code="user_not_found") from e
+        if jwt_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        return user
+
+
+class AsyncJWTView(View):
+    """
+    Base class for ASGI-native views authenticated by JWT.
+
+    DRF's APIView is synchronous, so under ASGI every request to it occupies a thread
+    for its whole lifetime. Subclasses define `async def` handlers instead; they only
+    hand work to threads for the blocking Google HTTP calls (see `transport.run_blocking`)
+    and for DB work (through sync_to_async).
+    """
+    authentication = AsyncJWTAuthentication()
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Token-authenticated API endpoints, like DRF's APIView, are exempt from CSRF checks.
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            auth = await self.authentication.aauthenticate(request)
+        except (AuthenticationFailed, InvalidToken) as e:
+            return JsonResponse({"detail": e.detail}, status=status.HTTP_401_UNAUTHORIZED)
+        if auth is None:
+            return JsonResponse(
+                {"detail": "Authentication credentials were not provided."},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+        request.user, request.auth = auth
+        return await super().dispatch(request, *args, **kwargs)
+
+
+class AsyncGoogleLoginRedirectView(AsyncJWTView):
+    """
+    Async variant of GoogleLoginRedirectView; same request/response contract.
+    """
+
+    async def get(self, request):
+        flow = get_google_flow()
+        authorization_url, state = flow.authorization_url(
+            state=await get_state_store().aissue(request),
+            access_type='offline',
+            prompt='consent',
+            include_granted_scopes='true'
+        )
+        return JsonResponse({"authorization_url": authorization_url}, status=status.HTTP_200_OK)
+
+
+class AsyncGoogleLoginCallbackView(AsyncJWTView):
+    """
+    Async variant of GoogleLoginCallbackView; same request/response contract.
+
+    The token exchange runs on the bounded Google HTTP executor over the shared
+    connection pool, and the credentials upsert is the sync view's `store_credentials`
+    (one transaction with the granted scopes) run through sync_to_async, so the event
+    loop keeps serving other requests while Google and the DB respond.
+    """
+
+    async def post(self, request):
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return JsonResponse({"error": "Invalid JSON body."}, status=status.HTTP_400_BAD_REQUEST)
+
+        state = data.get('state')
+        if not state or not await get_state_store().averify(request, state):
+            return JsonResponse({"error": "Invalid or expired state."}, status=status.HTTP_400_BAD_REQUEST)
+
+        code = data.get('code')
+        if not code:
+            return JsonResponse({"error": "Authorization code not found."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            flow = get_google_flow()
+            await run_blocking(flow.fetch_token, code=code, timeout=get_timeout())
+            g_creds = flow.credentials
+        except Exception as e:
+            logger.error("Error fetching token: %s", e)
+            if 'invalid_grant' in str(e):
+                return JsonResponse({"error": "Authorization code invalid or already used"}, status=status.HTTP_400_BAD_REQUEST)
+            return JsonResponse({"error": f"Failed to fetch token: {e}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        try:
+            credentials_obj, created = await sync_to_async(store_credentials)(request.user, g_creds)
+        except Exception as e:
+            logger.error("Error storing credentials: %s", e)
+            return JsonResponse({"error": "Failed to store credentials"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        logger.info("Google credentials %s for user %s", 'created' if created else 'updated', request.user.pk)
+        return JsonResponse({"message": "Google account linked successfully"}, status=status.HTTP_200_OK)
@@ -0,0 +1,100 @@
+"""
+Read-through cache helpers shared by the apps, on top of settings.CACHES.
+
+CACHE_BACKEND picks the backend in settings: 'locmem' (single process), 'redis'
+(REDIS_URL) or 'fakeredis' (an in-process Redis stand-in for local runs). Code
+only talks to Django's cache API, so all three behave the same here.
+"""
+import threading
+import time
+from concurrent.futures import Future
+from django.core.cache import caches
+
+_MISSING = object()
+
+# The in-process half of stampede protection: one Future per (alias, key) being
+# loaded, which other threads missing the same key wait on. Entries only live while
+# their load runs, and the lock guarding the dict is never held during a load.
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+
+class CachedLookup:
+    """
+    A family of cache entries keyed by `parts`, filled from `loader(*parts)` on a miss.
+
+    `version` is part of every key (`<namespace>:v<version>:...`): bump it whenever the
+    shape of the cached value changes, so processes running old and new code never read
+    each other's entries. CACHES' own VERSION still applies on top, to drop everything at
+    once. Falsy values (including None) are cached too.
+
+    Misses are stampede-protected at two levels: threads of one process missing the same
+    key wait for the first one's load (and get its result or exception), and across processes only the holder of a short-lived cache lock
+    (`cache.add`) runs the loader while the others poll for its result for up to
+    `lock_wait` seconds before loading themselves.
+    """
+
+    def __init__(self, namespace, loader, timeout, version=1, alias='default', lock_timeout=5, lock_wait=1.0):
+        self.namespace = namespace
+        self.loader = loader
+        self.timeout = timeout
+        self.version = version
+        self.alias = alias
+        self.lock_timeout = lock_timeout
+        self.lock_wait = lock_wait
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def key(self, *parts):
+        return ':'.join([self.namespace, f'v{self.version}', *map(str, parts)])
+
+    def get(self, *parts):
+        key = self.key(*parts)
+        value = self.cache.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        flight = (self.alias, key)
+        with _in_flight_lock:
+            future = _in_flight.get(flight)
+            loading = future is None
+            if loading:
+                future = _in_flight[flight] = Future()
+        if not loading:
+            return future.result()
+        try:
+            # Another thread may have filled it between the miss and this thread's load.
+            value = self.cache.get(key, _MISSING)
+            if value is _MISSING:
+                value = self._fill(key, parts)
+        except BaseException as error:
+            future.set_exception(error)
+            raise
+        else:
+            future.set_result(value)
+            return value
+        finally:
+            with _in_flight_lock:
+                del _in_flight[flight]
+
+    def _fill(self, key, parts):
+        cache, lock_key = self.cache, f'{key}:lock'
+        if not cache.add(lock_key, 1, self.lock_timeout):
+            deadline = time.monotonic() + self.lock_wait
+            while time.monotonic() < deadline:
+                time.sleep(0.02)
+                value = cache.get(key, _MISSING)
+                if value is not _MISSING:
+                    return value
+            # The holder is slow or gone; load without caching rather than wait longer.
+            return self.loader(*parts)
+        try:
+            value = self.loader(*parts)
+            cache.set(key, value, self.timeout)
+            return value
+        finally:
+            cache.delete(lock_key)
+
+    def invalidate(self, *parts):
+        self.cache.delete(self.key(*parts))
@@ -0,0 +1,87 @@
+"""
+Environment-driven database configuration, used by settings.DATABASES.
+
+DATABASE_ENGINE picks the profile:
+
+- 'sqlite' (default, local runs): a file database in WAL mode with a busy timeout,
+  so readers don't block the writer and concurrent writers wait instead of failing
+  with "database is locked".
+- 'postgres': PostgreSQL through psycopg 3, either with persistent connections
+  (CONN_MAX_AGE) or, with DB_POOL=True, a psycopg_pool connection pool per process
+  (needs psycopg[pool]).
+"""
+import os
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def _env_bool(name, default):
+    return os.environ.get(name, str(default)) == 'True'
+
+
+def sqlite_database(base_dir):
+    """SQLite settings tuned for concurrent local use."""
+    init_commands = []
+    if _env_bool('SQLITE_WAL', True):
+        # WAL lets readers run alongside the single writer; NORMAL sync is safe in WAL mode
+        # (a power loss can only drop the last commits, never corrupt the file).
+        init_commands += ['PRAGMA journal_mode=WAL', 'PRAGMA synchronous=NORMAL']
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('SQLITE_PATH', base_dir / 'db.sqlite3'),
+        # Reusing the connection also skips re-running the PRAGMAs on every request.
+        'CONN_MAX_AGE': _env_int('DB_CONN_MAX_AGE', 60),
+        'OPTIONS': {
+            # Seconds a writer waits for the lock (sqlite3's busy timeout) before "database is locked".
+            'timeout': _env_int('SQLITE_BUSY_TIMEOUT', 20),
+            # Take the write lock at BEGIN, so transactions that read then write queue on the
+            # busy timeout instead of failing when they try to upgrade their lock.
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': ';'.join(init_commands),
+        },
+        # A file rather than Django's default shared-cache in-memory database, whose table
+        # locks fail concurrent writers at once instead of waiting out the busy timeout
+        # (the concurrency tests write from several threads).
+        'TEST': {'NAME': os.environ.get('SQLITE_TEST_PATH', base_dir / 'test_db.sqlite3')},
+    }
+
+
+def postgres_database():
+    """PostgreSQL settings with persistent connections or a per-process connection pool."""
+    database = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('DB_NAME', 'k9'),
+        'USER': os.environ.get('DB_USER', 'k9'),
+        'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+        'HOST': os.environ.get('DB_HOST', 'localhost'),
+        'PORT': os.environ.get('DB_PORT', '5432'),
+        'OPTIONS': {},
+    }
+    if _env_bool('DB_POOL', False):
+        database['OPTIONS']['pool'] = {
+            'min_size': _env_int('DB_POOL_MIN_SIZE', 2),
+            'max_size': _env_int('DB_POOL_MAX_SIZE', 10),
+            'timeout': _env_int('DB_POOL_TIMEOUT', 10), # Seconds to wait for a free connection
+        }
+        # Django returns connections to the pool after each request; persistent connections are not allowed.
+        database['CONN_MAX_AGE'] = 0
+    else:
+        database['CONN_MAX_AGE'] = _env_int('DB_CONN_MAX_AGE', 60)
+        # Check reused connections before the first query of a request, so a dropped one is replaced.
+        database['CONN_HEALTH_CHECKS'] = True
+    if _env_bool('DB_PGBOUNCER', False):
+        # Transaction-pooling PgBouncer can't keep server-side cursors across transactions.
+        database['DISABLE_SERVER_SIDE_CURSORS'] = True
+    return database
+
+
+def database_config(base_dir):
+    """Returns the DATABASES['default'] dict for the DATABASE_ENGINE profile."""
+    engine = os.environ.get('DATABASE_ENGINE', 'sqlite')
+    if engine == 'sqlite':
+        return sqlite_database(base_dir)
+    if engine == 'postgres':
+        return postgres_database()
+    raise ValueError(f"Unknown DATABASE_ENGINE {engine!r}; use 'sqlite' or 'postgres'.")
@@ -0,0 +1,148 @@
+"""
+A small closed-loop load driver and baseline comparison for the benchmark commands.
+
+`run_load` keeps `concurrency` requests in flight on worker threads (like a
+threaded WSGI server's clients would) and times each one. Queries per request
+come from the metrics registry (backend/metrics.py), which PerformanceMiddleware
+fills per URL name, so they're counted on every worker thread's connection.
+
+Commands that seed rows run inside `throwaway_database()`, so they never write
+to the configured database.
+"""
+import json
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from django.db import connections
+from . import metrics
+
+# Metrics where a higher value is better; everything else regresses by going up.
+HIGHER_IS_BETTER = {'rps'}
+LATENCY_METRICS = ('p50_ms', 'p95_ms', 'p99_ms')
+
+
+@contextmanager
+def throwaway_database(alias='default', verbosity=0):
+    """Points `alias` at a freshly migrated test database for the duration of the block.
+
+    The database is the one the test runner would use (test_<NAME> on Postgres,
+    DATABASES[alias]['TEST']['NAME'] on SQLite); a leftover one is replaced, and it's
+    dropped again on exit, so seeded rows never reach the configured database.
+    """
+    connection = connections[alias]
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+
+
+def close_worker_connections(pool, workers):
+    """Closes the DB connections each of `pool`'s `workers` threads opened.
+
+    Requests keep their connection for CONN_MAX_AGE, so without this the workers'
+    connections outlive the run (and keep `throwaway_database` from dropping it).
+    Every task waits for the others, so each of the threads runs exactly one.
+    """
+    barrier = threading.Barrier(workers)
+
+    def close():
+        barrier.wait()
+        connections.close_all()
+
+    list(pool.map(lambda _: close(), range(workers)))
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(math.ceil(len(sorted_values) * fraction) - 1, 0)]
+
+
+def run_load(call, requests, concurrency):
+    """Calls `call(i)` for i in range(requests) with `concurrency` calls in flight.
+
+    Args:
+        call (callable): Sends request number `i` and returns its status code.
+        requests (int): Total number of calls.
+        concurrency (int): Worker threads.
+
+    Returns:
+        tuple[list[float], list[int], float]: Per-call latencies (seconds), status
+            codes, and the wall time of the whole run.
+    """
+    def timed(i):
+        started = time.perf_counter()
+        status_code = call(i)
+        return time.perf_counter() - started, status_code
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(timed, range(requests)))
+        elapsed = time.perf_counter() - started
+        close_worker_connections(pool, concurrency)
+    return [latency for latency, _ in results], [status_code for _, status_code in results], elapsed
+
+
+def summarize(view_name, latencies, status_codes, elapsed, expected_status=200):
+    """Turns a `run_load` result into the numbers stored in a baseline.
+
+    `queries` is the mean DB queries per request recorded for `view_name` since the
+    last `metrics.reset()` (METRICS['SAMPLE_RATE'] must be 1.0 for it to be exact).
+    """
+    latencies = sorted(latencies)
+    queries, sampled = metrics.db_queries.totals(view_name)
+    return {
+        'requests': len(latencies),
+        'errors': sum(1 for status_code in status_codes if status_code != expected_status),
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'queries': round(queries / sampled, 2) if sampled else None,
+    }
+
+
+def compare(results, baseline, max_regression):
+    """Lists the regressions of `results` against `baseline`.
+
+    Latency and throughput may be up to `max_regression` (a fraction) worse than the
+    baseline; query counts are deterministic, so any increase counts. Endpoints or
+    metrics missing from the baseline are skipped.
+
+    Returns:
+        list[str]: One human-readable line per regression.
+    """
+    regressions = []
+    for endpoint, numbers in results.items():
+        expected = baseline.get(endpoint, {})
+        if numbers['errors']:
+            regressions.append(f"{endpoint}: {numbers['errors']} failed requests")
+        for metric in ('rps', *LATENCY_METRICS):
+            if not expected.get(metric):
+                continue
+            if metric in HIGHER_IS_BETTER:
+                worse = numbers[metric] < expected[metric] * (1 - max_regression)
+            else:
+                worse = numbers[metric] > expected[metric] * (1 + max_regression)
+            if worse:
+                regressions.append(f"{endpoint}: {metric} {numbers[metric]} vs. baseline {expected[metric]}")
+        if expected.get('queries') is not None and numbers['queries'] is not None:
+            if numbers['queries'] > expected['queries']:
+                regressions.append(f"{endpoint}: {numbers['queries']} queries/request vs. baseline {expected['queries']}")
+    return regressions
+
+
+def load_baseline(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(path, results):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write('\n')
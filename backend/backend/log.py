@@ -0,0 +1,122 @@
+"""
+Structured, non-blocking logging used by settings.LOGGING.
+
+Request threads only put records on an in-memory queue (QueueJSONHandler); a
+QueueListener thread does the formatting (`msg % args`, JSON encoding) and the
+stream I/O. Records keep their arguments unformatted until then, so pass
+values that won't change after the call (ids, strings), not live objects.
+"""
+import atexit
+import json
+import logging
+import queue
+import random
+import re
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+# Attributes every LogRecord has; anything else on a record came in through `extra=`.
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+REDACTED = '[REDACTED]'
+# `extra=` keys whose values are never written out: those with one of these words as a whole
+# underscore-separated part (`access_token`, `client_secret`, `session_id`; not `tokenizer`)...
+SECRET_FIELDS = re.compile(
+    r'(^|_)(tokens?|secrets?|passwords?|authorization|cookies?|session|sessionid|csrftoken)($|_)', re.IGNORECASE,
+)
+# ...and these exact keys. `code` and `state` are only OAuth values on their own; as parts of a
+# key they usually aren't (`status_code`, `state_changed`).
+SECRET_FIELD_NAMES = frozenset({'code', 'state', 'auth_code', 'authorization_code', 'oauth_code', 'oauth_state'})
+# Secrets that can end up inside messages (exception texts, reprs).
+SECRET_PATTERNS = [
+    (re.compile(r'(Bearer\s+)[\w.~+/=-]+', re.IGNORECASE), r'\1' + REDACTED),
+    (re.compile(r'ya29\.[\w.-]+'), REDACTED),  # Google access tokens
+    (re.compile(r'1//[\w.-]+'), REDACTED),  # Google refresh tokens
+    (re.compile(r'''((?:password|client_secret|refresh_token|access_token|code)['"]?\s*[:=]\s*['"]?)[^\s'",&}]+''', re.IGNORECASE), r'\1' + REDACTED),
+]
+
+
+def is_secret_field(key):
+    return key.lower() in SECRET_FIELD_NAMES or SECRET_FIELDS.search(key) is not None
+
+
+def redact(text):
+    for pattern, replacement in SECRET_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, redacted message and `extra=` fields."""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': redact(record.getMessage()),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = REDACTED if is_secret_field(key) else value
+        if record.exc_info:
+            entry['exc_info'] = redact(self.formatException(record.exc_info))
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps only a fraction of the records below WARNING for the configured loggers.
+
+    Args:
+        rates (dict[str, float]): Logger name prefix -> fraction of records to keep.
+            The longest matching prefix wins; unmatched loggers keep everything.
+    """
+
+    def __init__(self, rates=None):
+        super().__init__()
+        self.rates = sorted((rates or {}).items(), key=lambda item: len(item[0]), reverse=True)
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        for prefix, rate in self.rates:
+            if record.name == prefix or record.name.startswith(prefix + '.'):
+                return random.random() < rate
+        return True
+
+
+class QueueJSONHandler(QueueHandler):
+    """
+    Hands records to a background QueueListener that writes JSON lines to `stream`.
+
+    Unlike the stock QueueHandler, `prepare` doesn't format the record on the calling
+    thread. The listener is stopped (and the queue drained) at interpreter exit.
+    """
+
+    def __init__(self, stream=None, maxsize=10000):
+        super().__init__(queue.Queue(maxsize))
+        target = logging.StreamHandler(stream or sys.stderr)
+        target.setFormatter(JSONFormatter())
+        self.listener = QueueListener(self.queue, target, respect_handler_level=False)
+        self.listener.start()
+        atexit.register(self._stop_listener)
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Never block a request on logging; drop the record instead.
+            pass
+
+    def _stop_listener(self):
+        # QueueListener.stop() fails if called twice (close() and then atexit).
+        if self.listener._thread is not None:
+            self.listener.stop()
+
+    def close(self):
+        self._stop_listener()
+        super().close()
@@ -0,0 +1,201 @@
+"""
+In-process request metrics, exposed in the Prometheus text format.
+
+PerformanceMiddleware (backend/middleware.py) opens a RequestStats for each
+sampled request; DB queries (via a connection execute wrapper) and outbound
+HTTP calls (via auth_app.transport) add to it, and the middleware folds it into
+per-view histograms when the response is ready. Each process keeps its own
+registry, so scrape every worker (or run one worker per scrape target).
+"""
+import contextvars
+import hmac
+import threading
+import time
+from bisect import bisect_left
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseForbidden
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class RequestStats:
+    """What one request spent on the database and on outbound HTTP."""
+    __slots__ = ('db_queries', 'db_seconds', 'http_calls', 'http_seconds')
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.http_calls = 0
+        self.http_seconds = 0.0
+
+
+# The RequestStats of the sampled request being handled, or None. Context variables
+# follow sync_to_async/async_to_sync hops, so async views are covered too.
+current_stats = contextvars.ContextVar('current_request_stats', default=None)
+
+
+class Histogram:
+    """A labelled Prometheus histogram (cumulative buckets, sum and count per label value)."""
+
+    def __init__(self, name, help_text, buckets, label='view'):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.label = label
+        self._series = {}  # label value -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, label_value, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [0] * len(self.buckets) + [0.0, 0]
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def totals(self, label_value):
+        """Returns (sum, count) observed for `label_value`, (0, 0) if none."""
+        with self._lock:
+            series = self._series.get(label_value)
+            return (series[-2], series[-1]) if series else (0, 0)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            snapshot = {label_value: list(series) for label_value, series in self._series.items()}
+        for label_value, series in sorted(snapshot.items()):
+            label = f'{self.label}="{_escape(label_value)}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {series[-1]}')
+            lines.append(f'{self.name}_sum{{{label}}} {series[-2]}')
+            lines.append(f'{self.name}_count{{{label}}} {series[-1]}')
+        return '\n'.join(lines)
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+class Counter:
+    """A Prometheus counter labelled by (view, status)."""
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, view, status):
+        with self._lock:
+            key = (view, status)
+            self._values[key] = self._values.get(key, 0) + 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            snapshot = dict(self._values)
+        for (view, status), value in sorted(snapshot.items()):
+            lines.append(f'{self.name}{{view="{_escape(view)}",status="{status}"}} {value}')
+        return '\n'.join(lines)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+def _escape(value):
+    return value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+# Counted for every request; the histograms only see sampled ones (METRICS['SAMPLE_RATE']).
+requests_total = Counter('k9_requests_total', 'Requests handled, by view and response status.')
+request_seconds = Histogram('k9_request_duration_seconds', 'Wall time per sampled request.', SECONDS_BUCKETS)
+db_queries = Histogram('k9_request_db_queries', 'Database queries per sampled request.', QUERY_BUCKETS)
+db_seconds = Histogram('k9_request_db_seconds', 'Time in database queries per sampled request.', SECONDS_BUCKETS)
+http_seconds = Histogram('k9_request_http_seconds', 'Time in outbound HTTP (Google) calls per sampled request.', SECONDS_BUCKETS)
+
+METRICS = (requests_total, request_seconds, db_queries, db_seconds, http_seconds)
+
+
+def record_request(view, status, elapsed, stats):
+    """Folds a finished request into the registry (`stats` is None for unsampled requests)."""
+    requests_total.inc(view, status)
+    if stats is None:
+        return
+    request_seconds.observe(view, elapsed)
+    db_queries.observe(view, stats.db_queries)
+    db_seconds.observe(view, stats.db_seconds)
+    http_seconds.observe(view, stats.http_seconds)
+
+
+def record_http(elapsed):
+    """Adds an outbound HTTP call to the current sampled request, if any."""
+    stats = current_stats.get()
+    if stats is not None:
+        stats.http_calls += 1
+        stats.http_seconds += elapsed
+
+
+def _time_query(execute, sql, params, many, context):
+    stats = current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.db_queries += 1
+        stats.db_seconds += time.perf_counter() - started
+
+
+def install_query_timer(connection):
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+@receiver(connection_created)
+def _install_query_timer(sender, connection, **kwargs):
+    install_query_timer(connection)
+
+
+def install_query_timers():
+    """Covers connections opened before this module was imported."""
+    for connection in connections.all(initialized_only=True):
+        install_query_timer(connection)
+
+
+def render():
+    return '\n'.join(metric.render() for metric in METRICS) + '\n'
+
+
+def reset():
+    for metric in METRICS:
+        metric.clear()
+
+
+def metrics_view(request):
+    """
+    Serves the registry in the Prometheus text format.
+
+    Internal only: requires `Authorization: Bearer <METRICS['TOKEN']>`. Without a token
+    configured, only DEBUG runs serve it, to requests from settings.INTERNAL_IPS; behind a
+    proxy REMOTE_ADDR is the proxy's, so it can't be trusted in production.
+    """
+    token = settings.METRICS['TOKEN']
+    if token:
+        allowed = hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+    else:
+        allowed = bool(settings.DEBUG) and request.META.get('REMOTE_ADDR') in settings.INTERNAL_IPS
+    if not allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(render(), content_type='text/plain; version=0.0.4; charset=utf-8')
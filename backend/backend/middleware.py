@@ -0,0 +1,115 @@
+import random
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from . import metrics
+
+
+class PerformanceMiddleware:
+    """
+    Records wall time, DB queries/time and outbound HTTP time per resolved URL name.
+
+    Every request bumps `k9_requests_total`; only a METRICS['SAMPLE_RATE'] fraction of
+    them is timed into the histograms, so the cost of an unsampled request is one
+    random() call and a counter increment. Works for sync and async views. Results are
+    served by `metrics.metrics_view` (see backend/urls.py).
+
+    A streaming response's body (and the queries behind it) is produced after the view
+    returns, while the server iterates it, so its request is timed until the server
+    closes the response.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        metrics.install_query_timers()
+
+    def _start(self):
+        config = settings.METRICS
+        if not config['ENABLED'] or random.random() >= config['SAMPLE_RATE']:
+            return None, None
+        return metrics.current_stats.set(metrics.RequestStats()), time.perf_counter()
+
+    def _finish(self, request, response, token, started):
+        match = request.resolver_match
+        view = (match.view_name or match._func_path) if match else 'unresolved'
+        if token is None:
+            if settings.METRICS['ENABLED']:
+                metrics.record_request(view, response.status_code, 0.0, None)
+            return
+        stats = metrics.current_stats.get()
+        metrics.current_stats.reset(token)
+
+        def record():
+            metrics.record_request(view, response.status_code, time.perf_counter() - started, stats)
+
+        if response.streaming:
+            if response.is_async:
+                stream = _TimedAsyncStream(aiter(response.streaming_content), stats, record)
+            else:
+                stream = _TimedStream(iter(response.streaming_content), stats, record)
+            # The response registers the stream's close(), which records the request.
+            response.streaming_content = stream
+        else:
+            record()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        token, started = self._start()
+        response = self.get_response(request)
+        self._finish(request, response, token, started)
+        return response
+
+    async def __acall__(self, request):
+        token, started = self._start()
+        response = await self.get_response(request)
+        self._finish(request, response, token, started)
+        return response
+
+
+class _TimedContent:
+    """Streaming response content run with its request's RequestStats active, recorded on close()."""
+
+    def __init__(self, content, stats, record):
+        self.content = content
+        self.stats = stats
+        self.record = record
+        self.closed = False
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.record()
+
+
+# Separate classes: StreamingHttpResponse treats anything iter() accepts as sync content.
+class _TimedStream(_TimedContent):
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        # Set per chunk: the server may iterate in another context than the view ran in.
+        token = metrics.current_stats.set(self.stats)
+        try:
+            return next(self.content)
+        finally:
+            metrics.current_stats.reset(token)
+
+
+class _TimedAsyncStream(_TimedContent):
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        token = metrics.current_stats.set(self.stats)
+        try:
+            return await anext(self.content)
+        finally:
+            metrics.current_stats.reset(token)
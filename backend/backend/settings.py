@@ -13,6 +13,7 @@ import os
 from dotenv import load_dotenv
 from datetime import timedelta
 from pathlib import Path
+from .database import database_config
 
 load_dotenv()
 
@@ -26,6 +27,11 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = os.environ.get('SECRET_KEY')
 
+# Keys that encrypt GoogleCredentials secrets at rest (auth_app.fields), comma-separated, newest first.
+# To rotate: prepend a new key, run `manage.py reencrypt_google_credentials`, then drop the old key.
+# Falls back to SECRET_KEY when unset.
+FIELD_ENCRYPTION_KEYS = [key for key in os.environ.get('FIELD_ENCRYPTION_KEYS', '').split(',') if key] or [SECRET_KEY]
+
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = os.environ.get('DEBUG')
 
@@ -46,10 +52,13 @@ INSTALLED_APPS = [
     'rest_framework_simplejwt',
     'corsheaders',
     'auth_app',
-    'users_app'
+    'users_app',
+    'calendar_app'
 ]
 
 MIDDLEWARE = [
+    # First, so its timings cover the rest of the stack (see backend/middleware.py)
+    'backend.middleware.PerformanceMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -103,6 +112,8 @@ SIMPLE_JWT = {
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
     'TOKEN_USER_CLASS': 'rest_framework_simplejwt.models.TokenUser',
+    # Adds profile claims to access tokens so StatelessJWTAuthentication can skip the user lookup
+    'TOKEN_OBTAIN_SERIALIZER': 'users_app.serializers.K9TokenObtainPairSerializer',
 
     'JTI_CLAIM': 'jti',
 
@@ -111,6 +122,50 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
 }
 
+# Read-only endpoints (/users/me/, /calendar/availability/) build request.user from token claims
+# instead of loading the K9User row on every request (see users_app.authentication)
+STATELESS_JWT_AUTH = os.environ.get('STATELESS_JWT_AUTH', 'True') == 'True'
+STATELESS_JWT_STATE_TTL = 30 # Seconds is_active/credential state is cached; saves/deletes invalidate it sooner (across processes with a shared cache)
+USER_PROFILE_CACHE_TTL = 300 # Seconds a serialized /users/me/ profile is cached (invalidated on K9User/GoogleCredentials changes)
+
+# Staff user list (GET /users/, keyset paginated) and export (GET /users/export/)
+USER_LIST = {
+    'PAGE_SIZE': 100, # Users per page when ?page_size isn't given
+    'MAX_PAGE_SIZE': 1000, # Upper bound for ?page_size
+    'EXPORT_CHUNK_SIZE': 2000, # Rows fetched from the DB cursor (and written out) at a time by the export
+}
+# K9User admin changelist (see users_app.changelist)
+ADMIN_CHANGELIST = {
+    'COUNT_CACHE_SECONDS': 60, # How long a changelist's row count is reused before counting again
+    'ESTIMATE_ABOVE': 100_000, # Postgres: results the planner estimates above this many rows show the estimate instead of a count
+    'OFFSET_PAGES': 5, # Pages linked by number; past them the list goes on with keyset cursors
+}
+# Staff typeahead search (GET /users/search/, see users_app.search)
+USER_SEARCH = {
+    'LIMIT': 10, # Results when ?limit isn't given
+    'MAX_LIMIT': 50, # Upper bound for ?limit
+    'MAX_TERM_LENGTH': 100, # Longer ?q values are truncated
+}
+
+# --- Google OAuth State ---
+# How the CSRF 'state' of the Google OAuth redirect is remembered until the callback (see auth_app.state):
+# 'signed' (HMAC-signed, user-bound token; no storage), 'cache' (single-use entry in CACHE_ALIAS)
+# or 'session' (the Django session, i.e. DB writes with the engine below)
+GOOGLE_OAUTH_STATE = {
+    'BACKEND': os.environ.get('GOOGLE_OAUTH_STATE_BACKEND', 'signed'),
+    'MAX_AGE': 600, # Seconds the user has to finish the Google consent screen
+    'CACHE_ALIAS': 'default', # Used by the 'cache' backend; must be shared across workers
+}
+
+# --- Request Metrics ---
+# Per-view latency, DB and outbound HTTP histograms served at /metrics/ (Prometheus text format)
+METRICS = {
+    'ENABLED': os.environ.get('METRICS_ENABLED', 'True') == 'True',
+    'SAMPLE_RATE': float(os.environ.get('METRICS_SAMPLE_RATE', 1.0)), # Fraction of requests timed; e.g. 0.05 in production
+    'TOKEN': os.environ.get('METRICS_TOKEN'), # Scrapers send 'Authorization: Bearer <token>'; unset = INTERNAL_IPS, DEBUG only
+}
+INTERNAL_IPS = ['127.0.0.1']
+
 # --- Session Settings ---
 # Using database-backed sessions (ensure 'django.contrib.sessions' is migrated)
 SESSION_ENGINE = 'django.contrib.sessions.backends.db'
@@ -132,6 +187,51 @@ GOOGLE_OAUTH2_CLIENT_SECRET = os.environ.get('GOOGLE_OAUTH2_CLIENT_SECRET')
 # This MUST match *exactly* one of the Authorized redirect URIs in your Google Cloud Console
 GOOGLE_OAUTH2_REDIRECT_URI = 'http://localhost:5173/google-callback'
 GOOGLE_CALENDAR_SCOPES = ['https://www.googleapis.com/auth/calendar'] # Read/Write access
+# Overridable so local stand-in token servers can be used for testing/benchmarks
+GOOGLE_OAUTH2_TOKEN_URI = os.environ.get('GOOGLE_OAUTH2_TOKEN_URI', 'https://oauth2.googleapis.com/token')
+
+# Shared, connection-pooled HTTP transport for all outbound Google traffic (see auth_app.transport)
+GOOGLE_HTTP = {
+    'POOL_CONNECTIONS': 4, # Number of distinct hosts to keep pools for
+    'POOL_MAXSIZE': int(os.environ.get('GOOGLE_HTTP_POOL_MAXSIZE', 20)), # Keep-alive connections kept per host
+    'CONNECT_TIMEOUT': 3.05, # Seconds
+    'READ_TIMEOUT': 10, # Seconds
+    'RETRIES': 3, # Retries on connection errors (any method) and on read errors/429/5xx for idempotent methods only
+    'BACKOFF_FACTOR': 0.3, # Sleeps 0.3s, 0.6s, 1.2s... between retries (Retry-After is honoured)
+    'ASYNC_WORKERS': 20, # Threads the async views use for blocking Google calls (keep <= POOL_MAXSIZE)
+}
+
+# --- Google Calendar Sync Settings ---
+# Overridable so a local fake Calendar API server can be used for testing/benchmarks
+GOOGLE_CALENDAR_API_BASE = os.environ.get('GOOGLE_CALENDAR_API_BASE', 'https://www.googleapis.com/calendar/v3')
+CALENDAR_SYNC = {
+    'PAGE_SIZE': 2500, # Events per Calendar API page (Google's maximum)
+    'FULL_SYNC_DAYS_BACK': 30, # How far into the past a full sync reaches
+}
+GOOGLE_CALENDAR_BATCH_URL = os.environ.get('GOOGLE_CALENDAR_BATCH_URL', 'https://www.googleapis.com/batch/calendar/v3')
+CALENDAR_BATCH = {
+    'CONCURRENCY': 4, # Batch requests (of up to 50 calls each) in flight per bulk operation
+}
+# In-process busy timeline cache used by calendar_app.availability
+AVAILABILITY_CACHE = {
+    'TTL': 60, # Seconds a trainer's busy timeline is reused before reloading from the DB
+    'MAXSIZE': 1000, # Trainers whose timelines are kept in memory (least recently used are evicted)
+}
+# GET /calendar/events/ serves the locally synced events (see calendar_app.events)
+CALENDAR_EVENTS = {
+    'PAGE_SIZE': 250, # Events per page when ?page_size isn't given
+    'MAX_PAGE_SIZE': 2500, # Upper bound for ?page_size
+    'DEFAULT_WINDOW_DAYS': 30, # Window length when ?timeMax isn't given
+    'STALE_AFTER': int(os.environ.get('CALENDAR_EVENTS_STALE_AFTER', 300)), # Seconds after a sync before a read refreshes from Google
+    'REFRESH': os.environ.get('CALENDAR_EVENTS_REFRESH', 'background'), # 'background' (serve stale, sync in a thread), 'blocking' or 'off'
+    'REFRESH_WORKERS': 4, # Threads running background refreshes per process
+}
+
+# In-process access token cache used by auth_app.credentials
+GOOGLE_CREDENTIALS_CACHE = {
+    'MAXSIZE': 10000, # Users whose access tokens are kept in memory (least recently used are evicted)
+    'REFRESH_MARGIN': timedelta(minutes=5), # Refresh tokens this long before Google expires them
+}
 
 ROOT_URLCONF = 'backend.urls'
 
@@ -153,18 +253,85 @@ TEMPLATES = [
 WSGI_APPLICATION = 'backend.wsgi.application'
 
 
+# Cache
+# CACHE_BACKEND: 'locmem' (per process; fine for a single node), 'redis' (REDIS_URL, shared by all
+# workers) or 'fakeredis' (in-process Redis stand-in for local runs; needs the fakeredis package).
+# Used by users_app.lookups (user state/profile) and the 'cache' OAuth state backend.
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+if CACHE_BACKEND == 'locmem':
+    _default_cache = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'k9',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+elif CACHE_BACKEND in ('redis', 'fakeredis'):
+    _default_cache = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/0'),
+    }
+    if CACHE_BACKEND == 'fakeredis':
+        import fakeredis
+        _default_cache['OPTIONS'] = {'connection_class': fakeredis.FakeConnection}
+else:
+    raise ValueError(f"Unknown CACHE_BACKEND {CACHE_BACKEND!r}; use 'locmem', 'redis' or 'fakeredis'.")
+CACHES = {
+    'default': {
+        **_default_cache,
+        'KEY_PREFIX': 'k9',
+        # Bump to drop every cached entry at once (e.g. after a deploy that changes cached values)
+        'VERSION': int(os.environ.get('CACHE_VERSION', 1)),
+    },
+}
+
+
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Selected by DATABASE_ENGINE ('sqlite' with WAL by default, or 'postgres'); see backend/database.py
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': database_config(BASE_DIR),
 }
 
 AUTH_USER_MODEL = 'users_app.K9User'
 
+# Password hashing
+# https://docs.djangoproject.com/en/5.2/topics/auth/passwords/
+# The preferred hasher (first in PASSWORD_HASHERS) hashes new passwords; the others only verify
+# existing hashes, which are upgraded to the preferred hasher/parameters on the user's next login.
+# Compare costs with `python manage.py bench_password_hashers`.
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'scrypt') # 'scrypt', 'argon2' (needs argon2-cffi) or 'pbkdf2_sha256'
+# PASSWORD_HASHER_PROFILE: 'default' (Django's own parameters for each hasher) or 'fast', an explicit
+# opt-in to the cheaper parameters below (scrypt with parallelism 1 costs about a fifth of Django's
+# p=5), trading brute-force resistance for signup/login CPU.
+PASSWORD_HASHER_PROFILE = os.environ.get('PASSWORD_HASHER_PROFILE', 'default')
+_FAST_PASSWORD_HASHER_PARAMS = {
+    'scrypt': {'work_factor': 2 ** 14, 'block_size': 8, 'parallelism': 1},
+    'argon2': {'time_cost': 2, 'memory_cost': 64 * 1024, 'parallelism': 2},
+    'pbkdf2_sha256': {'iterations': 600_000},
+}
+if PASSWORD_HASHER_PROFILE == 'default':
+    PASSWORD_HASHER_PARAMS = {}
+elif PASSWORD_HASHER_PROFILE == 'fast':
+    PASSWORD_HASHER_PARAMS = _FAST_PASSWORD_HASHER_PARAMS
+else:
+    raise ValueError(f"Unknown PASSWORD_HASHER_PROFILE {PASSWORD_HASHER_PROFILE!r}; use 'default' or 'fast'.")
+_TUNED_HASHERS = {
+    'scrypt': 'users_app.hashers.TunedScryptPasswordHasher',
+    'argon2': 'users_app.hashers.TunedArgon2PasswordHasher',
+    'pbkdf2_sha256': 'users_app.hashers.TunedPBKDF2PasswordHasher',
+}
+if PASSWORD_HASHER not in _TUNED_HASHERS:
+    raise ValueError(f"Unknown PASSWORD_HASHER {PASSWORD_HASHER!r}; use 'scrypt', 'argon2' or 'pbkdf2_sha256'.")
+if PASSWORD_HASHER == 'argon2':
+    # Otherwise the first signup or password change would fail instead of startup.
+    try:
+        import argon2  # noqa: F401
+    except ImportError:
+        raise ImportError("PASSWORD_HASHER='argon2' needs the argon2-cffi package: pip install argon2-cffi") from None
+PASSWORD_HASHERS = [_TUNED_HASHERS[PASSWORD_HASHER]] + [
+    path for name, path in _TUNED_HASHERS.items() if name != PASSWORD_HASHER
+]
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -206,6 +373,14 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# LOG_HANDLER: 'json' (default) writes JSON lines from a background thread via backend.log.QueueJSONHandler,
+# so request threads never wait on log I/O; 'console' is the plain synchronous StreamHandler.
+LOG_HANDLER = os.environ.get('LOG_HANDLER', 'json')
+# Fraction of DEBUG/INFO records kept per logger (WARNING and above are always kept)
+LOG_SAMPLING = {
+    'auth_app.views': float(os.environ.get('LOG_SAMPLE_AUTH_VIEWS', 1.0)),
+}
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -215,23 +390,35 @@ LOGGING = {
             'style': '{',
         },
     },
+    'filters': {
+        'sampling': {
+            '()': 'backend.log.SamplingFilter',
+            'rates': LOG_SAMPLING,
+        },
+    },
     'handlers': {
         'console': {
             'level': 'INFO',  # Capture INFO and above (DEBUG if you want more)
             'class': 'logging.StreamHandler',
             'formatter': 'verbose',
+            'filters': ['sampling'],
+        },
+        'json': {
+            'level': 'INFO',
+            'class': 'backend.log.QueueJSONHandler',  # Formats, redacts secrets and writes on a listener thread
+            'filters': ['sampling'],
         },
     },
     'loggers': {
         '': {  # Root logger catches all
-            'handlers': ['console'],
+            'handlers': [LOG_HANDLER],
             'level': 'INFO',
             'propagate': True,
         },
         'auth_app': {  # Specific to your app
-            'handlers': ['console'],
+            'handlers': [LOG_HANDLER],
             'level': 'INFO',
             'propagate': False,
         },
     },
-}
\ No newline at end of file
+}
@@ -0,0 +1,10 @@
+from django.contrib import admin
+from .models import Event
+
+# Register your models here.
+@admin.register(Event)
+class EventAdmin(admin.ModelAdmin):
+    list_display = ('summary', 'user', 'start', 'end', 'status')
+    list_filter = ['status', 'all_day']
+    list_select_related = ['user']
+    ordering = ('-start',)
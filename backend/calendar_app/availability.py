@@ -0,0 +1,150 @@
+import threading
+import time
+from collections import OrderedDict
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+from django.conf import settings
+from .models import Event
+
+
+def _ts(value):
+    return value.timestamp()
+
+
+def _dt(value):
+    return datetime.fromtimestamp(value, tz=timezone.utc)
+
+
+class BusyTimeline:
+    """
+    One trainer's busy time as merged, non-overlapping intervals in sorted arrays.
+
+    `starts[i] < ends[i] <= starts[i + 1]` holds for every i, so both arrays are
+    sorted and a range query is two binary searches plus a walk over the
+    intervals that actually intersect the range: O(log n + k).
+    """
+
+    def __init__(self, intervals):
+        """
+        Args:
+            intervals (Iterable[tuple[float, float]]): (start, end) POSIX timestamps,
+                in any order and possibly overlapping.
+        """
+        starts, ends = [], []
+        for start, end in sorted(intervals):
+            if end <= start:
+                continue
+            if ends and start <= ends[-1]:
+                # Overlaps or touches the previous interval: extend it.
+                if end > ends[-1]:
+                    ends[-1] = end
+            else:
+                starts.append(start)
+                ends.append(end)
+        self.starts = starts
+        self.ends = ends
+
+    def __len__(self):
+        return len(self.starts)
+
+    def busy(self, start, end):
+        """Returns the busy intervals intersecting [start, end), clipped to it (timestamps)."""
+        # First interval that ends after `start`, up to the last one starting before `end`.
+        first = bisect_right(self.ends, start)
+        last = bisect_left(self.starts, end, lo=first)
+        return [
+            (max(self.starts[i], start), min(self.ends[i], end))
+            for i in range(first, last)
+        ]
+
+    def free(self, start, end, min_duration=0):
+        """Returns the gaps of at least `min_duration` seconds within [start, end) (timestamps)."""
+        slots = []
+        cursor = start
+        for busy_start, busy_end in self.busy(start, end):
+            if busy_start - cursor >= min_duration and busy_start > cursor:
+                slots.append((cursor, busy_start))
+            cursor = busy_end
+        if end - cursor >= min_duration and end > cursor:
+            slots.append((cursor, end))
+        return slots
+
+    def is_free(self, start, end):
+        return not self.busy(start, end)
+
+
+def load_timeline(user_id):
+    """Builds a BusyTimeline from a user's locally synced events (one indexed query)."""
+    rows = (
+        Event.objects
+        .filter(user_id=user_id)
+        .exclude(status='cancelled')
+        .order_by('start')
+        .values_list('start', 'end')
+    )
+    return BusyTimeline((_ts(start), _ts(end)) for start, end in rows.iterator(chunk_size=5000))
+
+
+class TimelineCache:
+    """
+    Per-process LRU cache of BusyTimelines with a TTL, invalidated after each calendar sync.
+
+    At most `maxsize` trainers' timelines are kept; the least recently used are evicted
+    first, so memory stays bounded however many trainers are looked up.
+    """
+
+    def __init__(self, ttl, maxsize):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(user_id)
+                    return entry[1]
+                del self._entries[user_id]
+        timeline = load_timeline(user_id)
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, timeline)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return timeline
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+timeline_cache = TimelineCache(ttl=settings.AVAILABILITY_CACHE['TTL'], maxsize=settings.AVAILABILITY_CACHE['MAXSIZE'])
+
+
+def get_availability(user_ids, start, end, min_duration):
+    """Computes free slots for several trainers over the same window.
+
+    Args:
+        user_ids (Iterable[int]): Trainers to look up.
+        start (datetime): Window start (aware).
+        end (datetime): Window end (aware).
+        min_duration (timedelta): Shortest slot worth returning.
+
+    Returns:
+        dict[int, dict]: Per user id, `free` and `busy` lists of (start, end) datetimes.
+    """
+    start_ts, end_ts = _ts(start), _ts(end)
+    min_seconds = min_duration.total_seconds()
+    results = {}
+    for user_id in user_ids:
+        timeline = timeline_cache.get(user_id)
+        results[user_id] = {
+            'free': [(_dt(s), _dt(e)) for s, e in timeline.free(start_ts, end_ts, min_seconds)],
+            'busy': [(_dt(s), _dt(e)) for s, e in timeline.busy(start_ts, end_ts)],
+        }
+    return results
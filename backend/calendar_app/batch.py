@@ -0,0 +1,195 @@
+import json
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from email.parser import BytesParser
+from email.policy import HTTP
+from urllib.parse import quote, urlsplit
+import requests
+from django.conf import settings
+from django.db import transaction
+from auth_app.credentials import get_access_token
+from auth_app.transport import get_session, get_timeout
+from .availability import timeline_cache
+from .sync import store_page
+import logging
+logger = logging.getLogger(__name__)
+
+# Google rejects batch requests with more than 50 calls for the Calendar API.
+MAX_BATCH_SIZE = 50
+
+INSERT, UPDATE, DELETE = 'insert', 'update', 'delete'
+
+# Result of an operation whose HTTP request failed (connection/read error). A write that
+# timed out may still have been applied by Google, so it's reported, not retried.
+TRANSPORT_ERROR_STATUS = 503
+
+
+def operation_request(operation):
+    """Maps an operation dict onto (HTTP method, path relative to the API base, JSON body or None).
+
+    Args:
+        operation (dict): `{"method": "insert"|"update"|"delete", "calendar_id": str,
+            "event_id": str (update/delete), "event": dict (insert/update)}`.
+    """
+    calendar = quote(operation.get('calendar_id', 'primary'), safe='')
+    method = operation['method']
+    if method == INSERT:
+        return 'POST', f"/calendars/{calendar}/events", operation['event']
+    event = quote(operation['event_id'], safe='')
+    if method == UPDATE:
+        # PATCH semantics so callers only need to send the fields they change.
+        return 'PATCH', f"/calendars/{calendar}/events/{event}", operation['event']
+    return 'DELETE', f"/calendars/{calendar}/events/{event}", None
+
+
+def build_batch_body(operations, boundary):
+    """Serializes operations into a multipart/mixed batch body (one application/http part each)."""
+    api_path = urlsplit(settings.GOOGLE_CALENDAR_API_BASE).path
+    lines = []
+    for index, operation in enumerate(operations):
+        method, path, body = operation_request(operation)
+        lines += [
+            f"--{boundary}",
+            "Content-Type: application/http",
+            f"Content-ID: <item-{index}>",
+            "",
+            f"{method} {api_path}{path} HTTP/1.1",
+        ]
+        if body is not None:
+            lines += ["Content-Type: application/json", "", json.dumps(body)]
+        else:
+            lines.append("")
+        lines.append("")
+    lines.append(f"--{boundary}--")
+    return "\r\n".join(lines).encode()
+
+
+def parse_batch_response(content_type, content):
+    """Splits a multipart/mixed batch response into {index: (status, parsed JSON body or None)}."""
+    message = BytesParser(policy=HTTP).parsebytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode() + content
+    )
+    results = {}
+    for part in message.iter_parts():
+        # Google answers <item-N> with <response-item-N>.
+        content_id = part.get('Content-ID', '').strip('<>')
+        index = int(content_id.rsplit('-', 1)[-1])
+        payload = (part.get_payload(decode=True) or b'').replace(b"\r\n", b"\n")
+        # Each part wraps a raw HTTP response: status line, headers, blank line, body.
+        head, _, body = payload.partition(b"\n\n")
+        status = int(head.split(b"\n", 1)[0].split()[1])
+        body = body.strip()
+        results[index] = (status, json.loads(body) if body else None)
+    return results
+
+
+def execute_batch(operations, access_token):
+    """Sends up to MAX_BATCH_SIZE operations in a single HTTP request.
+
+    Returns:
+        list[dict]: One `{"status": int, "body": dict|None}` per operation, in order.
+            A failed batch request yields its status for every operation.
+    """
+    boundary = f"batch_{uuid.uuid4().hex}"
+    response = get_session().post(
+        settings.GOOGLE_CALENDAR_BATCH_URL,
+        data=build_batch_body(operations, boundary),
+        headers={
+            'Authorization': f'Bearer {access_token}',
+            'Content-Type': f'multipart/mixed; boundary={boundary}',
+        },
+        timeout=get_timeout(),
+    )
+    if response.status_code != 200:
+        error = {'error': response.text[:500]}
+        return [{'status': response.status_code, 'body': error} for _ in operations]
+    parsed = parse_batch_response(response.headers['Content-Type'], response.content)
+    missing = (502, {'error': 'No response for this operation in the batch reply.'})
+    return [dict(zip(('status', 'body'), parsed.get(index, missing))) for index in range(len(operations))]
+
+
+def execute_single(operation, access_token):
+    """Sends one operation as its own HTTP request (the unbatched path)."""
+    method, path, body = operation_request(operation)
+    response = get_session().request(
+        method,
+        f"{settings.GOOGLE_CALENDAR_API_BASE}{path}",
+        json=body,
+        headers={'Authorization': f'Bearer {access_token}'},
+        timeout=get_timeout(),
+    )
+    return {'status': response.status_code, 'body': response.json() if response.content else None}
+
+
+def run_operations(user, operations, batched=True):
+    """Applies many event create/update/delete operations to `user`'s Google calendars.
+
+    Operations are grouped into batch requests of up to MAX_BATCH_SIZE calls, which
+    run on `CALENDAR_BATCH['CONCURRENCY']` threads at once. Successful results are
+    written through to the local Event store so reads reflect them immediately.
+
+    Args:
+        user (K9User): A user with linked GoogleCredentials.
+        operations (list[dict]): See `operation_request`.
+        batched (bool, optional): Send one HTTP request per operation instead. Only
+            useful for comparison.
+
+    Returns:
+        list[dict]: Per operation, in input order, `{"status": int, "body": dict|None}`.
+            Operations whose request failed in transport get TRANSPORT_ERROR_STATUS;
+            the others' results are kept (and stored) regardless.
+
+    Raises:
+        GoogleCredentials.DoesNotExist: If the user hasn't linked a Google account.
+        google.auth.exceptions.RefreshError: If Google refused to refresh the token.
+        requests.RequestException: If the token refresh couldn't reach Google. Nothing
+            has been sent at that point.
+    """
+    access_token = get_access_token(user)
+    if batched:
+        chunks = [operations[i:i + MAX_BATCH_SIZE] for i in range(0, len(operations), MAX_BATCH_SIZE)]
+        execute = execute_batch
+    else:
+        chunks = [[operation] for operation in operations]
+        execute = execute_each
+    with ThreadPoolExecutor(max_workers=settings.CALENDAR_BATCH['CONCURRENCY']) as pool:
+        sent = pool.map(lambda chunk: guarded(execute, chunk, access_token), chunks)
+        results = [result for chunk in sent for result in chunk]
+    store_results(user, operations, results)
+    return results
+
+
+def execute_each(operations, access_token):
+    return [execute_single(operation, access_token) for operation in operations]
+
+
+def guarded(execute, operations, access_token):
+    """Runs `execute(operations, access_token)`, turning a transport failure into per-operation errors."""
+    try:
+        return execute(operations, access_token)
+    except requests.RequestException as e:
+        logger.warning("Calendar batch of %s operations failed: %s", len(operations), e)
+        error = {'error': f'Could not reach Google Calendar: {type(e).__name__}.'}
+        return [{'status': TRANSPORT_ERROR_STATUS, 'body': error} for _ in operations]
+
+
+def store_results(user, operations, results):
+    """Mirrors successful operations into the local Event store."""
+    pages = {}
+    for operation, result in zip(operations, results):
+        if not 200 <= result['status'] < 300:
+            continue
+        calendar_id = operation.get('calendar_id', 'primary')
+        if operation['method'] == DELETE:
+            item = {'id': operation['event_id'], 'status': 'cancelled'}
+        elif result['body'] and 'start' in result['body']:
+            item = result['body']
+        else:
+            continue
+        pages.setdefault(calendar_id, []).append(item)
+    if not pages:
+        return
+    with transaction.atomic():
+        for calendar_id, items in pages.items():
+            store_page(user, calendar_id, items)
+    timeline_cache.invalidate(user.pk)
@@ -0,0 +1,183 @@
+import base64
+import hashlib
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import connections
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from users_app.models import K9User
+from .models import CalendarSyncState, Event
+from .sync import sync_calendar
+import logging
+logger = logging.getLogger(__name__)
+
+# Keyset order of the event list; id breaks ties between events starting together.
+KEYSET_ORDER = ('start', 'id')
+
+EVENT_FIELDS = ('id', 'calendar_id', 'google_id', 'status', 'summary', 'location', 'html_link', 'start', 'end', 'all_day', 'etag', 'updated')
+
+
+class InvalidCursor(ValueError):
+    """The cursor query parameter could not be decoded."""
+
+
+def encode_cursor(row):
+    """Encodes the keyset position after `row` as an opaque, URL-safe string."""
+    key = [row['start'].isoformat(), row['id']]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decodes a cursor made by encode_cursor back into (start, id).
+
+    Raises:
+        InvalidCursor: If the value wasn't produced by encode_cursor.
+    """
+    try:
+        start, event_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        start = parse_datetime(start)
+        if start is None or not isinstance(event_id, int):
+            raise TypeError
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(cursor) from e
+    return start, event_id
+
+
+def window_events(user_id, calendar_id, time_min, time_max):
+    """A user's stored events overlapping [time_min, time_max), cancelled ones excluded."""
+    return (
+        Event.objects
+        .filter(user_id=user_id, calendar_id=calendar_id, start__lt=time_max, end__gt=time_min)
+        .exclude(status='cancelled')
+    )
+
+
+def event_page(user_id, calendar_id, time_min, time_max, after, page_size):
+    """One page of events in KEYSET_ORDER, starting after the `after` key (one query).
+
+    Returns:
+        tuple[list[dict], str|None]: Calendar API-shaped event resources and the
+            cursor of the next page (None on the last page).
+    """
+    queryset = window_events(user_id, calendar_id, time_min, time_max)
+    if after is not None:
+        start, event_id = after
+        queryset = queryset.filter(Q(start__gt=start) | Q(start=start, id__gt=event_id))
+    # One extra row tells whether there's a next page.
+    rows = list(queryset.order_by(*KEYSET_ORDER).values(*EVENT_FIELDS)[:page_size + 1])
+    next_cursor = encode_cursor(rows[page_size - 1]) if len(rows) > page_size else None
+    return [event_resource(row) for row in rows[:page_size]], next_cursor
+
+
+def event_resource(row):
+    """Shapes a stored event like a Calendar API event resource (what the dashboard renders)."""
+    if row['all_day']:
+        start, end = {'date': row['start'].date().isoformat()}, {'date': row['end'].date().isoformat()}
+    else:
+        start, end = {'dateTime': row['start'].isoformat()}, {'dateTime': row['end'].isoformat()}
+    return {
+        'id': row['google_id'],
+        'calendarId': row['calendar_id'],
+        'status': row['status'],
+        'summary': row['summary'],
+        'location': row['location'],
+        'htmlLink': row['html_link'],
+        'start': start,
+        'end': end,
+        'etag': row['etag'],
+        'updated': row['updated'].isoformat(),
+    }
+
+
+def window_validators(user_id, calendar_id, time_min, time_max, query_key):
+    """Computes (ETag, Last-Modified) for a window of a user's events in one aggregate query.
+
+    Every upsert stamps `synced_at` and every delete lowers the count, so (count, latest
+    synced_at) changes whenever the window's contents do. `query_key` folds the
+    remaining request parameters (page size, cursor) into the ETag.
+
+    Returns:
+        tuple[str, datetime|None]: The (unquoted) ETag and the latest write in the
+            window, None if it's empty.
+    """
+    stats = window_events(user_id, calendar_id, time_min, time_max).aggregate(count=Count('id'), latest=Max('synced_at'))
+    latest = stats['latest']
+    raw = f"{user_id}|{calendar_id}|{time_min.isoformat()}|{time_max.isoformat()}|{query_key}|{stats['count']}|{latest.isoformat() if latest else ''}"
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest(), latest
+
+
+def last_synced_at(user_id, calendar_id):
+    """When a user's calendar was last synced from Google, None if never (one query)."""
+    return (
+        CalendarSyncState.objects
+        .filter(user_id=user_id, calendar_id=calendar_id)
+        .values_list('last_synced_at', flat=True)
+        .first()
+    )
+
+
+class BackgroundRefresher:
+    """Runs calendar syncs on a small thread pool, at most one at a time per calendar."""
+
+    def __init__(self, workers):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='calendar-refresh')
+        self._inflight = set()
+        self._lock = threading.Lock()
+
+    def submit(self, user_id, calendar_id):
+        """Queues a sync unless one is already queued or running. Returns whether it queued one."""
+        key = (user_id, calendar_id)
+        with self._lock:
+            if key in self._inflight:
+                return False
+            self._inflight.add(key)
+        self._pool.submit(self._run, key)
+        return True
+
+    def is_refreshing(self, user_id, calendar_id):
+        return (user_id, calendar_id) in self._inflight
+
+    def _run(self, key):
+        user_id, calendar_id = key
+        try:
+            sync_calendar(K9User.objects.get(pk=user_id), calendar_id)
+        except Exception as e:
+            logger.warning("Background calendar refresh failed for user %s: %s", user_id, e)
+        finally:
+            with self._lock:
+                self._inflight.discard(key)
+            # Connections are per thread; don't leave this one open between jobs.
+            connections.close_all()
+
+
+background_refresher = BackgroundRefresher(workers=settings.CALENDAR_EVENTS['REFRESH_WORKERS'])
+
+
+def ensure_fresh(user_id, calendar_id):
+    """Refreshes a user's stored calendar from Google according to CALENDAR_EVENTS['REFRESH'].
+
+    A calendar that was never synced is synced before returning in every mode but
+    'off', since there is nothing to serve yet. A stale one is then either synced in the
+    background while the stored events are served ('background', stale-while-revalidate)
+    or synced first ('blocking').
+
+    Raises:
+        GoogleCredentials.DoesNotExist: If a blocking sync was needed and the user hasn't
+            linked a Google account.
+        requests.RequestException: If a blocking sync couldn't reach Google.
+    """
+    config = settings.CALENDAR_EVENTS
+    if config['REFRESH'] == 'off':
+        return
+    synced_at = last_synced_at(user_id, calendar_id)
+    stale = synced_at is None or timezone.now() - synced_at > timedelta(seconds=config['STALE_AFTER'])
+    if not stale:
+        return
+    if synced_at is None or config['REFRESH'] == 'blocking':
+        sync_calendar(K9User.objects.get(pk=user_id), calendar_id)
+    else:
+        background_refresher.submit(user_id, calendar_id)
@@ -0,0 +1,47 @@
+import random
+import time
+from datetime import datetime, timezone
+from django.core.management.base import BaseCommand
+from calendar_app.availability import BusyTimeline
+
+
+class Command(BaseCommand):
+    help = "Benchmark the free/busy engine on synthetic calendars (no database involved)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=10000, help="Events per trainer.")
+        parser.add_argument('--trainers', type=int, default=100)
+        parser.add_argument('--queries', type=int, default=10000)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        origin = datetime(2026, 1, 1, tzinfo=timezone.utc).timestamp()
+        year = 365 * 24 * 3600
+
+        def synthetic_events():
+            # Up to 3h sessions, scattered over a year (so some overlap).
+            return [(s, s + rng.randint(15, 180) * 60) for s in (origin + rng.random() * year for _ in range(options['events']))]
+
+        calendars = [synthetic_events() for _ in range(options['trainers'])]
+        started = time.perf_counter()
+        timelines = [BusyTimeline(events) for events in calendars]
+        build = (time.perf_counter() - started) / len(timelines)
+        self.stdout.write(f"build: {build * 1000:.2f} ms per trainer ({options['events']} events -> ~{len(timelines[0])} busy blocks)")
+
+        week = 7 * 24 * 3600
+        windows = [(w, w + week) for w in (origin + rng.random() * (year - week) for _ in range(options['queries']))]
+
+        started = time.perf_counter()
+        for i, (start, end) in enumerate(windows):
+            timelines[i % len(timelines)].free(start, end, 30 * 60)
+        single = (time.perf_counter() - started) / len(windows)
+        self.stdout.write(f"single trainer, 1-week free slots: {single * 1e6:.1f} us/query")
+
+        started = time.perf_counter()
+        batch_queries = max(len(windows) // len(timelines), 1)
+        for start, end in windows[:batch_queries]:
+            for timeline in timelines:
+                timeline.free(start, end, 30 * 60)
+        batch = (time.perf_counter() - started) / batch_queries
+        self.stdout.write(f"batch of {len(timelines)} trainers, 1-week free slots: {batch * 1000:.2f} ms/query")
@@ -0,0 +1,54 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.utils import timezone
+from backend import loadtest
+from auth_app.clients import get_oauth_client
+from auth_app.models import GoogleCredentials
+from calendar_app.batch import run_operations
+from calendar_app.stubs import FakeCalendarServer
+from users_app.models import K9User
+
+BENCH_EMAIL = 'bench-calendar@k9.invalid'
+
+
+class Command(BaseCommand):
+    help = "Compare batched vs. one-by-one Google Calendar writes against a local multipart-aware fake server."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=500)
+        parser.add_argument('--latency', type=float, default=0.05, help="Fake per-request latency in seconds.")
+
+    @loadtest.throwaway_database()
+    def handle(self, *args, **options):
+        user = K9User.objects.create(
+            email=BENCH_EMAIL, username=BENCH_EMAIL, first_name='Bench', last_name='Calendar',
+        )
+        GoogleCredentials.objects.create(
+            user=user, access_token='fake-token', refresh_token='fake-refresh',
+            expires_at=timezone.now() + timedelta(hours=1), oauth_client=get_oauth_client('', '', ''),
+        )
+        start = timezone.now().replace(minute=0, second=0, microsecond=0)
+        operations = [
+            {'method': 'insert', 'event': {
+                'summary': f'Obedience class session {i}',
+                'start': {'dateTime': (start + timedelta(days=i)).isoformat()},
+                'end': {'dateTime': (start + timedelta(days=i, hours=1)).isoformat()},
+            }}
+            for i in range(options['events'])
+        ]
+        with FakeCalendarServer(latency=options['latency']) as server, override_settings(
+            GOOGLE_CALENDAR_API_BASE=server.base_url,
+            GOOGLE_CALENDAR_BATCH_URL=f'{server.base_url}/batch/calendar/v3',
+        ):
+            for label, batched in (('one-by-one', False), ('batched', True)):
+                server.requests = 0
+                started = time.perf_counter()
+                results = run_operations(user, operations, batched=batched)
+                elapsed = time.perf_counter() - started
+                ok = sum(1 for result in results if result['status'] == 200)
+                self.stdout.write(
+                    f"{label:>10}: {len(operations) / elapsed:,.0f} events/s, {server.requests} HTTP requests, "
+                    f"{ok}/{len(operations)} ok"
+                )
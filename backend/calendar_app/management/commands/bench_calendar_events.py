@@ -0,0 +1,93 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+from backend import loadtest
+from auth_app.clients import get_oauth_client
+from auth_app.models import GoogleCredentials
+from calendar_app.events import background_refresher
+from calendar_app.models import CalendarSyncState
+from calendar_app.stubs import FakeCalendarServer
+from calendar_app.sync import fetch_event_pages
+from calendar_app.views import EventListView
+from users_app.models import K9User
+
+BENCH_EMAIL = 'bench-events@k9.invalid'
+
+
+class Command(BaseCommand):
+    help = (
+        "Time GET /calendar/events/ loads (first, repeat, 304 revalidation, stale-while-revalidate) "
+        "against proxying every load to a local fake Google Calendar API."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=500, help="Events in the next 30 days.")
+        parser.add_argument('--loads', type=int, default=50, help="Dashboard loads timed per scenario.")
+        parser.add_argument('--latency', type=float, default=0.1, help="Fake Google API latency in seconds.")
+
+    @loadtest.throwaway_database()
+    def handle(self, *args, **options):
+        user = K9User.objects.create(
+            email=BENCH_EMAIL, username=BENCH_EMAIL, first_name='Bench', last_name='Events',
+        )
+        GoogleCredentials.objects.create(
+            user=user, access_token='fake-token', refresh_token='fake-refresh',
+            expires_at=timezone.now() + timedelta(hours=1), oauth_client=get_oauth_client('', '', ''),
+        )
+        self.user = user
+        self.view = EventListView.as_view()
+        self.factory = APIRequestFactory()
+        start = timezone.now().replace(minute=0, second=0, microsecond=0)
+        with FakeCalendarServer(latency=options['latency']) as server, override_settings(
+            GOOGLE_CALENDAR_API_BASE=server.base_url,
+        ):
+            for i in range(options['events']):
+                server.put_event('primary', f'event{i}', start + timedelta(hours=i * 30 * 24 / options['events']))
+            self.run(server, options)
+
+    def load(self, **headers):
+        request = self.factory.get('/calendar/events/', **headers)
+        force_authenticate(request, user=self.user)
+        return self.view(request)
+
+    def timed(self, label, loads, server, call):
+        server.requests = 0
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            for _ in range(loads):
+                response = call()
+            elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"{label:>24}: {elapsed / loads * 1000:8.1f} ms/load, {len(queries) / loads:.1f} queries/load, "
+            f"{server.requests / loads:.1f} Google requests/load"
+        )
+        return response
+
+    def run(self, server, options):
+        loads = options['loads']
+        self.timed('proxy to Google', loads, server, lambda: list(fetch_event_pages(self.user, 'primary')))
+
+        first = self.timed('first load (initial sync)', 1, server, self.load)
+        assert first.status_code == 200, first.data
+        self.stdout.write(f"{'':>24}  {len(first.data['results'])} events on the first page")
+        self.timed('repeat load', loads, server, self.load)
+
+        etag = first.headers['ETag']
+        not_modified = self.timed('revalidated (304)', loads, server, lambda: self.load(HTTP_IF_NONE_MATCH=etag))
+        assert not_modified.status_code == 304, not_modified.status_code
+
+        # Age the stored copy: the next load answers from it and refreshes in the background.
+        CalendarSyncState.objects.filter(user=self.user).update(last_synced_at=timezone.now() - timedelta(days=1))
+        server.put_event('primary', 'late-addition', timezone.now() + timedelta(hours=1))
+        stale = self.timed('stale (served, refreshing)', 1, server, lambda: self.load(HTTP_IF_NONE_MATCH=etag))
+        assert stale.status_code == 304, "The stale load must not wait for Google."
+        while background_refresher.is_refreshing(self.user.pk, 'primary'):
+            time.sleep(0.01)
+        refreshed = self.load(HTTP_IF_NONE_MATCH=etag)
+        assert refreshed.status_code == 200, "The background refresh should have changed the ETag."
+        self.stdout.write(f"{'':>24}  after the background refresh: new ETag, {len(refreshed.data['results'])} events")
@@ -0,0 +1,44 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from users_app.models import K9User
+from calendar_app.sync import sync_calendar
+import logging
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Sync Google Calendar events into the local Event store for every user with linked credentials."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', dest='emails', help="Only sync this user (repeatable).")
+        parser.add_argument('--calendar', default='primary')
+        parser.add_argument('--workers', type=int, default=8, help="Users synced concurrently.")
+
+    def handle(self, *args, **options):
+        users = K9User.objects.filter(google_credentials__isnull=False)
+        if options['emails']:
+            users = users.filter(email__in=options['emails'])
+
+        def sync(user):
+            try:
+                return sync_calendar(user, options['calendar']), None
+            except Exception as e:
+                logger.warning("Calendar sync failed for user %s: %s", user.pk, e)
+                return None, e
+
+        started = time.perf_counter()
+        synced = failed = upserted = deleted = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            for result, error in pool.map(sync, users.iterator()):
+                if error is not None:
+                    failed += 1
+                    continue
+                synced += 1
+                upserted += result['upserted']
+                deleted += result['deleted']
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"Synced {synced} calendars ({failed} failed): {upserted} events upserted, "
+            f"{deleted} deleted in {elapsed:.2f}s"
+        )
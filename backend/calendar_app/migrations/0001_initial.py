@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalendarSyncState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('calendar_id', models.CharField(default='primary', max_length=255)),
+                ('sync_token', models.TextField(blank=True, null=True)),
+                ('last_synced_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='calendar_sync_states', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'calendar_id'), name='calendar_sync_state_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Event',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('calendar_id', models.CharField(default='primary', max_length=255)),
+                ('google_id', models.CharField(max_length=1024)),
+                ('status', models.CharField(default='confirmed', max_length=20)),
+                ('summary', models.CharField(blank=True, max_length=1024)),
+                ('location', models.CharField(blank=True, max_length=1024)),
+                ('html_link', models.URLField(blank=True, max_length=1024)),
+                ('start', models.DateTimeField()),
+                ('end', models.DateTimeField()),
+                ('all_day', models.BooleanField(default=False)),
+                ('etag', models.CharField(blank=True, max_length=255)),
+                ('updated', models.DateTimeField()),
+                ('synced_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='calendar_events', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'start', 'end'], name='calendar_event_user_range_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'calendar_id', 'google_id'), name='calendar_event_unique_google_id')],
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+from django.db import models
+from users_app.models import K9User
+
+# Create your models here.
+class Event(models.Model):
+    """A Google Calendar event mirrored locally by calendar_app.sync, so reads never hit Google."""
+    user = models.ForeignKey(K9User, on_delete=models.CASCADE, related_name='calendar_events')
+    calendar_id = models.CharField(max_length=255, default='primary')
+    google_id = models.CharField(max_length=1024) # Google's event id, unique per calendar
+    status = models.CharField(max_length=20, default='confirmed')
+    summary = models.CharField(max_length=1024, blank=True)
+    location = models.CharField(max_length=1024, blank=True)
+    html_link = models.URLField(max_length=1024, blank=True)
+    start = models.DateTimeField()
+    end = models.DateTimeField()
+    all_day = models.BooleanField(default=False) # start/end are dates (end exclusive) at midnight UTC
+    etag = models.CharField(max_length=255, blank=True)
+    updated = models.DateTimeField() # Last modification time on Google's side
+    synced_at = models.DateTimeField(auto_now=True) # Last time a sync wrote this row
+
+    class Meta:
+        constraints = [
+            # Conflict target for the bulk upserts done by the sync job.
+            models.UniqueConstraint(fields=['user', 'calendar_id', 'google_id'], name='calendar_event_unique_google_id'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'start', 'end'], name='calendar_event_user_range_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.summary} ({self.start:%Y-%m-%d %H:%M})"
+
+
+class CalendarSyncState(models.Model):
+    """Incremental sync bookkeeping for one user's calendar."""
+    user = models.ForeignKey(K9User, on_delete=models.CASCADE, related_name='calendar_sync_states')
+    calendar_id = models.CharField(max_length=255, default='primary')
+    sync_token = models.TextField(null=True, blank=True) # nextSyncToken from the last completed sync
+    last_synced_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'calendar_id'], name='calendar_sync_state_unique'),
+        ]
+
+    def __str__(self):
+        return f"Sync state for {self.user.get_full_name()} ({self.calendar_id})"
@@ -0,0 +1,67 @@
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import serializers
+from .events import InvalidCursor, decode_cursor
+
+MAX_AVAILABILITY_WINDOW = timedelta(days=62)
+MAX_EVENTS_WINDOW = timedelta(days=366)
+
+
+class AvailabilityQuerySerializer(serializers.Serializer):
+    start = serializers.DateTimeField()
+    end = serializers.DateTimeField()
+    duration = serializers.IntegerField(min_value=1, max_value=24 * 60, default=30, help_text="Minimum slot length in minutes.")
+    users = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, max_length=500)
+
+    def validate(self, attrs):
+        if attrs['end'] <= attrs['start']:
+            raise serializers.ValidationError({"end": "End must be after start."})
+        if attrs['end'] - attrs['start'] > MAX_AVAILABILITY_WINDOW:
+            raise serializers.ValidationError({"end": f"Window can't exceed {MAX_AVAILABILITY_WINDOW.days} days."})
+        return attrs
+
+
+class EventsQuerySerializer(serializers.Serializer):
+    # Named like the Calendar API's events.list parameters.
+    timeMin = serializers.DateTimeField(required=False, help_text="Window start; defaults to today 00:00 UTC.")
+    timeMax = serializers.DateTimeField(required=False, help_text="Window end; defaults to DEFAULT_WINDOW_DAYS after timeMin.")
+    calendarId = serializers.CharField(max_length=255, default='primary')
+    page_size = serializers.IntegerField(min_value=1, required=False)
+    cursor = serializers.CharField(required=False)
+
+    def validate(self, attrs):
+        config = settings.CALENDAR_EVENTS
+        if 'timeMin' not in attrs:
+            # Whole days, so the default window (and with it the ETag) stays put all day.
+            attrs['timeMin'] = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        attrs.setdefault('timeMax', attrs['timeMin'] + timedelta(days=config['DEFAULT_WINDOW_DAYS']))
+        if attrs['timeMax'] <= attrs['timeMin']:
+            raise serializers.ValidationError({"timeMax": "timeMax must be after timeMin."})
+        if attrs['timeMax'] - attrs['timeMin'] > MAX_EVENTS_WINDOW:
+            raise serializers.ValidationError({"timeMax": f"Window can't exceed {MAX_EVENTS_WINDOW.days} days."})
+        attrs['page_size'] = min(attrs.get('page_size', config['PAGE_SIZE']), config['MAX_PAGE_SIZE'])
+        if 'cursor' in attrs:
+            try:
+                attrs['after'] = decode_cursor(attrs['cursor'])
+            except InvalidCursor:
+                raise serializers.ValidationError({"cursor": "Invalid cursor."})
+        return attrs
+
+
+class EventOperationSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(choices=['insert', 'update', 'delete'])
+    calendar_id = serializers.CharField(max_length=255, default='primary')
+    event_id = serializers.CharField(max_length=1024, required=False)
+    event = serializers.DictField(required=False, help_text="Google Calendar event resource (fields to set).")
+
+    def validate(self, attrs):
+        if attrs['method'] != 'insert' and not attrs.get('event_id'):
+            raise serializers.ValidationError({"event_id": f"Required for {attrs['method']}."})
+        if attrs['method'] != 'delete' and not attrs.get('event'):
+            raise serializers.ValidationError({"event": f"Required for {attrs['method']}."})
+        return attrs
+
+
+class BulkEventOperationsSerializer(serializers.Serializer):
+    operations = EventOperationSerializer(many=True, allow_empty=False, max_length=1000)
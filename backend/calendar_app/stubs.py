@@ -0,0 +1,178 @@
+"""A local stand-in for the Google Calendar API, used by the calendar tests and benchmark commands.
+
+Point the app at it with `override_settings(GOOGLE_CALENDAR_API_BASE=server.base_url)`.
+"""
+import itertools
+import json
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from email.parser import BytesParser
+from email.policy import HTTP
+from urllib.parse import parse_qs, unquote, urlsplit
+from auth_app.stubs import FakeGoogleHandler, FakeGoogleServer
+
+
+class FakeCalendarHandler(FakeGoogleHandler):
+
+    def do_GET(self):
+        self.server.record_request(self)
+        url = urlsplit(self.path)
+        parts = url.path.strip('/').split('/')
+        if len(parts) != 3 or parts[0] != 'calendars' or parts[2] != 'events':
+            return self.send_json({'error': 'not_found'}, status=404)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        time.sleep(self.server.latency)
+        status, payload = self.server.list_events(unquote(parts[1]), params)
+        self.send_json(payload, status=status)
+
+    def do_POST(self):
+        if self.path.startswith('/batch'):
+            return self.handle_batch()
+        self.handle_write('POST')
+
+    def do_PATCH(self):
+        self.handle_write('PATCH')
+
+    def do_DELETE(self):
+        self.handle_write('DELETE')
+
+    def handle_write(self, method):
+        body = self.read_body()
+        self.server.record_request(self)
+        time.sleep(self.server.latency)
+        status, payload = self.server.apply(method, urlsplit(self.path).path, json.loads(body) if body else None)
+        if payload is None:
+            self.send_response(status)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        else:
+            self.send_json(payload, status=status)
+
+    def handle_batch(self):
+        body = self.read_body()
+        self.server.record_request(self)
+        time.sleep(self.server.latency)
+        boundary = f"batch_{uuid.uuid4().hex}"
+        lines = []
+        for index, (method, path, payload) in self.parse_batch_request(body).items():
+            status, result = self.server.apply(method, path, payload)
+            lines += [
+                f"--{boundary}",
+                "Content-Type: application/http",
+                f"Content-ID: <response-item-{index}>",
+                "",
+                f"HTTP/1.1 {status} {self.responses.get(status, ('',))[0]}",
+            ]
+            if result is not None:
+                lines += ["Content-Type: application/json; charset=UTF-8", "", json.dumps(result)]
+            else:
+                lines.append("")
+            lines.append("")
+        lines.append(f"--{boundary}--")
+        response = "\r\n".join(lines).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', f'multipart/mixed; boundary={boundary}')
+        self.send_header('Content-Length', str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def parse_batch_request(self, body):
+        message = BytesParser(policy=HTTP).parsebytes(
+            f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + body
+        )
+        operations = {}
+        for part in message.iter_parts():
+            index = int(part.get('Content-ID', '').strip('<>').rsplit('-', 1)[-1])
+            raw = (part.get_payload(decode=True) or b'').replace(b"\r\n", b"\n")
+            head, _, payload = raw.partition(b"\n\n")
+            method, path, _ = head.split(b"\n", 1)[0].decode().split()
+            payload = payload.strip()
+            operations[index] = (method, path, json.loads(payload) if payload else None)
+        return operations
+
+
+class FakeCalendarServer(FakeGoogleServer):
+    """Serves events.list with pagination and sync tokens from an in-memory change log.
+
+    Every add/update/cancel gets a sequence number; a sync token is simply the
+    sequence number at the time of the listing, and incremental listings return
+    the latest version of everything changed after it. `expire_sync_tokens()`
+    makes all outstanding tokens answer 410 Gone, like Google does occasionally.
+    """
+
+    def __init__(self, latency=0.0, handler_class=FakeCalendarHandler):
+        super().__init__(latency=latency, handler_class=handler_class)
+        self.calendars = {}  # calendar_id -> {event_id: (seq, resource)}
+        self.min_sync_seq = 0
+        self._seq = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def apply(self, method, path, body):
+        """Applies an events insert (POST), patch (PATCH) or delete (DELETE) to the store."""
+        parts = [unquote(part) for part in path.strip('/').split('/')]
+        if len(parts) < 3 or parts[0] != 'calendars' or parts[2] != 'events':
+            return 404, {'error': {'code': 404, 'message': 'Not Found'}}
+        calendar_id = parts[1]
+        event_id = parts[3] if len(parts) > 3 else None
+        with self._lock:
+            events = self.calendars.setdefault(calendar_id, {})
+            if method == 'POST':
+                event_id = uuid.uuid4().hex
+                resource = {'id': event_id, 'status': 'confirmed', **body}
+            else:
+                if event_id not in events or events[event_id][1]['status'] == 'cancelled':
+                    return 404, {'error': {'code': 404, 'message': 'Not Found'}}
+                if method == 'DELETE':
+                    events[event_id] = (next(self._seq), {'id': event_id, 'status': 'cancelled'})
+                    return 204, None
+                resource = {**events[event_id][1], **body}
+            seq = next(self._seq)
+            resource.update(etag=f'"{seq}"', updated=datetime.now(timezone.utc).isoformat())
+            events[event_id] = (seq, resource)
+            return 200, resource
+
+    def put_event(self, calendar_id, event_id, start, duration=timedelta(hours=1), **fields):
+        with self._lock:
+            seq = next(self._seq)
+            resource = {
+                'id': event_id,
+                'status': 'confirmed',
+                'summary': fields.pop('summary', f'Event {event_id}'),
+                'start': {'dateTime': start.isoformat()},
+                'end': {'dateTime': (start + duration).isoformat()},
+                'updated': datetime.now(timezone.utc).isoformat(),
+                'etag': f'"{seq}"',
+                **fields,
+            }
+            self.calendars.setdefault(calendar_id, {})[event_id] = (seq, resource)
+            return resource
+
+    def cancel_event(self, calendar_id, event_id):
+        with self._lock:
+            self.calendars[calendar_id][event_id] = (next(self._seq), {'id': event_id, 'status': 'cancelled'})
+
+    def expire_sync_tokens(self):
+        with self._lock:
+            self.min_sync_seq = next(self._seq)
+
+    def list_events(self, calendar_id, params):
+        with self._lock:
+            current_seq = next(self._seq)
+            entries = sorted(self.calendars.get(calendar_id, {}).values(), key=lambda entry: entry[0])
+        if 'syncToken' in params:
+            since = int(params['syncToken'])
+            if since < self.min_sync_seq:
+                return 410, {'error': {'code': 410, 'message': 'Sync token is no longer valid, a full sync is required.'}}
+            items = [resource for seq, resource in entries if seq > since]
+        else:
+            items = [resource for _, resource in entries if resource['status'] != 'cancelled']
+        offset = int(params.get('pageToken', 0))
+        limit = int(params.get('maxResults', 250))
+        page = {'kind': 'calendar#events', 'items': items[offset:offset + limit]}
+        if offset + limit < len(items):
+            page['nextPageToken'] = str(offset + limit)
+        else:
+            page['nextSyncToken'] = str(current_seq)
+        return 200, page
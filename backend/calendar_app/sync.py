@@ -0,0 +1,155 @@
+from datetime import datetime, time, timedelta, timezone
+from urllib.parse import quote
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone as django_timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from auth_app.credentials import get_access_token
+from auth_app.transport import get_session, get_timeout
+from .availability import timeline_cache
+from .models import CalendarSyncState, Event
+import logging
+logger = logging.getLogger(__name__)
+
+# Columns rewritten when an already-stored event comes back from Google.
+EVENT_UPDATE_FIELDS = ['status', 'summary', 'location', 'html_link', 'start', 'end', 'all_day', 'etag', 'updated', 'synced_at']
+
+
+class SyncTokenExpired(Exception):
+    """Google answered 410 Gone: the stored sync token is no longer valid."""
+
+
+def parse_event_time(value):
+    """Parses a Calendar API start/end object into (aware datetime, all_day)."""
+    if 'dateTime' in value:
+        return parse_datetime(value['dateTime']), False
+    return datetime.combine(parse_date(value['date']), time.min, tzinfo=timezone.utc), True
+
+
+def event_from_resource(user, calendar_id, resource):
+    """Builds an unsaved Event from a Calendar API event resource (non-cancelled)."""
+    start, all_day = parse_event_time(resource['start'])
+    end, _ = parse_event_time(resource['end'])
+    return Event(
+        user=user,
+        calendar_id=calendar_id,
+        google_id=resource['id'],
+        status=resource.get('status', 'confirmed'),
+        summary=resource.get('summary', '')[:1024],
+        location=resource.get('location', '')[:1024],
+        html_link=resource.get('htmlLink', ''),
+        start=start,
+        end=end,
+        all_day=all_day,
+        etag=resource.get('etag', ''),
+        updated=parse_datetime(resource['updated']) if 'updated' in resource else django_timezone.now(),
+    )
+
+
+def fetch_event_pages(user, calendar_id, sync_token=None):
+    """Yields pages of the Calendar API events.list response, following nextPageToken.
+
+    Raises:
+        SyncTokenExpired: If `sync_token` was rejected with 410 Gone.
+        requests.HTTPError: For any other unsuccessful response.
+    """
+    config = settings.CALENDAR_SYNC
+    url = f"{settings.GOOGLE_CALENDAR_API_BASE}/calendars/{quote(calendar_id, safe='')}/events"
+    params = {'maxResults': config['PAGE_SIZE'], 'singleEvents': 'true'}
+    if sync_token:
+        # Incremental sync: only changes since the token, including deletions (status=cancelled).
+        params['syncToken'] = sync_token
+    else:
+        time_min = django_timezone.now() - timedelta(days=config['FULL_SYNC_DAYS_BACK'])
+        params['timeMin'] = time_min.isoformat()
+    headers = {'Authorization': f'Bearer {get_access_token(user)}'}
+    session = get_session()
+
+    while True:
+        response = session.get(url, params=params, headers=headers, timeout=get_timeout())
+        if response.status_code == 410:
+            raise SyncTokenExpired(calendar_id)
+        response.raise_for_status()
+        page = response.json()
+        yield page
+        if not page.get('nextPageToken'):
+            return
+        params['pageToken'] = page['nextPageToken']
+
+
+def store_page(user, calendar_id, items):
+    """Upserts a page of event resources in one statement and deletes the cancelled ones.
+
+    Returns:
+        tuple[int, int]: (events upserted, events deleted)
+    """
+    events = {}
+    cancelled = set()
+    for resource in items:
+        if resource.get('status') == 'cancelled':
+            cancelled.add(resource['id'])
+            events.pop(resource['id'], None)
+        else:
+            # The same event can appear twice in a page; the later entry wins.
+            events[resource['id']] = event_from_resource(user, calendar_id, resource)
+            cancelled.discard(resource['id'])
+    if events:
+        Event.objects.bulk_create(
+            events.values(),
+            update_conflicts=True,
+            unique_fields=['user', 'calendar_id', 'google_id'],
+            update_fields=EVENT_UPDATE_FIELDS,
+        )
+    deleted = 0
+    if cancelled:
+        deleted, _ = Event.objects.filter(user=user, calendar_id=calendar_id, google_id__in=cancelled).delete()
+    return len(events), deleted
+
+
+def sync_calendar(user, calendar_id='primary'):
+    """Brings the local Event store for one of `user`'s calendars up to date with Google.
+
+    The first run lists the calendar in full (from FULL_SYNC_DAYS_BACK onwards) and
+    stores Google's nextSyncToken; later runs only fetch what changed since then.
+    If Google invalidates the sync token, a full sync runs again. Each page is
+    written in its own short transaction with a single bulk upsert, so no DB lock
+    is held while waiting on Google. The sync token is only saved once every page
+    is stored; re-applying a partially stored run is harmless.
+
+    Args:
+        user (K9User): A user with linked GoogleCredentials.
+        calendar_id (str, optional): Google calendar id. Defaults to 'primary'.
+
+    Returns:
+        dict: Counts of `upserted` and `deleted` events and whether this was a `full` sync.
+    """
+    state, _ = CalendarSyncState.objects.get_or_create(user=user, calendar_id=calendar_id)
+    try:
+        return _sync(user, state)
+    except SyncTokenExpired:
+        logger.info("Sync token expired for user %s calendar %s; running a full sync", user.pk, calendar_id)
+        state.sync_token = None
+        return _sync(user, state)
+
+
+def _sync(user, state):
+    full = not state.sync_token
+    started_at = django_timezone.now()
+    upserted = deleted = 0
+    next_sync_token = None
+    for page in fetch_event_pages(user, state.calendar_id, state.sync_token):
+        with transaction.atomic():
+            page_upserted, page_deleted = store_page(user, state.calendar_id, page.get('items', []))
+        upserted += page_upserted
+        deleted += page_deleted
+        next_sync_token = page.get('nextSyncToken') or next_sync_token
+    if full:
+        # Anything a full listing didn't return no longer exists on Google's side.
+        stale, _ = Event.objects.filter(user=user, calendar_id=state.calendar_id, synced_at__lt=started_at).delete()
+        deleted += stale
+    state.sync_token = next_sync_token
+    state.last_synced_at = django_timezone.now()
+    state.save(update_fields=['sync_token', 'last_synced_at'])
+    if upserted or deleted:
+        timeline_cache.invalidate(user.pk)
+    return {'upserted': upserted, 'deleted': deleted, 'full': full}
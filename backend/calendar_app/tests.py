@@ -0,0 +1,366 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+import requests
+from google.auth.exceptions import RefreshError
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from auth_app.clients import get_oauth_client
+from auth_app.models import GoogleCredentials
+from users_app.models import K9User
+from . import availability, batch, events
+from .availability import BusyTimeline, TimelineCache, get_availability
+from .models import CalendarSyncState, Event
+from .stubs import FakeCalendarServer
+from .sync import sync_calendar
+
+
+def insert_operations(count):
+    start = timezone.now().replace(minute=0, second=0, microsecond=0)
+    return [
+        {'method': 'insert', 'event': {
+            'summary': f'Session {i}',
+            'start': {'dateTime': (start + timedelta(days=i)).isoformat()},
+            'end': {'dateTime': (start + timedelta(days=i, hours=1)).isoformat()},
+        }}
+        for i in range(count)
+    ]
+
+
+def create_trainer():
+    user = K9User.objects.create_user(
+        username='trainer@example.com', email='trainer@example.com', password='x',
+        first_name='Tess', last_name='Trainer',
+    )
+    GoogleCredentials.objects.create(
+        user=user, access_token='fake-token', refresh_token='fake-refresh',
+        expires_at=timezone.now() + timedelta(hours=1), oauth_client=get_oauth_client('', '', ''),
+    )
+    return user
+
+
+class BulkEventOperationsTests(TestCase):
+    def setUp(self):
+        self.user = create_trainer()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_failed_batch_reports_per_operation_errors_and_keeps_the_rest(self):
+        execute_batch = batch.execute_batch
+
+        def flaky_execute_batch(operations, access_token):
+            if operations[0]['event']['summary'] == f'Session {batch.MAX_BATCH_SIZE}':
+                raise requests.ConnectionError("connection reset")
+            return execute_batch(operations, access_token)
+
+        operations = insert_operations(batch.MAX_BATCH_SIZE + 10)
+        with FakeCalendarServer() as server, override_settings(
+            GOOGLE_CALENDAR_API_BASE=server.base_url,
+            GOOGLE_CALENDAR_BATCH_URL=f'{server.base_url}/batch/calendar/v3',
+        ), mock.patch.object(batch, 'execute_batch', flaky_execute_batch):
+            response = self.client.post(reverse('calendar_events_bulk'), {'operations': operations}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        statuses = [result['status'] for result in response.data['results']]
+        self.assertEqual(statuses, [200] * batch.MAX_BATCH_SIZE + [batch.TRANSPORT_ERROR_STATUS] * 10)
+        # What Google applied is mirrored locally even though a later batch failed.
+        self.assertEqual(Event.objects.filter(user=self.user).count(), batch.MAX_BATCH_SIZE)
+
+    def test_token_failures_map_to_403_and_503(self):
+        for error, expected_status in ((RefreshError('revoked'), 403), (requests.ConnectionError('down'), 503)):
+            with self.subTest(error=type(error).__name__), mock.patch.object(batch, 'get_access_token', side_effect=error):
+                response = self.client.post(
+                    reverse('calendar_events_bulk'), {'operations': insert_operations(1)}, format='json',
+                )
+            self.assertEqual(response.status_code, expected_status)
+
+
+class BusyTimelineTests(SimpleTestCase):
+    def test_merges_overlapping_and_adjacent_intervals(self):
+        # Unsorted input; (5, 5) and (9, 8) are empty and dropped.
+        timeline = BusyTimeline([(30, 40), (0, 10), (5, 15), (15, 20), (5, 5), (9, 8), (35, 38), (50, 60)])
+        self.assertEqual(timeline.starts, [0, 30, 50])
+        self.assertEqual(timeline.ends, [20, 40, 60])
+        self.assertEqual(len(timeline), 3)
+
+    def test_busy_is_clipped_to_the_range(self):
+        timeline = BusyTimeline([(0, 20), (30, 40), (50, 60)])
+        self.assertEqual(timeline.busy(10, 55), [(10, 20), (30, 40), (50, 55)])
+        # Half-open: an interval ending exactly at `start` or starting at `end` doesn't intersect.
+        self.assertEqual(timeline.busy(20, 30), [])
+        self.assertTrue(timeline.is_free(20, 30))
+        self.assertFalse(timeline.is_free(19, 30))
+        self.assertEqual(BusyTimeline([]).busy(0, 100), [])
+
+    def test_free_slots(self):
+        timeline = BusyTimeline([(10, 20), (30, 35), (50, 60)])
+        self.assertEqual(timeline.free(0, 100), [(0, 10), (20, 30), (35, 50), (60, 100)])
+        self.assertEqual(timeline.free(15, 55), [(20, 30), (35, 50)])
+        self.assertEqual(timeline.free(10, 20), [])
+        self.assertEqual(BusyTimeline([]).free(0, 100), [(0, 100)])
+
+    def test_free_slots_shorter_than_min_duration_are_skipped(self):
+        timeline = BusyTimeline([(10, 20), (30, 35), (50, 60)])
+        self.assertEqual(timeline.free(0, 100, min_duration=15), [(35, 50), (60, 100)])
+        self.assertEqual(timeline.free(0, 100, min_duration=10), [(0, 10), (20, 30), (35, 50), (60, 100)])
+
+    def test_all_day_event_covers_the_whole_day(self):
+        day = datetime(2026, 3, 2, tzinfo=dt_timezone.utc).timestamp()
+        hour = 3600
+        # An all-day event is stored as midnight to the next midnight.
+        timeline = BusyTimeline([(day, day + 24 * hour), (day + 9 * hour, day + 10 * hour)])
+        self.assertEqual(len(timeline), 1)
+        self.assertEqual(timeline.free(day - 2 * hour, day + 26 * hour), [(day - 2 * hour, day), (day + 24 * hour, day + 26 * hour)])
+
+
+class AvailabilityTests(TestCase):
+    def setUp(self):
+        self.user = create_trainer()
+        self.other = K9User.objects.create_user(
+            username='other@example.com', email='other@example.com', password='x', first_name='Otto', last_name='Other',
+        )
+        # A fresh cache, so timelines cached by earlier tests (ids get reused) aren't served.
+        self.enterContext(mock.patch.object(availability, 'timeline_cache', TimelineCache(ttl=60, maxsize=10)))
+        self.day = datetime(2026, 3, 2, tzinfo=dt_timezone.utc)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add_event(self, user, google_id, start, end, **fields):
+        return Event.objects.create(
+            user=user, google_id=google_id, start=self.day + start, end=self.day + end, updated=timezone.now(), **fields,
+        )
+
+    def test_get_availability(self):
+        hour = timedelta(hours=1)
+        self.add_event(self.user, 'a', 9 * hour, 10 * hour)
+        self.add_event(self.user, 'b', 9.5 * hour, 11 * hour)
+        self.add_event(self.user, 'c', 12 * hour, 13 * hour, status='cancelled')
+        self.add_event(self.user, 'd', 13 * hour, 13.75 * hour)
+
+        result = get_availability([self.user.pk, self.other.pk], self.day + 8 * hour, self.day + 14 * hour, timedelta(minutes=30))
+        self.assertEqual(result[self.user.pk], {
+            'busy': [(self.day + 9 * hour, self.day + 11 * hour), (self.day + 13 * hour, self.day + 13.75 * hour)],
+            # The cancelled event doesn't count; the 15 minutes left after 13:45 are under the minimum.
+            'free': [(self.day + 8 * hour, self.day + 9 * hour), (self.day + 11 * hour, self.day + 13 * hour)],
+        })
+        self.assertEqual(result[self.other.pk], {'busy': [], 'free': [(self.day + 8 * hour, self.day + 14 * hour)]})
+
+    def query(self, **params):
+        return self.client.get(reverse('availability'), {
+            'start': self.day.isoformat(), 'end': (self.day + timedelta(days=1)).isoformat(), **params,
+        })
+
+    def test_view_defaults_to_the_requesting_user(self):
+        self.add_event(self.user, 'a', timedelta(hours=9), timedelta(hours=10))
+        response = self.query()
+        self.assertEqual(response.status_code, 200)
+        [result] = response.data['results']
+        self.assertEqual(result['user'], self.user.pk)
+        self.assertEqual(len(result['busy']), 1)
+        self.assertEqual(len(result['free']), 2)
+
+    def test_only_staff_can_look_up_other_trainers(self):
+        response = self.query(users=[self.user.pk, self.other.pk])
+        self.assertEqual(response.status_code, 403)
+        # Naming only themselves is allowed.
+        self.assertEqual(self.query(users=[self.user.pk]).status_code, 200)
+
+        self.user.is_staff = True
+        self.user.save()
+        response = self.query(users=[self.user.pk, self.other.pk])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['user'] for result in response.data['results']], [self.user.pk, self.other.pk])
+
+
+class TimelineCacheTests(TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = TimelineCache(ttl=60, maxsize=2)
+        for user_id in (1, 2, 1, 3):
+            cache.get(user_id)
+        self.assertEqual(len(cache), 2)
+        with self.assertNumQueries(0):
+            cache.get(1)
+            cache.get(3)
+        with self.assertNumQueries(1):
+            cache.get(2)
+
+    def test_expired_entries_are_reloaded(self):
+        cache = TimelineCache(ttl=0, maxsize=2)
+        cache.get(1)
+        with self.assertNumQueries(1):
+            cache.get(1)
+
+
+class CalendarSyncTests(TestCase):
+    def setUp(self):
+        self.user = create_trainer()
+        self.server = self.enterContext(FakeCalendarServer())
+        # Two events per page, so every listing below spans several pages.
+        self.enterContext(override_settings(
+            GOOGLE_CALENDAR_API_BASE=self.server.base_url, CALENDAR_SYNC={'PAGE_SIZE': 2, 'FULL_SYNC_DAYS_BACK': 30},
+        ))
+        self.start = timezone.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=1)
+
+    def stored(self):
+        return dict(Event.objects.filter(user=self.user).values_list('google_id', 'summary'))
+
+    def sync_token(self):
+        return CalendarSyncState.objects.get(user=self.user, calendar_id='primary').sync_token
+
+    def test_full_then_incremental_sync(self):
+        for i in range(3):
+            self.server.put_event('primary', f'e{i}', self.start + timedelta(hours=i), summary=f'Session {i}')
+        day = self.start.date()
+        _, holiday = self.server.apply('POST', '/calendars/primary/events', {
+            'summary': 'Holiday', 'start': {'date': day.isoformat()}, 'end': {'date': (day + timedelta(days=1)).isoformat()},
+        })
+
+        self.assertEqual(sync_calendar(self.user), {'upserted': 4, 'deleted': 0, 'full': True})
+        self.assertEqual(self.stored(), {'e0': 'Session 0', 'e1': 'Session 1', 'e2': 'Session 2', holiday['id']: 'Holiday'})
+        stored_holiday = Event.objects.get(google_id=holiday['id'])
+        self.assertTrue(stored_holiday.all_day)
+        self.assertEqual(stored_holiday.end - stored_holiday.start, timedelta(days=1))
+        first_token = self.sync_token()
+        self.assertIsNotNone(first_token)
+
+        self.server.put_event('primary', 'e1', self.start, summary='Session 1 (moved)')
+        self.server.cancel_event('primary', 'e2')
+        self.server.put_event('primary', 'e3', self.start, summary='Session 3')
+        self.server.requests = 0
+        self.assertEqual(sync_calendar(self.user), {'upserted': 2, 'deleted': 1, 'full': False})
+        self.assertEqual(self.stored(), {'e0': 'Session 0', 'e1': 'Session 1 (moved)', holiday['id']: 'Holiday', 'e3': 'Session 3'})
+        # Only the three changes were listed: two pages.
+        self.assertEqual(self.server.requests, 2)
+        self.assertNotEqual(self.sync_token(), first_token)
+
+        self.assertEqual(sync_calendar(self.user), {'upserted': 0, 'deleted': 0, 'full': False})
+
+    def test_expired_sync_token_falls_back_to_a_full_sync(self):
+        for i in range(3):
+            self.server.put_event('primary', f'e{i}', self.start + timedelta(hours=i), summary=f'Session {i}')
+        sync_calendar(self.user)
+        self.server.cancel_event('primary', 'e0')
+        self.server.put_event('primary', 'e1', self.start, summary='Session 1 (moved)')
+        self.server.expire_sync_tokens()
+
+        with self.assertLogs('calendar_app.sync', 'INFO'):
+            result = sync_calendar(self.user)
+        # The full listing no longer has e0, so the stale local copy is removed.
+        self.assertEqual(result, {'upserted': 2, 'deleted': 1, 'full': True})
+        self.assertEqual(self.stored(), {'e1': 'Session 1 (moved)', 'e2': 'Session 2'})
+        self.assertEqual(sync_calendar(self.user), {'upserted': 0, 'deleted': 0, 'full': False})
+
+
+class EventListTests(TestCase):
+    def setUp(self):
+        self.user = create_trainer()
+        self.server = self.enterContext(FakeCalendarServer())
+        self.enterContext(override_settings(GOOGLE_CALENDAR_API_BASE=self.server.base_url))
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.start = timezone.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=1)
+        self.window = {'timeMin': (self.start - timedelta(days=1)).isoformat(), 'timeMax': (self.start + timedelta(days=7)).isoformat()}
+
+    def refresh_mode(self, mode):
+        return override_settings(CALENDAR_EVENTS={**settings.CALENDAR_EVENTS, 'REFRESH': mode})
+
+    def add_event(self, google_id, start):
+        return Event.objects.create(
+            user=self.user, google_id=google_id, start=start, end=start + timedelta(hours=1), updated=timezone.now(),
+        )
+
+    def list_events(self, **params):
+        return self.client.get(reverse('calendar_events'), {**self.window, **params})
+
+    def test_pages_through_events_with_the_same_start(self):
+        for i in range(5):
+            self.add_event(f'tied{i}', self.start)
+        self.add_event('later', self.start + timedelta(hours=2))
+        self.add_event('earlier', self.start - timedelta(hours=2))
+        Event.objects.create(
+            user=self.user, google_id='cancelled', status='cancelled', start=self.start, end=self.start + timedelta(hours=1),
+            updated=timezone.now(),
+        )
+
+        seen, cursor = [], None
+        with self.refresh_mode('off'):
+            while True:
+                response = self.list_events(page_size=2, **({'cursor': cursor} if cursor else {}))
+                self.assertEqual(response.status_code, 200)
+                self.assertLessEqual(len(response.data['results']), 2)
+                seen += [event['id'] for event in response.data['results']]
+                cursor = response.data['next']
+                if cursor is None:
+                    break
+        self.assertEqual(seen, ['earlier', 'tied0', 'tied1', 'tied2', 'tied3', 'tied4', 'later'])
+
+    def test_conditional_requests(self):
+        event = self.add_event('e0', self.start)
+        self.add_event('e1', self.start)
+        with self.refresh_mode('off'):
+            response = self.list_events()
+            etag = response.headers['ETag']
+            self.assertIn('Last-Modified', response.headers)
+            with self.assertNumQueries(1):
+                # The aggregate behind the ETag only; the page isn't read.
+                response = self.client.get(reverse('calendar_events'), self.window, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            # A different page of the same window has its own ETag.
+            self.assertNotEqual(self.list_events(page_size=1).headers['ETag'], etag)
+
+            event.delete()
+            response = self.client.get(reverse('calendar_events'), self.window, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual([event['id'] for event in response.data['results']], ['e1'])
+            etag = response.headers['ETag']
+
+        self.server.put_event('primary', 'e1', self.start, summary='Renamed')
+        with self.refresh_mode('blocking'):
+            response = self.client.get(reverse('calendar_events'), self.window, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([event['summary'] for event in response.data['results']], ['Renamed'])
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_invalid_queries(self):
+        too_long = {'timeMin': self.start.isoformat(), 'timeMax': (self.start + timedelta(days=400)).isoformat()}
+        inverted = {'timeMin': self.start.isoformat(), 'timeMax': (self.start - timedelta(hours=1)).isoformat()}
+        with self.refresh_mode('off'):
+            for params, field in (({'cursor': 'not-a-cursor'}, 'cursor'), (too_long, 'timeMax'), (inverted, 'timeMax')):
+                with self.subTest(params=params):
+                    response = self.list_events(**params)
+                    self.assertEqual(response.status_code, 400)
+                    self.assertIn(field, response.data)
+
+    def test_refresh_modes(self):
+        self.server.put_event('primary', 'e0', self.start, summary='Session 0')
+
+        with self.refresh_mode('off'):
+            self.assertEqual(self.list_events().data['results'], [])
+        self.assertEqual(self.server.requests, 0)
+
+        # Never synced: even the background mode syncs before answering.
+        with self.refresh_mode('background'):
+            self.assertEqual([event['id'] for event in self.list_events().data['results']], ['e0'])
+            requests_made = self.server.requests
+            # Fresh: Google isn't contacted.
+            self.list_events()
+            self.assertEqual(self.server.requests, requests_made)
+
+        self.server.put_event('primary', 'e1', self.start, summary='Session 1')
+        CalendarSyncState.objects.filter(user=self.user).update(last_synced_at=timezone.now() - timedelta(days=1))
+        with self.refresh_mode('background'), mock.patch.object(events, 'background_refresher') as refresher:
+            # Stale: the stored events are served while a sync is queued.
+            self.assertEqual([event['id'] for event in self.list_events().data['results']], ['e0'])
+        refresher.submit.assert_called_once_with(self.user.pk, 'primary')
+
+        with self.refresh_mode('blocking'):
+            self.assertEqual([event['id'] for event in self.list_events().data['results']], ['e0', 'e1'])
+
+    def test_unlinked_account(self):
+        # Runs the token cache eviction, which waits for a commit that TestCase never makes.
+        with self.captureOnCommitCallbacks(execute=True):
+            GoogleCredentials.objects.filter(user=self.user).delete()
+        with self.refresh_mode('blocking'):
+            self.assertEqual(self.list_events().status_code, 403)
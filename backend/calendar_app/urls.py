@@ -0,0 +1,8 @@
+from django.urls import path
+from .views import AvailabilityView, BulkEventOperationsView, EventListView
+
+urlpatterns = [
+    path('availability/', AvailabilityView.as_view(), name='availability'),
+    path('events/', EventListView.as_view(), name='calendar_events'),
+    path('events/bulk/', BulkEventOperationsView.as_view(), name='calendar_events_bulk'),
+]
@@ -0,0 +1,133 @@
+from datetime import timedelta
+import requests
+from google.auth.exceptions import RefreshError
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from rest_framework import permissions, status
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from auth_app.models import GoogleCredentials
+from users_app.authentication import read_only_authentication_classes
+from .availability import get_availability
+from .batch import run_operations
+from .events import ensure_fresh, event_page, window_validators
+from .serializers import AvailabilityQuerySerializer, BulkEventOperationsSerializer, EventsQuerySerializer
+import logging
+logger = logging.getLogger(__name__)
+
+
+class AvailabilityView(APIView):
+    """
+    Returns open (and busy) slots computed from locally synced calendar events.
+
+    Query parameters: `start`, `end` (ISO 8601), `duration` (minimum slot length in
+    minutes, default 30) and, for staff only, one or more `users` ids to look up
+    several trainers at once. Without `users`, the requesting user is used.
+    """
+    authentication_classes = read_only_authentication_classes()
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        query = AvailabilityQuerySerializer(data={
+            **request.query_params.dict(),
+            'users': request.query_params.getlist('users'),
+        })
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        user_ids = params.get('users') or [request.user.pk]
+        if not request.user.is_staff and set(user_ids) != {request.user.pk}:
+            raise PermissionDenied("Only staff can look up other trainers' availability.")
+
+        availability = get_availability(user_ids, params['start'], params['end'], timedelta(minutes=params['duration']))
+        return Response({
+            "start": params['start'],
+            "end": params['end'],
+            "results": [
+                {
+                    "user": user_id,
+                    "free": [{"start": s, "end": e} for s, e in slots['free']],
+                    "busy": [{"start": s, "end": e} for s, e in slots['busy']],
+                }
+                for user_id, slots in availability.items()
+            ],
+        }, status=status.HTTP_200_OK)
+
+
+class EventListView(APIView):
+    """
+    Lists the requesting user's Google Calendar events from the local event store.
+
+    Query parameters: `timeMin`/`timeMax` (ISO 8601; default today 00:00 UTC plus
+    CALENDAR_EVENTS['DEFAULT_WINDOW_DAYS']), `calendarId` (default 'primary'),
+    `page_size` and `cursor`. Events overlapping the window are returned in start order
+    as `{"results": [...], "next": cursor|null}`; pass `next` back as `?cursor=` for the
+    following page. Each result is shaped like a Calendar API event resource.
+
+    Responses carry an ETag and Last-Modified, and a matching `If-None-Match` gets a 304
+    without the page being read. Google is only contacted when the stored copy is older
+    than CALENDAR_EVENTS['STALE_AFTER'] (see `events.ensure_fresh`).
+    """
+    authentication_classes = read_only_authentication_classes()
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        query = EventsQuerySerializer(data=request.query_params.dict())
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        user_id, calendar_id = request.user.pk, params['calendarId']
+
+        try:
+            ensure_fresh(user_id, calendar_id)
+        except (GoogleCredentials.DoesNotExist, RefreshError):
+            # Not linked, or Google revoked the refresh token: the user has to reconnect.
+            return Response({"error": "Google account not connected."}, status=status.HTTP_403_FORBIDDEN)
+        except requests.RequestException as e:
+            logger.warning("Calendar sync failed for user %s: %s", user_id, e)
+            return Response({"error": "Could not reach Google Calendar."}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        etag, last_modified = window_validators(
+            user_id, calendar_id, params['timeMin'], params['timeMax'],
+            query_key=f"{params['page_size']}|{params.get('cursor', '')}",
+        )
+        last_modified = last_modified and int(last_modified.timestamp())
+        response = get_conditional_response(request, etag=quote_etag(etag), last_modified=last_modified)
+        if response is None:
+            results, next_cursor = event_page(
+                user_id, calendar_id, params['timeMin'], params['timeMax'], params.get('after'), params['page_size'],
+            )
+            response = Response({"results": results, "next": next_cursor}, status=status.HTTP_200_OK)
+        response.headers['ETag'] = quote_etag(etag)
+        if last_modified:
+            response.headers['Last-Modified'] = http_date(last_modified)
+        # Private to the user, and always revalidated (cheaply, via the ETag).
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class BulkEventOperationsView(APIView):
+    """
+    Creates, updates and deletes many Google Calendar events in one call.
+
+    Operations are sent to Google in batch requests of up to 50 and the response
+    lists one `{"status", "body"}` result per operation, in request order, so
+    partial failures can be retried individually. A batch that couldn't reach Google
+    reports 503 for each of its operations while the others' results still count.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = BulkEventOperationsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            results = run_operations(request.user, serializer.validated_data['operations'])
+        except (GoogleCredentials.DoesNotExist, RefreshError):
+            # Not linked, or Google revoked the refresh token: the user has to reconnect.
+            return Response({"error": "Google account not connected."}, status=status.HTTP_403_FORBIDDEN)
+        except requests.RequestException as e:
+            # The access token couldn't be refreshed; no operation was sent.
+            logger.warning("Bulk calendar operations failed for user %s: %s", request.user.pk, e)
+            return Response({"error": "Could not reach Google Calendar."}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        return Response({"results": results}, status=status.HTTP_200_OK)
@@ -1,5 +1,7 @@
 from django.contrib import admin
+from .changelist import EstimatedCountPaginator, KeysetChangeList
 from .models import K9User
+from .search import matching_entries
 
 # Register your models here.
 @admin.register(K9User)
@@ -7,5 +9,19 @@ class K9UserAdmin(admin.ModelAdmin):
     # --- List View Customization (Client list page) ---
     list_display = ('last_name', 'first_name', 'email', 'phone_number', 'is_active')
     list_filter = ['is_active']
-    search_fields = ('last_name', 'email', 'phone_number')  # Enable searching across these fields
-    ordering = ('last_name', 'first_name') # Default sorting 
\ No newline at end of file
+    search_fields = ('last_name', 'email', 'phone_number')  # Enables the search box; see get_search_results
+    ordering = ('last_name', 'first_name', 'id') # Default sorting; id makes it total, so keyset pages work (listing.KEYSET_ORDER)
+
+    # --- Large tables: no full-table COUNT(*) per page load, keyset cursors past the first pages ---
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+    def get_search_results(self, request, queryset, search_term):
+        # Uses the indexed search entries (users_app.search) instead of OR'd '%term%' scans
+        # of search_fields. First name and phone digits ("555 0100") match too.
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(pk__in=matching_entries(search_term).values('user_id')), False
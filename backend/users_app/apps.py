@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class UsersAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users_app'
+
+    def ready(self):
+        # Connects the signal receivers that invalidate the cached user state and profiles
+        # and keep the search entries current
+        from . import lookups, search  # noqa: F401
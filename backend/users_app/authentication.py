@@ -0,0 +1,68 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from rest_framework.settings import api_settings as drf_settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from .lookups import user_state
+from .models import K9User
+
+
+class ClaimsUser(TokenUser):
+    """
+    A user built from access token claims (see K9TokenObtainPairSerializer) instead of a DB row.
+
+    Reads like a K9User for serialization (id, username, email, first/last name) and
+    permission checks, but has no DB representation: it can't be saved or used as a
+    foreign key value.
+    """
+
+    def __init__(self, token, user_id, state):
+        super().__init__(token)
+        # Same type as K9User.pk, so comparisons and cache keys match real users.
+        self.id = user_id
+        # Permission flags come from the DB-backed state, never from the token: they must
+        # follow demotion or deactivation before the token (or its refresh token) expires.
+        self.is_active = state.is_active
+        self.is_staff = state.is_staff
+        self.is_superuser = state.is_superuser
+        self.has_google_credentials = state.has_google_credentials
+
+    def get_full_name(self):
+        return f"{self.first_name or ''} {self.last_name or ''}".strip()
+
+    def __str__(self):
+        return self.get_full_name()
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that skips loading the K9User row on every request.
+
+    The identity comes from the signed token claims; `is_active`, `is_staff`,
+    `is_superuser` and credential presence are looked up through the shared
+    `user_state` cache (users_app.lookups), so a warm request costs no queries. Use it
+    for read-only views that don't need a model instance.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            # Recent simplejwt versions store the id as a string; the cache is keyed by pk.
+            user_id = K9User._meta.pk.to_python(validated_token[api_settings.USER_ID_CLAIM])
+        except (KeyError, ValidationError) as e:
+            raise InvalidToken("Token contained no recognizable user identification") from e
+        state = user_state.get(user_id)
+        if state is None:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+        if not state.is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        return ClaimsUser(validated_token, user_id, state)
+
+
+def read_only_authentication_classes():
+    """Authentication classes for read-only views; stateless when STATELESS_JWT_AUTH is on."""
+    if settings.STATELESS_JWT_AUTH:
+        return [StatelessJWTAuthentication]
+    return drf_settings.DEFAULT_AUTHENTICATION_CLASSES
+
@@ -0,0 +1,130 @@
+"""
+Admin changelist pieces for large tables: estimated/cached row counts and keyset paging.
+
+The stock changelist counts the filtered rows (and, with show_full_result_count,
+the whole table) on every load and pages with OFFSET, so the count and deep
+pages both scan most of the table. Here:
+
+- EstimatedCountPaginator takes the planner's estimate on Postgres when it's
+  large, and otherwise counts once per ADMIN_CHANGELIST['COUNT_CACHE_SECONDS']
+  (the count shown can lag writes by that much).
+- KeysetChangeList links the first ADMIN_CHANGELIST['OFFSET_PAGES'] pages by
+  number and goes on from there with `?after=<cursor>` in listing.KEYSET_ORDER,
+  an index range scan however deep the page. It falls back to numbered pages
+  when the list is sorted by another column (?o=).
+"""
+import hashlib
+import json
+from django.conf import settings
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import PAGE_VAR, ChangeList
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from backend.caching import CachedLookup
+from .listing import KEYSET_ORDER, InvalidCursor, after_q, decode_cursor, encode_cursor
+
+# Query string parameter holding the keyset cursor of the page to show.
+CURSOR_VAR = 'after'
+
+
+def planner_estimate(queryset):
+    """The planner's row estimate for `queryset` on Postgres (from EXPLAIN, no scan), else None."""
+    if connections[queryset.db].vendor != 'postgresql':
+        return None
+    plan = json.loads(queryset.explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def cached_count(queryset):
+    """`queryset.count()`, shared across requests and processes for COUNT_CACHE_SECONDS."""
+    sql, params = queryset.query.sql_with_params()
+    digest = hashlib.blake2b(f'{queryset.db}|{sql}|{params!r}'.encode(), digest_size=16).hexdigest()
+    lookup = CachedLookup(
+        'admin-count', lambda _: queryset.count(), timeout=settings.ADMIN_CHANGELIST['COUNT_CACHE_SECONDS'],
+    )
+    return lookup.get(digest)
+
+
+class EstimatedCountPaginator(Paginator):
+    """A Paginator whose count is an estimate (Postgres, large results) or a cached count."""
+    count_is_estimate = False
+
+    @cached_property
+    def count(self):
+        estimate = planner_estimate(self.object_list)
+        if estimate is not None and estimate > settings.ADMIN_CHANGELIST['ESTIMATE_ABOVE']:
+            self.count_is_estimate = True
+            return estimate
+        return cached_count(self.object_list)
+
+
+class KeysetChangeList(ChangeList):
+    """A ChangeList that pages past the first few pages with keyset cursors (see module docstring).
+
+    Needs the model admin's ordering to be listing.KEYSET_ORDER and no list_editable
+    (cursor pages are lists, not querysets).
+    """
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    def get_query_string(self, new_params=None, remove=None):
+        # Sorting, filtering and page links start over from the first page.
+        return super().get_query_string(new_params, [*(remove or []), CURSOR_VAR])
+
+    def get_results(self, request):
+        # get_ordering() appends the queryset's own ordering, so fields can repeat; repeats
+        # don't change the order.
+        ordering = tuple(dict.fromkeys(self.queryset.query.order_by))
+        self.keyset = not self.list_editable and not self.show_all and ordering == KEYSET_ORDER
+        self.next_cursor = None
+        cursor = request.GET.get(CURSOR_VAR) if self.keyset else None
+        self.on_cursor_page = cursor is not None
+        if cursor is None:
+            super().get_results(request)
+            if self.keyset and self.multi_page and self.page_num < self.paginator.num_pages:
+                # Evaluates the page now; the template reuses the fetched rows.
+                self.next_cursor = self._cursor_after(list(self.result_list))
+            return
+        try:
+            after = decode_cursor(cursor)
+        except InvalidCursor:
+            raise IncorrectLookupParameters
+        paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+        # One extra row tells whether there's a next page.
+        rows = list(self.queryset.filter(after_q(after))[:self.list_per_page + 1])
+        if len(rows) > self.list_per_page:
+            rows = rows[:self.list_per_page]
+            self.next_cursor = self._cursor_after(rows)
+        self.result_count = paginator.count
+        self.show_full_result_count = self.model_admin.show_full_result_count
+        self.full_result_count = self.root_queryset.count() if self.show_full_result_count else None
+        self.show_admin_actions = not self.show_full_result_count or bool(self.full_result_count)
+        self.result_list = rows
+        self.can_show_all = False
+        self.multi_page = True
+        self.paginator = paginator
+
+    def _cursor_after(self, rows):
+        if not rows:
+            return None
+        last = rows[-1]
+        return encode_cursor({field: getattr(last, field) for field in KEYSET_ORDER})
+
+    @property
+    def page_links(self):
+        """(number, query string, is current) for the numbered pages linked in keyset mode."""
+        offset_pages = min(self.paginator.num_pages, settings.ADMIN_CHANGELIST['OFFSET_PAGES'])
+        return [
+            (number, self.get_query_string({PAGE_VAR: number}), not self.on_cursor_page and number == self.page_num)
+            for number in range(1, offset_pages + 1)
+        ]
+
+    @property
+    def next_query_string(self):
+        if self.next_cursor is None:
+            return None
+        return self.get_query_string({CURSOR_VAR: self.next_cursor}, remove=[PAGE_VAR])
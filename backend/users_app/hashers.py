@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher,
+    PBKDF2PasswordHasher,
+    ScryptPasswordHasher,
+)
+
+# Each hasher keeps its parent's `algorithm` name, so hashes produced by Django's stock
+# hashers still verify. When a stored hash was made with other parameters (or another
+# algorithm) than the preferred hasher's, Django re-hashes it on the next successful
+# login (see `AbstractBaseUser.check_password`), so retuning only needs a settings change.
+
+
+def _params(algorithm):
+    return settings.PASSWORD_HASHER_PARAMS.get(algorithm, {})
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return _params(self.algorithm).get('iterations', PBKDF2PasswordHasher.iterations)
+
+
+class TunedScryptPasswordHasher(ScryptPasswordHasher):
+    @property
+    def work_factor(self):
+        return _params(self.algorithm).get('work_factor', ScryptPasswordHasher.work_factor)
+
+    @property
+    def block_size(self):
+        return _params(self.algorithm).get('block_size', ScryptPasswordHasher.block_size)
+
+    @property
+    def parallelism(self):
+        return _params(self.algorithm).get('parallelism', ScryptPasswordHasher.parallelism)
+
+    @property
+    def maxmem(self):
+        # OpenSSL caps scrypt at 32 MiB by default; work factors above 2**14 need more.
+        return _params(self.algorithm).get('maxmem', ScryptPasswordHasher.maxmem)
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """Requires the `argon2-cffi` package."""
+
+    @property
+    def time_cost(self):
+        return _params(self.algorithm).get('time_cost', Argon2PasswordHasher.time_cost)
+
+    @property
+    def memory_cost(self):
+        return _params(self.algorithm).get('memory_cost', Argon2PasswordHasher.memory_cost)
+
+    @property
+    def parallelism(self):
+        return _params(self.algorithm).get('parallelism', Argon2PasswordHasher.parallelism)
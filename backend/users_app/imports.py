@@ -0,0 +1,153 @@
+"""
+Bulk import of existing clients as K9Users (`manage.py import_clients`).
+
+Rows are streamed from a CSV or NDJSON file and handled in chunks: each chunk is
+validated, checked for existing emails with one query and inserted with one
+`bulk_create` in its own transaction. Only the current chunk is held in memory,
+and invalid or duplicate rows are reported and skipped rather than failing the run.
+"""
+import csv
+import json
+import secrets
+from dataclasses import dataclass, field
+from itertools import islice
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX, make_password
+from django.contrib.auth.tokens import default_token_generator
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from rest_framework.exceptions import ValidationError
+from .models import K9User
+from .search import index_users
+from .serializers import ClientImportSerializer
+
+
+def read_rows(stream, fmt):
+    """Yields (line number, dict) for each row of a CSV (with a header) or NDJSON stream."""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_num, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        # Anything but an object is passed on as None and reported by the importer.
+        yield line_num, row if isinstance(row, dict) else None
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+@dataclass
+class ImportStats:
+    rows: int = 0
+    created: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    errors: list = field(default_factory=list)  # (line number, message) of the current chunk
+
+
+class ClientImporter:
+    """
+    Inserts validated rows as K9Users, one chunk at a time.
+
+    Args:
+        hash_passwords (bool): Hash a row's `password` column when present. Hashing is
+            deliberately slow (tens of ms per row), so by default every imported user
+            gets an unusable password and sets one through an invite link instead.
+        invite_writer (csv.writer, optional): Receives `email, uid, token` per created
+            user, for building set-password links with Django's default token generator.
+    """
+
+    def __init__(self, hash_passwords=False, invite_writer=None):
+        self.hash_passwords = hash_passwords
+        self.invite_writer = invite_writer
+        # One serializer validates every row: building one per row deep-copies its
+        # fields each time, which was most of the import's CPU time.
+        self.serializer = ClientImportSerializer()
+
+    def import_chunk(self, rows, stats):
+        """Validates and inserts one chunk of (line number, dict) rows, updating `stats`."""
+        stats.rows += len(rows)
+        stats.errors = []
+        candidates = {}
+        for line_num, row in rows:
+            if row is None:
+                stats.invalid += 1
+                stats.errors.append((line_num, "Not a JSON object."))
+                continue
+            try:
+                data = self.serializer.run_validation(row)
+            except ValidationError as e:
+                stats.invalid += 1
+                stats.errors.append((line_num, json.dumps(e.detail)))
+                continue
+            email = K9User.objects.normalize_email(data['email'])
+            key = email.lower()
+            if key in candidates:
+                stats.duplicates += 1
+                stats.errors.append((line_num, f"Duplicate of an earlier row: {email}"))
+                continue
+            candidates[key] = (line_num, email, data)
+
+        # One query per chunk, on the LOWER(email) unique index.
+        existing = set(
+            K9User.objects.annotate(email_lower=Lower('email'))
+            .filter(email_lower__in=candidates)
+            .values_list('email_lower', flat=True)
+        )
+        users = []
+        for key, (line_num, email, data) in candidates.items():
+            if key in existing:
+                stats.duplicates += 1
+                stats.errors.append((line_num, f"Email already in use: {email}"))
+                continue
+            password = data.get('password') if self.hash_passwords else None
+            if not password:
+                # Same format as make_password(None), minus its slow character-by-character RNG.
+                password = UNUSABLE_PASSWORD_PREFIX + secrets.token_urlsafe(30)
+            else:
+                password = make_password(password)
+            users.append(K9User(
+                username=email, email=email,
+                first_name=data['first_name'], last_name=data['last_name'],
+                phone_number=data.get('phone_number') or None,
+                password=password,
+            ))
+        if not users:
+            return
+        with transaction.atomic():
+            # Rows that appeared since the existence check (e.g. a concurrent signup) are skipped.
+            K9User.objects.bulk_create(users, ignore_conflicts=True)
+            created = self.created_users(users)
+            # bulk_create skips the save signal that normally maintains these.
+            index_users(created)
+        stats.created += len(created)
+        stats.duplicates += len(users) - len(created)
+        if self.invite_writer is not None:
+            for user in created:
+                uid = urlsafe_base64_encode(force_bytes(user.pk))
+                self.invite_writer.writerow([user.email, uid, default_token_generator.make_token(user)])
+
+    def created_users(self, users):
+        """Reads back the rows `bulk_create(ignore_conflicts=True)` actually inserted.
+
+        It doesn't set primary keys, and skipped rows must be told apart from users who
+        already had the email. Every password value is unique (random for unusable
+        passwords, salted otherwise), so matching on (email, password) does both. Only
+        the fields the search entry and the invite token generator use are loaded.
+        """
+        return list(
+            K9User.objects
+            .filter(email__in=[user.email for user in users], password__in=[user.password for user in users])
+            .only('id', 'email', 'password', 'last_login', 'first_name', 'last_name', 'phone_number')
+        )
@@ -0,0 +1,80 @@
+import base64
+import json
+from django.db.models import Q
+from .lookups import with_credential_flag
+from .models import K9User
+
+# Same order as K9UserAdmin.ordering, with id as the tie-breaker that makes it a total order.
+# Backed by the users_k9user_name_order_idx index.
+KEYSET_ORDER = ('last_name', 'first_name', 'id')
+
+LIST_FIELDS = ('id', 'username', 'email', 'first_name', 'last_name', 'has_google_credentials')
+
+
+class InvalidCursor(ValueError):
+    """The cursor query parameter could not be decoded."""
+
+
+def encode_cursor(row):
+    """Encodes the keyset position after `row` as an opaque, URL-safe string."""
+    key = [row[field] for field in KEYSET_ORDER]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decodes a cursor made by encode_cursor back into (last_name, first_name, id).
+
+    Raises:
+        InvalidCursor: If the value wasn't produced by encode_cursor.
+    """
+    try:
+        last_name, first_name, user_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if not (isinstance(last_name, str) and isinstance(first_name, str) and isinstance(user_id, int)):
+            raise TypeError
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(cursor) from e
+    return last_name, first_name, user_id
+
+
+def user_rows(after=None):
+    """Users in KEYSET_ORDER as dicts of LIST_FIELDS, starting after the `after` key.
+
+    Credential presence is an EXISTS subquery in the same statement, so a page is one query
+    no matter how many users it holds.
+    """
+    queryset = with_credential_flag(K9User.objects.all())
+    if after is not None:
+        queryset = queryset.filter(after_q(after))
+    return queryset.order_by(*KEYSET_ORDER).values(*LIST_FIELDS)
+
+
+def after_q(after):
+    """Users past the (last_name, first_name, id) key `after` in KEYSET_ORDER."""
+    last_name, first_name, user_id = after
+    # (last_name, first_name, id) > after, spelled out for backends without row comparisons.
+    # The redundant last_name >= bound lets the index seek to the page instead of scanning
+    # (and discarding) every earlier entry; an OR alone isn't a range the planner can use.
+    return Q(last_name__gte=last_name) & (
+        Q(last_name__gt=last_name)
+        | Q(last_name=last_name, first_name__gt=first_name)
+        | Q(last_name=last_name, first_name=first_name, id__gt=user_id)
+    )
+
+
+def stream_page(after, page_size):
+    """Yields one page of the user list as JSON text chunks.
+
+    Output is `{"results": [...], "next": cursor|null}`; rows are serialized as they come
+    off the DB cursor instead of building the whole page in memory first. One extra row is
+    fetched to know whether there's a next page.
+    """
+    yield '{"results": ['
+    last = None
+    rows = user_rows(after)[:page_size + 1].iterator(chunk_size=min(page_size + 1, 2000))
+    for index, row in enumerate(rows):
+        if index == page_size:
+            yield f'], "next": {json.dumps(encode_cursor(last))}}}'
+            return
+        yield (', ' if index else '') + json.dumps(row)
+        last = row
+    yield '], "next": null}'
@@ -0,0 +1,72 @@
+from typing import NamedTuple
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from auth_app.models import GoogleCredentials
+from backend.caching import CachedLookup
+from .models import K9User
+from .serializers import UserSerializer
+
+
+class UserState(NamedTuple):
+    """The parts of a user that can change during an access token's lifetime."""
+    is_active: bool
+    is_staff: bool
+    is_superuser: bool
+    has_google_credentials: bool
+
+
+def with_credential_flag(queryset):
+    """Annotates `has_google_credentials` with an EXISTS subquery (no extra query per user)."""
+    return queryset.annotate(has_google_credentials=Exists(GoogleCredentials.objects.filter(user=OuterRef('pk'))))
+
+
+def load_user_state(user_id):
+    """Returns the user's UserState, or None if the user doesn't exist (one query)."""
+    row = (
+        with_credential_flag(K9User.objects.filter(pk=user_id))
+        .values_list('is_active', 'is_staff', 'is_superuser', 'has_google_credentials')
+        .first()
+    )
+    return UserState(*row) if row else None
+
+
+def load_user_profile(user_id):
+    """Returns the UserSerializer data for a user as a plain dict, or None if the user doesn't exist."""
+    user = with_credential_flag(K9User.objects.filter(pk=user_id)).first()
+    return dict(UserSerializer(user).data) if user else None
+
+
+# Consulted by StatelessJWTAuthentication on every request.
+# v2: UserState gained is_staff/is_superuser.
+user_state = CachedLookup('user-state', load_user_state, timeout=settings.STATELESS_JWT_STATE_TTL, version=2)
+# Backs GET /users/me/.
+user_profile = CachedLookup('user-profile', load_user_profile, timeout=settings.USER_PROFILE_CACHE_TTL)
+
+
+def invalidate_user(user_id):
+    user_state.invalidate(user_id)
+    user_profile.invalidate(user_id)
+
+
+def invalidate_user_on_commit(user_id):
+    """Invalidates the user's entries once the current transaction commits (at once outside one).
+
+    Invalidating earlier would let a concurrent request refill them from the rows as they
+    were before the commit, and they'd stay stale until their TTL.
+    """
+    transaction.on_commit(lambda: invalidate_user(user_id))
+
+
+@receiver([post_save, post_delete], sender=K9User)
+def _invalidate_user(sender, instance, **kwargs):
+    # Covers profile edits, deactivation (is_active=False), staff changes and deletion.
+    invalidate_user_on_commit(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=GoogleCredentials)
+def _invalidate_credentials(sender, instance, **kwargs):
+    # Linking/unlinking Google changes has_google_credentials; token refreshes land here too.
+    invalidate_user_on_commit(instance.user_id)
@@ -0,0 +1,101 @@
+import statistics
+import time
+from django.contrib import admin
+from django.contrib.admin.sites import site
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from backend import loadtest
+from users_app.changelist import CURSOR_VAR
+from users_app.listing import KEYSET_ORDER, after_q, encode_cursor
+from users_app.models import K9User
+
+BENCH_DOMAIN = 'bench-admin.k9.invalid'
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez', 'Martinez']
+
+
+class StockK9UserAdmin(admin.ModelAdmin):
+    """K9UserAdmin's list as it was before users_app.changelist: exact counts, OFFSET pages."""
+    list_display = ('last_name', 'first_name', 'email', 'phone_number', 'is_active')
+    list_filter = ['is_active']
+    ordering = ('last_name', 'first_name')
+
+
+class Command(BaseCommand):
+    help = (
+        "Time K9User admin changelist page loads (query + render) over N throwaway users: the stock "
+        "changelist (exact counts, OFFSET pages) against K9UserAdmin (cached/estimated counts, keyset pages)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1_000_000)
+        parser.add_argument('--repeat', type=int, default=5, help="Loads per page; the median is reported.")
+
+    @loadtest.throwaway_database()
+    def handle(self, *args, **options):
+        for offset in range(0, options['users'], 20_000):
+            K9User.objects.bulk_create(
+                K9User(
+                    username=f'u{i}@{BENCH_DOMAIN}', email=f'u{i}@{BENCH_DOMAIN}', password='!',
+                    first_name=f'First{i % 7919}', last_name=f'{LAST_NAMES[i % len(LAST_NAMES)]}{i % 1009}',
+                    is_active=i % 10 != 0,
+                )
+                for i in range(offset, min(offset + 20_000, options['users']))
+            )
+        self.stdout.write(f"Created {options['users']:,} users")
+        self.repeat = options['repeat']
+        self.staff = K9User(pk=0, username='staff', is_staff=True, is_superuser=True)
+        self.factory = RequestFactory()
+        stock, current = StockK9UserAdmin(K9User, site), site._registry[K9User]
+        per_page = current.list_per_page
+        for label, filters in [('all users', {}), ('is_active=1', {'is_active__exact': '1'})]:
+            queryset = K9User.objects.order_by(*KEYSET_ORDER)
+            if filters:
+                queryset = queryset.filter(is_active=True)
+            total = queryset.count()
+            deep = (total * 9 // 10) // per_page * per_page  # ~90% into the list, on a page boundary
+            before_deep = queryset.values(*KEYSET_ORDER)[deep - 1]
+            self.stdout.write(f"\n{label} ({total:,} rows, {per_page} per page):")
+            self.time('stock, page 1', stock, filters)
+            self.time('keyset, page 1', current, filters)
+            self.time(f'stock, page {deep // per_page + 1:,} (OFFSET)', stock, {**filters, 'p': deep // per_page + 1})
+            cursor_params = {**filters, CURSOR_VAR: encode_cursor(before_deep)}
+            cl = self.load(current, cursor_params).context_data['cl']
+            if not cl.on_cursor_page or cl.result_list[0].pk != queryset.values_list('pk', flat=True)[deep]:
+                raise CommandError("The cursor page doesn't start where the OFFSET page does")
+            self.time('keyset, same page (cursor)', current, cursor_params)
+        self.explain()
+
+    def load(self, model_admin, params):
+        request = self.factory.get('/admin/users_app/k9user/', params)
+        request.user = self.staff
+        response = model_admin.changelist_view(request)
+        response.render()
+        assert response.status_code == 200, response.status_code
+        return response
+
+    def time(self, label, model_admin, params):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            self.load(model_admin, params)
+            first = time.perf_counter() - started
+        timings = []
+        for _ in range(self.repeat):
+            started = time.perf_counter()
+            self.load(model_admin, params)
+            timings.append(time.perf_counter() - started)
+        self.stdout.write(
+            f"  {label:>32}: first load {first * 1000:8.1f} ms, then median {statistics.median(timings) * 1000:8.1f} ms, "
+            f"{len(queries)} queries"
+        )
+
+    def explain(self):
+        """Prints SQLite's plan for a deep keyset page within the is_active filter."""
+        if connection.vendor != 'sqlite':
+            return
+        queryset = K9User.objects.filter(after_q(('Smith500', 'First1', 0)), is_active=True).order_by(*KEYSET_ORDER)[:101]
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            self.stdout.write("\nplan, keyset page within is_active=1: " + '; '.join(row[-1] for row in cursor.fetchall()))
@@ -0,0 +1,61 @@
+import resource
+import time
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+from backend import loadtest
+from users_app.models import K9User
+from users_app.views import UserExportView
+
+BENCH_DOMAIN = 'bench-export.k9.invalid'
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KiB on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Command(BaseCommand):
+    help = "Measure rows/s and peak RSS of the streaming client export vs. loading every user as a model instance."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200_000)
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    @loadtest.throwaway_database()
+    def handle(self, *args, **options):
+        total = options['users']
+        # Seeded in batches so seeding doesn't raise the peak RSS being measured.
+        for offset in range(0, total, 10_000):
+            K9User.objects.bulk_create(
+                K9User(
+                    username=f'u{i}@{BENCH_DOMAIN}', email=f'u{i}@{BENCH_DOMAIN}',
+                    first_name=f'First{i}', last_name=f'Last{i % 1000}', password='!', phone_number='555-0100',
+                )
+                for i in range(offset, min(offset + 10_000, total))
+            )
+        view = UserExportView.as_view()
+        staff = K9User(pk=0, username='staff', is_staff=True)
+        rows = K9User.objects.count()
+        with override_settings(USER_LIST={'PAGE_SIZE': 100, 'MAX_PAGE_SIZE': 1000, 'EXPORT_CHUNK_SIZE': options['chunk_size']}):
+            for fmt in ('ndjson', 'csv'):
+                request = APIRequestFactory().get('/users/export/', {'output': fmt})
+                force_authenticate(request, user=staff)
+                before = peak_rss_mb()
+                started = time.perf_counter()
+                size = sum(len(chunk) for chunk in view(request).streaming_content)
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"stream {fmt:>6}: {rows / elapsed:,.0f} rows/s, {size / 1e6:.1f} MB out, "
+                    f"peak RSS {peak_rss_mb():.0f} MB (+{peak_rss_mb() - before:.0f} MB)"
+                )
+
+        # For comparison: what loading full model instances (as the admin does per page) costs for all rows.
+        before = peak_rss_mb()
+        started = time.perf_counter()
+        users = list(K9User.objects.all())
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"list(K9User.objects.all()): {len(users) / elapsed:,.0f} rows/s, "
+            f"peak RSS {peak_rss_mb():.0f} MB (+{peak_rss_mb() - before:.0f} MB)"
+        )
@@ -0,0 +1,49 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from users_app.hashers import TunedArgon2PasswordHasher, TunedPBKDF2PasswordHasher, TunedScryptPasswordHasher
+
+CANDIDATES = [
+    ('pbkdf2_sha256', {'iterations': 1_000_000}),
+    ('pbkdf2_sha256', {'iterations': 600_000}),
+    ('scrypt', {'work_factor': 2 ** 14, 'block_size': 8, 'parallelism': 5}),
+    ('scrypt', {'work_factor': 2 ** 14, 'block_size': 8, 'parallelism': 1}),
+    ('scrypt', {'work_factor': 2 ** 15, 'block_size': 8, 'parallelism': 1, 'maxmem': 64 * 1024 * 1024}),
+    ('argon2', {'time_cost': 2, 'memory_cost': 100 * 1024, 'parallelism': 8}),
+    ('argon2', {'time_cost': 2, 'memory_cost': 64 * 1024, 'parallelism': 2}),
+    ('argon2', {'time_cost': 3, 'memory_cost': 19 * 1024, 'parallelism': 1}),
+]
+HASHERS = {
+    'pbkdf2_sha256': TunedPBKDF2PasswordHasher,
+    'scrypt': TunedScryptPasswordHasher,
+    'argon2': TunedArgon2PasswordHasher,
+}
+
+
+class Command(BaseCommand):
+    help = "Measure hash cost per password hasher configuration and the signup throughput it allows per CPU core."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, default=10)
+
+    def handle(self, *args, **options):
+        params = settings.PASSWORD_HASHER_PARAMS.get(settings.PASSWORD_HASHER) or "(Django's defaults)"
+        self.stdout.write(f"Configured: {settings.PASSWORD_HASHER} {params}, profile {settings.PASSWORD_HASHER_PROFILE!r}")
+        for algorithm, params in CANDIDATES:
+            with override_settings(PASSWORD_HASHER_PARAMS={algorithm: params}):
+                hasher = HASHERS[algorithm]()
+                try:
+                    hasher.encode('warm-up-password', hasher.salt())
+                except ValueError as e:  # argon2-cffi not installed
+                    self.stdout.write(f"{algorithm:>14} {params}: skipped ({e})")
+                    continue
+                started = time.perf_counter()
+                for _ in range(options['rounds']):
+                    encoded = hasher.encode('correct horse battery staple', hasher.salt())
+                per_hash = (time.perf_counter() - started) / options['rounds']
+                assert hasher.verify('correct horse battery staple', encoded)
+            self.stdout.write(
+                f"{algorithm:>14} {params}: {per_hash * 1000:7.1f} ms/hash, "
+                f"~{1 / per_hash:6.1f} signups/s per core"
+            )
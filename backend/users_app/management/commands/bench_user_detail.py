@@ -0,0 +1,42 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from backend import loadtest
+from users_app.authentication import StatelessJWTAuthentication
+from users_app.models import K9User
+from users_app.serializers import K9TokenObtainPairSerializer
+from users_app.views import UserDetailView
+
+BENCH_EMAIL = 'bench-me@k9.invalid'
+
+
+class Command(BaseCommand):
+    help = "Compare GET /users/me/ throughput and queries with DB-backed vs. stateless JWT authentication."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+
+    @loadtest.throwaway_database()
+    def handle(self, *args, **options):
+        user = K9User.objects.create(
+            email=BENCH_EMAIL, username=BENCH_EMAIL, first_name='Bench', last_name='Me',
+        )
+        token = K9TokenObtainPairSerializer.get_token(user).access_token
+        factory = APIRequestFactory()
+        for label, authentication in (('db lookup', JWTAuthentication), ('stateless', StatelessJWTAuthentication)):
+            view = UserDetailView.as_view(authentication_classes=[authentication])
+            # Warm-up request also fills the stateless user state cache.
+            view(factory.get('/users/me/', HTTP_AUTHORIZATION=f'Bearer {token}'))
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                for _ in range(options['requests']):
+                    response = view(factory.get('/users/me/', HTTP_AUTHORIZATION=f'Bearer {token}'))
+                    assert response.status_code == 200, response.data
+                elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{label}: {options['requests'] / elapsed:,.0f} req/s, "
+                f"{len(queries) / options['requests']:.2f} queries/request"
+            )
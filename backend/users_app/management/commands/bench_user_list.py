@@ -0,0 +1,76 @@
+import json
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+from backend import loadtest
+from auth_app.clients import get_oauth_client
+from auth_app.models import GoogleCredentials
+from users_app.models import K9User
+from users_app.serializers import UserSerializer
+from users_app.views import UserListView
+
+BENCH_DOMAIN = 'bench-list.k9.invalid'
+
+
+class Command(BaseCommand):
+    help = (
+        "Time walking GET /users/ over N throwaway users and compare with serializing the same "
+        "users through UserSerializer one by one (users_app.tests checks the one query per page)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10_000)
+        parser.add_argument('--page-size', type=int, default=500)
+
+    @loadtest.throwaway_database()
+    def handle(self, *args, **options):
+        users = K9User.objects.bulk_create(
+            K9User(
+                username=f'u{i}@{BENCH_DOMAIN}', email=f'u{i}@{BENCH_DOMAIN}',
+                first_name=f'First{i % 37}', last_name=f'Last{i % 101}', password='!',
+            )
+            for i in range(options['users'])
+        )
+        # Every third user has linked Google credentials.
+        client = get_oauth_client('x', 'x', 'x')
+        GoogleCredentials.objects.bulk_create(
+            GoogleCredentials(
+                user=user, access_token='x', expires_at=timezone.now(), oauth_client=client,
+            )
+            for user in users[::3]
+        )
+        staff = K9User(pk=0, username='staff', is_staff=True)
+        view = UserListView.as_view()
+        factory = APIRequestFactory()
+        seen, pages, cursor = [], 0, None
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            while True:
+                params = {'page_size': options['page_size'], **({'cursor': cursor} if cursor else {})}
+                request = factory.get('/users/', params)
+                force_authenticate(request, user=staff)
+                page = json.loads(b''.join(view(request).streaming_content))
+                pages += 1
+                seen += page['results']
+                cursor = page['next']
+                if cursor is None:
+                    break
+            elapsed = time.perf_counter() - started
+        bench_rows = [row for row in seen if row['email'].endswith(BENCH_DOMAIN)]
+        if len(bench_rows) != options['users']:
+            raise CommandError(f"Listed {len(bench_rows)} of {options['users']} users")
+        if sum(row['has_google_credentials'] for row in bench_rows) != len(users[::3]):
+            raise CommandError("has_google_credentials doesn't match the linked credentials")
+        self.stdout.write(f"keyset list: {pages} pages, {len(queries)} queries, {elapsed * 1000:.0f} ms")
+
+        sample = K9User.objects.filter(email__endswith=BENCH_DOMAIN)[:1000]
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            UserSerializer(sample, many=True).data
+            elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"UserSerializer, 1000 users without the annotation: {len(queries)} queries, {elapsed * 1000:.0f} ms"
+        )
@@ -0,0 +1,72 @@
+import random
+import time
+from django.contrib.admin.sites import site
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+from django.test.utils import CaptureQueriesContext
+from backend import loadtest
+from users_app.models import K9User
+from users_app.search import index_users, matching_entries, typeahead
+
+BENCH_DOMAIN = 'bench-search.k9.invalid'
+FIRST_NAMES = ['olivia', 'liam', 'emma', 'noah', 'ava', 'oliver', 'sophia', 'elijah', 'mia', 'lucas']
+LAST_NAMES = ['smith', 'johnson', 'williams', 'brown', 'jones', 'garcia', 'miller', 'davis', 'rodriguez', 'martinez']
+
+
+class Command(BaseCommand):
+    help = "Compare the indexed client search (typeahead and admin) with the admin's '%term%' scans."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100_000)
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=1)
+
+    @loadtest.throwaway_database()
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        for offset in range(0, options['users'], 10_000):
+            users = K9User.objects.bulk_create(
+                K9User(
+                    username=f'u{i}@{BENCH_DOMAIN}', email=f'u{i}@{BENCH_DOMAIN}', password='!',
+                    first_name=f'{rng.choice(FIRST_NAMES).title()}{i}', last_name=f'{rng.choice(LAST_NAMES).title()}{i % 5000}',
+                    phone_number=f'555-{i:07d}',
+                )
+                for i in range(offset, min(offset + 10_000, options['users']))
+            )
+            index_users(users)
+        # Typeahead-style terms: growing prefixes of names, emails and phone numbers, plus substrings.
+        terms = []
+        for _ in range(options['queries']):
+            i = rng.randrange(options['users'])
+            terms.append(rng.choice([
+                rng.choice(LAST_NAMES)[:rng.randint(2, 5)],
+                f'{rng.choice(FIRST_NAMES)}{i}'[:rng.randint(3, 8)],
+                f'u{i}@',
+                f'555{i:07d}'[:rng.randint(4, 10)],
+                f'{i:07d}'[2:6],  # inside the phone number
+            ]))
+        admin = site._registry[K9User]
+        self.time('admin icontains scan', terms, lambda term: list(
+            K9User.objects.filter(Q(last_name__icontains=term) | Q(email__icontains=term) | Q(phone_number__icontains=term))
+            .order_by('last_name', 'first_name').values_list('pk', flat=True)[:10]
+        ))
+        self.time('admin, search entries', terms, lambda term: list(
+            admin.get_search_results(None, K9User.objects.order_by('last_name', 'first_name'), term)[0]
+            .values_list('pk', flat=True)[:10]
+        ))
+        self.time('typeahead top 10', terms, lambda term: typeahead(term, 10))
+        with connection.cursor() as cursor:
+            sql, params = matching_entries('smi').query.sql_with_params()
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            self.stdout.write("plan for 'smi': " + '; '.join(row[-1] for row in cursor.fetchall()))
+
+    def time(self, label, terms, search):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            hits = sum(len(search(term)) for term in terms)
+            elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"{label:>24}: {elapsed / len(terms) * 1000:7.2f} ms/search, "
+            f"{len(queries) / len(terms):.1f} queries/search, {hits / len(terms):.1f} hits/search"
+        )
@@ -0,0 +1,138 @@
+import os
+from pathlib import Path
+from types import SimpleNamespace
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from backend import loadtest, metrics
+from auth_app.state import SignedStateStore
+from auth_app.stubs import FakeGoogleServer
+from users_app.models import K9User
+from users_app.serializers import K9TokenObtainPairSerializer
+
+PASSWORD = 'Loadtest-password-1'
+# Committed results (`--save-baseline`) that `--baseline` and users_app.tests compare against.
+BASELINE_PATH = Path(__file__).resolve().parents[2] / 'loadtest_baseline.json'
+# URL names, in the order they run; also the labels PerformanceMiddleware records queries under.
+ENDPOINTS = ['sign_up', 'token_obtain_pair', 'token_refresh', 'user_detail', 'google_callback']
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test signup, login, token refresh, /users/me/ and the Google callback (against a "
+        "local fake token endpoint) in a throwaway test database: p50/p95/p99, requests/s and "
+        "queries/request per endpoint. With --baseline, exits non-zero when an endpoint regresses "
+        "past --max-regression."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help="Requests per endpoint.")
+        parser.add_argument('--concurrency', type=int, default=8, help="In-flight requests (client threads).")
+        parser.add_argument('--latency', type=float, default=0.05, help="Fake Google token latency in seconds.")
+        parser.add_argument('--endpoints', default=','.join(ENDPOINTS), help="Comma-separated URL names to run.")
+        parser.add_argument(
+            '--baseline', nargs='?', const=str(BASELINE_PATH),
+            help=f"JSON file of earlier results to compare against (without a value: {BASELINE_PATH.name}).",
+        )
+        parser.add_argument('--save-baseline', help="Write this run's results to this JSON file.")
+        parser.add_argument(
+            '--max-regression', type=float, default=0.25,
+            help="Allowed fractional slowdown in latency/throughput (query counts may not grow at all).",
+        )
+
+    def handle(self, *args, **options):
+        endpoints = options['endpoints'].split(',')
+        unknown = set(endpoints) - set(ENDPOINTS)
+        if unknown:
+            raise CommandError(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+        baseline = loadtest.load_baseline(options['baseline']) if options['baseline'] else None
+
+        os.environ.setdefault('OAUTHLIB_INSECURE_TRANSPORT', '1')
+        # Lets the in-process test clients through ALLOWED_HOSTS.
+        setup_test_environment()
+        try:
+            with loadtest.throwaway_database():
+                results = self.measure(endpoints, options['requests'], options['concurrency'], options['latency'])
+        finally:
+            teardown_test_environment()
+
+        for endpoint, numbers in results.items():
+            self.stdout.write(
+                f"{endpoint:>18}: {numbers['rps']:8,.1f} req/s  p50 {numbers['p50_ms']:7.1f} ms  "
+                f"p95 {numbers['p95_ms']:7.1f} ms  p99 {numbers['p99_ms']:7.1f} ms  "
+                f"{numbers['queries']} queries/req  {numbers['errors']} errors"
+            )
+        if options['save_baseline']:
+            loadtest.save_baseline(options['save_baseline'], results)
+            self.stdout.write(f"Saved baseline to {options['save_baseline']}")
+        if baseline is not None:
+            regressions = loadtest.compare(results, baseline, options['max_regression'])
+            if regressions:
+                raise CommandError("Regressions against the baseline:\n" + "\n".join(regressions))
+            self.stdout.write("No regressions against the baseline.")
+
+    def measure(self, endpoints, requests, concurrency, latency):
+        """Runs `endpoints` against the current database and returns `loadtest.summarize` results by endpoint."""
+        self.user = K9User.objects.create_user(
+            username='loadtest@example.com', email='loadtest@example.com',
+            password=PASSWORD, first_name='Load', last_name='Test',
+        )
+        tokens = K9TokenObtainPairSerializer.get_token(self.user)
+        self.refresh = str(tokens)
+        self.auth_header = f'Bearer {tokens.access_token}'
+        # One valid signed state is enough: the signed store doesn't consume it.
+        self.state = SignedStateStore().issue(SimpleNamespace(user=self.user))
+        with FakeGoogleServer(latency=latency) as server, override_settings(
+            GOOGLE_OAUTH2_TOKEN_URI=server.token_uri,
+            # The fake token server accepts any client; set here so the run doesn't depend on the environment.
+            GOOGLE_OAUTH2_CLIENT_ID='loadtest-client-id',
+            GOOGLE_OAUTH2_CLIENT_SECRET='loadtest-client-secret',
+            GOOGLE_OAUTH_STATE={**settings.GOOGLE_OAUTH_STATE, 'BACKEND': 'signed'},
+            # Every request is timed, so the query counts are exact.
+            METRICS={**settings.METRICS, 'ENABLED': True, 'SAMPLE_RATE': 1.0},
+        ):
+            return {endpoint: self.run_endpoint(endpoint, requests, concurrency) for endpoint in endpoints}
+
+    def run_endpoint(self, endpoint, requests, concurrency):
+        call, expected_status = getattr(self, f'request_{endpoint}')(reverse(endpoint))
+        # One warm-up request (connections, caches) kept out of the numbers.
+        call(-1)
+        metrics.reset()
+        latencies, status_codes, elapsed = loadtest.run_load(call, requests, concurrency)
+        return loadtest.summarize(endpoint, latencies, status_codes, elapsed, expected_status)
+
+    def request_sign_up(self, url):
+        def call(i):
+            email = f'loadtest-{i + 1}@example.com'
+            return Client().post(url, {
+                'email': email, 'password': PASSWORD, 'password2': PASSWORD,
+                'first_name': 'Load', 'last_name': 'Test',
+            }, content_type='application/json').status_code
+        return call, 201
+
+    def request_token_obtain_pair(self, url):
+        def call(i):
+            return Client().post(
+                url, {'email': self.user.email, 'password': PASSWORD}, content_type='application/json',
+            ).status_code
+        return call, 200
+
+    def request_token_refresh(self, url):
+        def call(i):
+            return Client().post(url, {'refresh': self.refresh}, content_type='application/json').status_code
+        return call, 200
+
+    def request_user_detail(self, url):
+        def call(i):
+            return Client().get(url, HTTP_AUTHORIZATION=self.auth_header).status_code
+        return call, 200
+
+    def request_google_callback(self, url):
+        def call(i):
+            return Client().post(
+                url, {'code': 'fake-code', 'state': self.state},
+                content_type='application/json', HTTP_AUTHORIZATION=self.auth_header,
+            ).status_code
+        return call, 200
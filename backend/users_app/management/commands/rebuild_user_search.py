@@ -0,0 +1,25 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from users_app.models import K9User
+from users_app.search import index_users
+
+
+class Command(BaseCommand):
+    help = "Rebuild every user's search entry, e.g. after bulk writes that skipped the save signal."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        users = K9User.objects.order_by('pk').only('pk', 'first_name', 'last_name', 'email', 'phone_number')
+        started = time.perf_counter()
+        total = last_pk = 0
+        # Keyset batches, each upserted in its own short transaction.
+        while batch := list(users.filter(pk__gt=last_pk)[:options['batch_size']]):
+            with transaction.atomic():
+                index_users(batch)
+            total += len(batch)
+            last_pk = batch[-1].pk
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"Indexed {total} users in {elapsed:.2f}s ({total / elapsed if elapsed else 0:,.0f} users/s)")
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:11
+
+import django.db.models.functions.text
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+# Duplicate groups listed in the error; the count covers all of them.
+MAX_REPORTED = 20
+
+
+def check_case_insensitive_duplicates(apps, schema_editor):
+    """Fails with a readable list of the conflicting accounts before the constraint would."""
+    K9User = apps.get_model('users_app', 'K9User')
+    duplicates = list(
+        K9User.objects.using(schema_editor.connection.alias)
+        .annotate(email_lower=Lower('email'))
+        .values('email_lower')
+        .annotate(users=Count('id'))
+        .filter(users__gt=1)
+        .order_by('email_lower')
+        .values_list('email_lower', flat=True)
+    )
+    if not duplicates:
+        return
+    lines = []
+    for email in duplicates[:MAX_REPORTED]:
+        users = (
+            K9User.objects.using(schema_editor.connection.alias)
+            .annotate(email_lower=Lower('email'))
+            .filter(email_lower=email)
+            .order_by('id')
+            .values_list('id', 'email')
+        )
+        lines.append(', '.join(f'{address} (id {user_id})' for user_id, address in users))
+    if len(duplicates) > MAX_REPORTED:
+        lines.append(f'... and {len(duplicates) - MAX_REPORTED} more')
+    raise RuntimeError(
+        f"Can't add users_k9user_email_ci_unique: {len(duplicates)} email address(es) belong to more "
+        "than one user when letter case is ignored. Merge or change these accounts, then migrate again:\n  "
+        + '\n  '.join(lines)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_case_insensitive_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='k9user',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('email'), name='users_k9user_email_ci_unique'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users_app', '0002_k9user_email_ci_unique'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='k9user',
+            index=models.Index(fields=['last_name', 'first_name', 'id'], name='users_k9user_name_order_idx'),
+        ),
+    ]
@@ -0,0 +1,103 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:39
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+FTS_TABLE = 'users_app_usersearch_fts'
+ENTRY_TABLE = 'users_app_usersearchentry'
+BATCH_SIZE = 2000
+
+# SQLite: an FTS5 trigram index over `document`, kept current by triggers. Note that Django
+# rebuilds SQLite tables on most ALTERs, which drops triggers: recreate them if the table changes.
+SQLITE_CREATE = [
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(document, content='{ENTRY_TABLE}', content_rowid='user_id', tokenize='trigram')",
+    f"""CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON {ENTRY_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, document) VALUES (new.user_id, new.document);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON {ENTRY_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, document) VALUES ('delete', old.user_id, old.document);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE ON {ENTRY_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, document) VALUES ('delete', old.user_id, old.document);
+        INSERT INTO {FTS_TABLE}(rowid, document) VALUES (new.user_id, new.document);
+    END""",
+]
+SQLITE_DROP = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+# Postgres: a trigram GIN index, which serves LIKE '%word%' on `document`.
+POSTGRES_CREATE = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX users_usersearch_document_trgm ON {ENTRY_TABLE} USING gin (document gin_trgm_ops)",
+]
+POSTGRES_DROP = ["DROP INDEX IF EXISTS users_usersearch_document_trgm"]
+
+
+def _statements(connection, sqlite, postgres):
+    if connection.vendor == 'sqlite':
+        # The trigram tokenizer needs SQLite 3.34+ (users_app.search checks the same).
+        return sqlite if connection.Database.sqlite_version_info >= (3, 34, 0) else []
+    if connection.vendor == 'postgresql':
+        return postgres
+    return []
+
+
+def create_trigram_index(apps, schema_editor):
+    for sql in _statements(schema_editor.connection, SQLITE_CREATE, POSTGRES_CREATE):
+        schema_editor.execute(sql)
+
+
+def drop_trigram_index(apps, schema_editor):
+    for sql in _statements(schema_editor.connection, SQLITE_DROP, POSTGRES_DROP):
+        schema_editor.execute(sql)
+
+
+def normalize(value):
+    return ' '.join((value or '').lower().split())
+
+
+def backfill(apps, schema_editor):
+    # A frozen copy of users_app.search.entry_for, so later changes there don't alter this migration.
+    K9User = apps.get_model('users_app', 'K9User')
+    UserSearchEntry = apps.get_model('users_app', 'UserSearchEntry')
+    users = K9User.objects.order_by('pk').values_list('pk', 'last_name', 'first_name', 'email', 'phone_number')
+    last_pk = 0
+    while batch := list(users.filter(pk__gt=last_pk)[:BATCH_SIZE]):
+        entries = []
+        for pk, last_name, first_name, email, phone_number in batch:
+            last_name, first_name, email = normalize(last_name), normalize(first_name), normalize(email)
+            phone = ''.join(char for char in phone_number or '' if char.isdigit())
+            entries.append(UserSearchEntry(
+                user_id=pk, last_name=last_name, first_name=first_name, email=email, phone=phone,
+                document=' '.join(part for part in (last_name, first_name, email, phone) if part),
+            ))
+        UserSearchEntry.objects.bulk_create(entries)
+        last_pk = batch[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users_app', '0003_k9user_name_order_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSearchEntry',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_entry', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('last_name', models.CharField(db_index=True, max_length=255)),
+                ('first_name', models.CharField(db_index=True, max_length=255)),
+                ('email', models.CharField(db_index=True, max_length=254)),
+                ('phone', models.CharField(blank=True, db_index=True, max_length=20)),
+                ('document', models.TextField()),
+            ],
+        ),
+        # Index first, so the triggers fill the FTS table during the backfill.
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Lower
 from django.contrib.auth.models import AbstractUser
 
 # Create your models here.
@@ -33,6 +34,19 @@ class K9User(AbstractUser):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['first_name', 'last_name']
 
+    class Meta(AbstractUser.Meta):
+        constraints = [
+            # Case-insensitive email uniqueness, enforced by a functional unique index on LOWER(email).
+            # Signup relies on this (and the unique indexes on email/username) instead of pre-checking.
+            models.UniqueConstraint(Lower('email'), name='users_k9user_email_ci_unique'),
+        ]
+        indexes = [
+            # Keyset pagination order of the staff user list and the admin changelist (see users_app.listing).
+            models.Index(fields=['last_name', 'first_name', 'id'], name='users_k9user_name_order_idx'),
+            # The same order within the admin's is_active filter (K9UserAdmin.list_filter).
+            models.Index(fields=['is_active', 'last_name', 'first_name', 'id'], name='users_k9user_active_name_idx'),
+        ]
+
     def __str__(self):
         return f"{self.get_full_name()}"
     
@@ -42,4 +56,23 @@ class K9User(AbstractUser):
         "password2": "kendr1ck!!",
         "first_name": "Keith",
         "last_name": "Hiamond"
-    }
\ No newline at end of file
+    }
+
+class UserSearchEntry(models.Model):
+    """
+    A user's searchable fields, normalized for indexed lookups (see users_app.search).
+
+    Kept in sync when a K9User is saved. Everything is lowercase and the phone number
+    is digits only, so prefix matches are plain index range scans. `document` joins all
+    of them for substring matching through a trigram index (FTS5 on SQLite, pg_trgm on
+    Postgres; created in migration 0004).
+    """
+    user = models.OneToOneField(K9User, on_delete=models.CASCADE, primary_key=True, related_name='search_entry')
+    last_name = models.CharField(max_length=255, db_index=True)
+    first_name = models.CharField(max_length=255, db_index=True)
+    email = models.CharField(max_length=254, db_index=True)
+    phone = models.CharField(max_length=20, blank=True, db_index=True)
+    document = models.TextField()
+
+    def __str__(self):
+        return self.document
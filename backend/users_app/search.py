@@ -0,0 +1,176 @@
+"""
+Indexed client search over names, email and phone number.
+
+Every K9User has a UserSearchEntry with its fields lowercased (phone as digits
+only), refreshed on save. A term matches a user when each of its words is a
+prefix of one of those columns (index range scans on every backend) or, for
+words of at least 3 characters, a substring of `document` via the trigram index
+migration 0004 creates: FTS5 on SQLite, pg_trgm on Postgres. Other backends
+only get prefix matching.
+
+Bulk writes (bulk_create, queryset.update) skip the save signal; run
+`manage.py rebuild_user_search` after them, or call `index_users`.
+"""
+import sqlite3
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from .models import K9User, UserSearchEntry
+
+# Trigrams can't match anything shorter.
+MIN_SUBSTRING_LENGTH = 3
+
+# K9User fields the entry is built from; saves touching none of them (e.g. last_login) skip reindexing.
+SOURCE_FIELDS = frozenset({'first_name', 'last_name', 'email', 'phone_number'})
+ENTRY_FIELDS = ['last_name', 'first_name', 'email', 'phone', 'document']
+
+# FTS5 table over UserSearchEntry.document (SQLite only; see migration 0004).
+FTS_TABLE = 'users_app_usersearch_fts'
+
+
+def normalize(value):
+    return ' '.join((value or '').lower().split())
+
+
+def digits(value):
+    return ''.join(char for char in value or '' if char.isdigit())
+
+
+def entry_for(user):
+    """Builds the (unsaved) UserSearchEntry for `user`."""
+    last_name, first_name = normalize(user.last_name), normalize(user.first_name)
+    email, phone = normalize(user.email), digits(user.phone_number)
+    return UserSearchEntry(
+        user_id=user.pk,
+        last_name=last_name, first_name=first_name, email=email, phone=phone,
+        document=' '.join(part for part in (last_name, first_name, email, phone) if part),
+    )
+
+
+def index_users(users):
+    """Creates or refreshes the search entries of `users` in one statement."""
+    UserSearchEntry.objects.bulk_create(
+        [entry_for(user) for user in users],
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=ENTRY_FIELDS,
+    )
+
+
+def trigram_backend():
+    """'fts5', 'pg_trgm' or None: how substring matches are served on the current database."""
+    if connection.vendor == 'sqlite':
+        # The trigram tokenizer needs SQLite 3.34+; migration 0004 makes the same check.
+        return 'fts5' if sqlite3.sqlite_version_info >= (3, 34, 0) else None
+    if connection.vendor == 'postgresql':
+        return 'pg_trgm'
+    return None
+
+
+def _prefix(field, word):
+    if connection.vendor == 'sqlite':
+        # SQLite can't use a plain index for LIKE 'x%'; a range over the lowercase column it can.
+        return Q(**{f'{field}__gte': word, f'{field}__lt': word + '\U0010ffff'})
+    # LIKE 'x%', served on Postgres by the *_like pattern index Django adds for db_index.
+    return Q(**{f'{field}__startswith': word})
+
+
+def prefix_q(words):
+    """Every word is a prefix of the last name, first name, email or phone digits."""
+    q = Q()
+    for word in words:
+        word_q = _prefix('last_name', word) | _prefix('first_name', word) | _prefix('email', word)
+        if digits(word):
+            word_q |= _prefix('phone', digits(word))
+        q &= word_q
+    return q
+
+
+def substring_q(words):
+    """Every word occurs in `document`, through the trigram index; None if that's unavailable."""
+    backend = trigram_backend()
+    if backend is None or any(len(word) < MIN_SUBSTRING_LENGTH for word in words):
+        return None
+    if backend == 'fts5':
+        # Each word as a quoted phrase (quotes doubled), all of them required.
+        match = ' AND '.join('"{}"'.format(word.replace('"', '""')) for word in words)
+        return Q(user_id__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match]))
+    q = Q()
+    for word in words:
+        q &= Q(document__contains=word)
+    return q
+
+
+def matching_entries(term):
+    """All UserSearchEntry rows matching `term` by prefix or substring (unordered, unlimited)."""
+    words = normalize(term).split()
+    if not words:
+        return UserSearchEntry.objects.none()
+    q = prefix_q(words)
+    substring = substring_q(words)
+    if substring is not None:
+        q |= substring
+    return UserSearchEntry.objects.filter(q)
+
+
+def _prefix_ids(words, limit):
+    """User ids of the first `limit` prefix matches, by last name, first name, email, phone."""
+    # Each column is read in its own index order and stops after `limit` rows, instead of
+    # collecting and sorting every match (a couple of letters can match a large share of
+    # the table); later columns are only read if earlier ones didn't fill the list. With
+    # several words, the longest one drives the index scan and the rest filter it.
+    driver = max(range(len(words)), key=lambda index: len(words[index]))
+    word = words[driver]
+    rest = prefix_q(words[:driver] + words[driver + 1:])
+    columns = [('last_name', word), ('first_name', word), ('email', word)]
+    if digits(word):
+        columns.append(('phone', digits(word)))
+    ids = []
+    for column, value in columns:
+        entries = UserSearchEntry.objects.filter(_prefix(column, value), rest).order_by(column, 'user_id')
+        for user_id in entries.values_list('user_id', flat=True)[:limit]:
+            if user_id not in ids:
+                ids.append(user_id)
+        if len(ids) >= limit:
+            break
+    return ids[:limit]
+
+
+def typeahead(term, limit):
+    """The top `limit` users for a typeahead box: prefix matches first, then substring matches.
+
+    Prefix matches are ordered by the column they matched (last name, first name, email,
+    phone); substring matches, fetched only if the prefixes didn't fill the list, by name.
+    Every query reads about `limit` rows from an index, however common the term.
+
+    Returns:
+        list[dict]: `id`, `email`, `first_name`, `last_name`, `phone_number` per user.
+    """
+    words = normalize(term).split()
+    if not words:
+        return []
+    ids = _prefix_ids(words, limit)
+    substring_ids = []
+    substring = substring_q(words)
+    if len(ids) < limit and substring is not None:
+        # Unordered, so the trigram index can stop at the first matches.
+        substring_ids = list(
+            UserSearchEntry.objects.filter(substring).exclude(user_id__in=ids)
+            .values_list('user_id', flat=True)[:limit - len(ids)]
+        )
+    rows = K9User.objects.filter(pk__in=ids + substring_ids).values('id', 'email', 'first_name', 'last_name', 'phone_number')
+    by_id = {row['id']: row for row in rows}
+    substring_rows = sorted(
+        (by_id[user_id] for user_id in substring_ids if user_id in by_id),
+        key=lambda row: (row['last_name'].lower(), row['first_name'].lower()),
+    )
+    return [by_id[user_id] for user_id in ids if user_id in by_id] + substring_rows
+
+
+@receiver(post_save, sender=K9User)
+def _index_user(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not SOURCE_FIELDS.intersection(update_fields):
+        return
+    index_users([instance])
@@ -1,7 +1,31 @@
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.password_validation import validate_password
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.db import IntegrityError, transaction
+from auth_app.models import GoogleCredentials
 from .models import K9User
 
+EMAIL_IN_USE = "Email already in use."
+
+
+def is_duplicate_email(error):
+    """Whether an IntegrityError from inserting a K9User is a taken email (or username, which signup sets to it).
+
+    Postgres (psycopg) names the violated constraint; SQLite only mentions it, or the
+    column, in the message.
+    """
+    table = K9User._meta.db_table
+    constraint = getattr(getattr(error.__cause__, 'diag', None), 'constraint_name', None)
+    text = constraint or str(error)
+    markers = (
+        'users_k9user_email_ci_unique',  # K9User.Meta.constraints
+        f'{table}.email', f'{table}.username',  # SQLite: "UNIQUE constraint failed: <table>.<column>"
+        f'{table}_email_', f'{table}_username_',  # Postgres' names for the unique=True columns
+    )
+    return any(marker in text for marker in markers)
+
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=True, validators=[validate_password])
     password2 = serializers.CharField(write_only=True, required=True, label="Confirm Password")
@@ -9,10 +33,13 @@ class RegisterSerializer(serializers.ModelSerializer):
     class Meta:
         model = K9User
         fields = ('password', 'password2', 'email', 'username', 'first_name', 'last_name')
+        # No UniqueValidators on email/username: each would cost a SELECT per signup and
+        # still race with concurrent signups. The DB unique constraints decide instead (see create).
         extra_kwargs = {
             'first_name': {'required': True},
             'last_name': {'required': True},
-            'email': {'required': True}
+            'email': {'required': True, 'validators': []},
+            'username': {'validators': [UnicodeUsernameValidator()]}
         }
 
     def validate(self, attrs):
@@ -20,21 +47,28 @@ class RegisterSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError({
                 "password": "Password fields do not match."
             })
-        # Basic email validation (check if exists)
-        if K9User.objects.filter(email=attrs['email']).exists():
-            raise serializers.ValidationError({"email": "Email already in use."})
-        
         return attrs
     
     def create(self, validated_data):
-        user = K9User.objects.create(
-            username = validated_data['email'],
-            email = validated_data['email'],
-            first_name = validated_data['first_name'],
-            last_name = validated_data['last_name']
-        )
-        user.set_password(validated_data['password'])
-        user.save()
+        # Hashed before the transaction: on SQLite, transactions take the write lock at BEGIN
+        # (IMMEDIATE), so hashing inside one would queue every other signup behind the hasher.
+        # What's left is a single INSERT, normalized the way create_user does it.
+        # A duplicate email (in any letter case) is rejected by the DB unique constraints;
+        # the savepoint keeps an outer transaction usable after the IntegrityError.
+        password = make_password(validated_data['password'])
+        try:
+            with transaction.atomic():
+                user = K9User.objects.create(
+                    username = K9User.normalize_username(validated_data['email']),
+                    email = K9User.objects.normalize_email(validated_data['email']),
+                    password = password,
+                    first_name = validated_data['first_name'],
+                    last_name = validated_data['last_name']
+                )
+        except IntegrityError as e:
+            if not is_duplicate_email(e):
+                raise
+            raise serializers.ValidationError({"email": [EMAIL_IN_USE]})
         return user
     
 class UserSerializer(serializers.ModelSerializer):
@@ -45,5 +79,43 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ('id','username', 'email', 'first_name', 'last_name', 'has_google_credentials')
 
     def get_has_google_credentials(self, obj):
-        # Check if related GoogleCredentials exist
-        return hasattr(obj, 'google_credentials') and obj.google_credentials is not None
\ No newline at end of file
+        # Stateless requests (ClaimsUser) and querysets annotated with an Exists()
+        # (see users_app.listing) carry the answer already, so no query is needed
+        cached = getattr(obj, 'has_google_credentials', None)
+        if cached is not None:
+            return cached
+        # Reuse the reverse one-to-one if it was already loaded (e.g. select_related)
+        if 'google_credentials' in obj._state.fields_cache:
+            return obj._state.fields_cache['google_credentials'] is not None
+        # Otherwise one cheap EXISTS instead of loading the row and swallowing DoesNotExist
+        return GoogleCredentials.objects.filter(user=obj).exists()
+
+class K9TokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    Login serializer that embeds the profile fields UserSerializer needs into the tokens,
+    so read-only endpoints can answer from the claims alone (see users_app.authentication).
+    """
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token['username'] = user.username
+        token['email'] = user.email
+        token['first_name'] = user.first_name
+        token['last_name'] = user.last_name
+        # Snapshot only; StatelessJWTAuthentication re-checks it through the user state cache
+        token['has_google_credentials'] = GoogleCredentials.objects.filter(user=user).exists()
+        return token
+
+
+class ClientImportSerializer(serializers.Serializer):
+    """
+    One row of a bulk client import (see users_app.imports). Validates shape only;
+    uniqueness is checked per chunk with one query, not per row.
+    """
+    # The email is also the username, whose column is shorter than email's 254.
+    email = serializers.EmailField(max_length=K9User._meta.get_field('username').max_length)
+    first_name = serializers.CharField(max_length=255)
+    last_name = serializers.CharField(max_length=255)
+    phone_number = serializers.CharField(max_length=20, required=False, allow_blank=True)
+    password = serializers.CharField(required=False, allow_blank=True, write_only=True)
@@ -1,3 +1,411 @@
-from django.test import TestCase
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from auth_app.clients import get_oauth_client
+from auth_app.models import GoogleCredentials
+from backend import loadtest, metrics
+from backend.caching import CachedLookup
+from . import search
+from .admin import K9UserAdmin
+from .authentication import StatelessJWTAuthentication
+from .changelist import CURSOR_VAR
+from .exports import stream_csv, stream_ndjson
+from .management.commands import loadtest_auth_endpoints
+from .listing import KEYSET_ORDER
+from .models import K9User, UserSearchEntry
+from .serializers import EMAIL_IN_USE, ClientImportSerializer, K9TokenObtainPairSerializer, is_duplicate_email
 
-# Create your tests here.
+PASSWORD = 'Test-password-1'
+SIGNUP_THREADS = 8
+
+
+class StatelessJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        self.user = K9User.objects.create_user(
+            username='staff@example.com', email='staff@example.com', password='x',
+            first_name='Staff', last_name='Member', is_staff=True, is_superuser=True,
+        )
+        self.token = AccessToken(str(K9TokenObtainPairSerializer.get_token(self.user).access_token))
+
+    def test_permission_flags_are_not_token_claims(self):
+        self.assertNotIn('is_staff', self.token.payload)
+        self.assertNotIn('is_superuser', self.token.payload)
+
+    def test_demotion_applies_to_issued_tokens(self):
+        user = StatelessJWTAuthentication().get_user(self.token)
+        self.assertTrue(user.is_staff)
+        self.assertTrue(user.is_superuser)
+
+        self.user.is_staff = self.user.is_superuser = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        user = StatelessJWTAuthentication().get_user(self.token)
+        self.assertFalse(user.is_staff)
+        self.assertFalse(user.is_superuser)
+
+
+class UserListTests(TestCase):
+    def setUp(self):
+        users = K9User.objects.bulk_create(
+            K9User(username=f'u{i}@example.com', email=f'u{i}@example.com', first_name=f'First{i}', last_name=f'Last{i % 7}')
+            for i in range(25)
+        )
+        # Every third user has linked Google credentials.
+        client = get_oauth_client('x', 'x', 'x')
+        GoogleCredentials.objects.bulk_create(
+            GoogleCredentials(user=user, access_token='x', expires_at=timezone.now(), oauth_client=client)
+            for user in users[::3]
+        )
+        self.linked = {user.email for user in users[::3]}
+        self.client = APIClient()
+        self.client.force_authenticate(K9User(pk=0, username='staff', is_staff=True))
+
+    def test_one_query_per_page(self):
+        rows, cursor = [], None
+        while True:
+            with self.assertNumQueries(1):
+                response = self.client.get(reverse('user_list'), {'page_size': 10, **({'cursor': cursor} if cursor else {})})
+                page = json.loads(b''.join(response.streaming_content))
+            rows += page['results']
+            cursor = page['next']
+            if cursor is None:
+                break
+        self.assertEqual(len(rows), 25)
+        self.assertEqual({row['email'] for row in rows if row['has_google_credentials']}, self.linked)
+
+
+@override_settings(ADMIN_CHANGELIST={'COUNT_CACHE_SECONDS': 60, 'ESTIMATE_ABOVE': 100_000, 'OFFSET_PAGES': 2})
+class AdminChangeListTests(TestCase):
+    def setUp(self):
+        # Counts are cached by SQL, which is the same across tests.
+        cache.clear()
+        self.enterContext(mock.patch.object(K9UserAdmin, 'list_per_page', 3))
+        admin = K9User.objects.create_superuser(
+            username='admin@example.com', email='admin@example.com', password='x', first_name='Ad', last_name='Min',
+        )
+        # Repeated names, so pages break between users sharing a (last_name, first_name).
+        K9User.objects.bulk_create(
+            K9User(
+                username=f'c{i}@example.com', email=f'c{i}@example.com', first_name=f'First{i % 2}',
+                last_name=f'Last{i % 3}', is_active=bool(i % 4),
+            )
+            for i in range(20)
+        )
+        self.client.force_login(admin)
+        self.url = reverse('admin:users_app_k9user_changelist')
+
+    def walk(self, query):
+        """Follows the changelist's next links from `query`, returning the ids listed and the cursor pages seen."""
+        ids, cursor_pages = [], 0
+        while query is not None:
+            response = self.client.get(self.url + query)
+            self.assertEqual(response.status_code, 200)
+            changelist = response.context['cl']
+            ids += [user.pk for user in changelist.result_list]
+            cursor_pages += changelist.on_cursor_page
+            query = changelist.next_query_string
+        return ids, cursor_pages
+
+    def test_walks_every_page_with_cursors(self):
+        for query, users in (('?', K9User.objects.all()), ('?is_active__exact=1', K9User.objects.filter(is_active=True))):
+            with self.subTest(query=query):
+                ids, cursor_pages = self.walk(query)
+                self.assertEqual(ids, list(users.order_by(*KEYSET_ORDER).values_list('pk', flat=True)))
+                self.assertGreater(cursor_pages, 0)
+
+    def test_cursor_past_the_numbered_pages(self):
+        response = self.client.get(self.url, {'p': 2})
+        changelist = response.context['cl']
+        self.assertEqual([number for number, _, _ in changelist.page_links], [1, 2])
+        self.assertIn(f'{CURSOR_VAR}=', changelist.next_query_string)
+        self.assertNotIn('p=', changelist.next_query_string)
+
+    def test_invalid_cursor_redirects(self):
+        response = self.client.get(self.url, {CURSOR_VAR: 'not-a-cursor'})
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response['Location'].endswith('?e=1'))
+
+    def test_other_sort_orders_use_numbered_pages(self):
+        response = self.client.get(self.url, {'o': '3', CURSOR_VAR: 'ignored'})
+        changelist = response.context['cl']
+        self.assertFalse(changelist.keyset)
+        self.assertIsNone(changelist.next_cursor)
+        self.assertEqual(changelist.result_count, 21)
+
+
+@override_settings(METRICS={'ENABLED': True, 'SAMPLE_RATE': 1.0, 'TOKEN': None})
+class PerformanceMiddlewareTests(TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+        K9User.objects.bulk_create(
+            K9User(username=f'u{i}@example.com', email=f'u{i}@example.com', first_name='First', last_name=f'Last{i}')
+            for i in range(5)
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(K9User(pk=0, username='staff', is_staff=True))
+
+    def test_streaming_response_is_timed_until_closed(self):
+        response = self.client.get(reverse('user_list'))
+        self.assertTrue(response.streaming)
+        # The rows are only read while the body is iterated.
+        self.assertEqual(metrics.db_queries.totals('user_list'), (0, 0))
+        self.assertEqual(len(json.loads(b''.join(response.streaming_content))['results']), 5)
+        self.assertEqual(metrics.db_queries.totals('user_list'), (1, 1))
+        self.assertEqual(metrics.request_seconds.totals('user_list')[1], 1)
+        self.assertIn('k9_requests_total{view="user_list",status="200"} 1', metrics.render())
+
+    def test_regular_response(self):
+        response = self.client.get(reverse('user_search'), {'q': 'Last1'})
+        self.assertEqual(response.status_code, 200)
+        queries, count = metrics.db_queries.totals('user_search')
+        self.assertEqual(count, 1)
+        self.assertGreater(queries, 0)
+
+    def test_unsampled_requests_are_only_counted(self):
+        with override_settings(METRICS={'ENABLED': True, 'SAMPLE_RATE': 0.0, 'TOKEN': None}):
+            b''.join(self.client.get(reverse('user_list')).streaming_content)
+        self.assertEqual(metrics.db_queries.totals('user_list'), (0, 0))
+        self.assertIn('k9_requests_total{view="user_list",status="200"} 1', metrics.render())
+
+
+class MetricsViewTests(SimpleTestCase):
+    def get(self, **extra):
+        return self.client.get(reverse('metrics'), **extra)
+
+    @override_settings(METRICS={'ENABLED': True, 'SAMPLE_RATE': 1.0, 'TOKEN': 'scrape-token'})
+    def test_token(self):
+        self.assertEqual(self.get().status_code, 403)
+        self.assertEqual(self.get(HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        response = self.get(HTTP_AUTHORIZATION='Bearer scrape-token')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('# TYPE k9_requests_total counter', response.content.decode())
+
+    @override_settings(METRICS={'ENABLED': True, 'SAMPLE_RATE': 1.0, 'TOKEN': None}, INTERNAL_IPS=['127.0.0.1'])
+    def test_without_a_token_only_debug_serves_internal_ips(self):
+        with override_settings(DEBUG=False):
+            self.assertEqual(self.get().status_code, 403)
+        with override_settings(DEBUG=True):
+            self.assertEqual(self.get().status_code, 200)
+            self.assertEqual(self.get(REMOTE_ADDR='10.0.0.1').status_code, 403)
+
+
+class UserSearchTests(TestCase):
+    def setUp(self):
+        self.users = {
+            key: K9User.objects.create_user(
+                username=email, email=email, password='x', first_name=first_name, last_name=last_name, phone_number=phone,
+            )
+            for key, first_name, last_name, email, phone in (
+                ('smithers', 'Waylon', 'Smithers', 'waylon@example.com', ''),
+                ('smith', 'Ann', 'Smith', 'ann@example.com', '(555) 010-0123'),
+                ('goldsmith', 'Anna', 'Goldsmith', 'anna@example.com', ''),
+                ('jones', 'Smitty', 'Jones', 'jones@example.com', '555 999 0000'),
+            )
+        }
+
+    def found(self, term, limit=10):
+        ids = {user.pk: key for key, user in self.users.items()}
+        return [ids[row['id']] for row in search.typeahead(term, limit)]
+
+    def test_prefix_matches_come_before_substring_matches(self):
+        # Last name prefixes (in name order), then first names; substrings need the trigram index.
+        expected = ['smith', 'smithers', 'jones']
+        if search.trigram_backend():
+            expected.append('goldsmith')
+        self.assertEqual(self.found('Smit'), expected)
+        self.assertEqual(self.found('smit', limit=2), ['smith', 'smithers'])
+
+    def test_every_word_must_match(self):
+        self.assertEqual(self.found('waylon smi'), ['smithers'])
+        self.assertEqual(self.found('smi waylon'), ['smithers'])
+        # Words of the same length: the first drives the scan, the other still filters it.
+        self.assertEqual(self.found('way smi'), ['smithers'])
+        self.assertEqual(self.found('smithers smithers'), ['smithers'])
+        self.assertEqual(self.found('ann zzz'), [])
+
+    def test_phone_digits(self):
+        self.assertEqual(self.found('555-010'), ['smith'])
+        self.assertEqual(self.found('555'), ['smith', 'jones'])
+        self.assertEqual(search.entry_for(self.users['smith']).phone, '5550100123')
+
+    def test_reindexes_on_save(self):
+        user = self.users['smithers']
+        user.last_name = 'Burns'
+        user.save()
+        self.assertEqual(UserSearchEntry.objects.get(user=user).last_name, 'burns')
+        self.assertEqual(self.found('burns'), ['smithers'])
+        self.assertNotIn('smithers', self.found('smithers'))
+
+    def test_saves_of_other_fields_skip_reindexing(self):
+        user = self.users['smith']
+        user.last_login = timezone.now()
+        with mock.patch.object(search, 'index_users') as index_users:
+            user.save(update_fields=['last_login'])
+            index_users.assert_not_called()
+            user.save(update_fields=['last_name', 'last_login'])
+            index_users.assert_called_once_with([user])
+
+    def test_fts_table_follows_the_entries(self):
+        if search.trigram_backend() != 'fts5':
+            self.skipTest("Needs the SQLite FTS5 trigram index")
+
+        def fts_matches(text):
+            with connection.cursor() as cursor:
+                cursor.execute(f'SELECT rowid FROM {search.FTS_TABLE} WHERE {search.FTS_TABLE} MATCH %s', [f'"{text}"'])
+                return [row[0] for row in cursor.fetchall()]
+
+        user = self.users['goldsmith']
+        self.assertEqual(fts_matches('oldsmi'), [user.pk])
+        user.last_name = 'Silverton'
+        user.save()
+        self.assertEqual(fts_matches('oldsmi'), [])
+        self.assertEqual(fts_matches('lverto'), [user.pk])
+        user.delete()
+        self.assertEqual(fts_matches('lverto'), [])
+
+
+class ExportTests(SimpleTestCase):
+    ROW = (1, '=HYPERLINK("http://example.com")', '+Eve', 'eve@example.com', '-555', True, False)
+
+    def test_csv_escapes_formula_cells(self):
+        lines = ''.join(stream_csv(iter([self.ROW]), chunk_size=10)).splitlines()
+        self.assertEqual(lines[1], '1,"\'=HYPERLINK(""http://example.com"")",\'+Eve,eve@example.com,\'-555,True,False')
+
+    def test_ndjson_keeps_values_as_they_are(self):
+        entry = json.loads(''.join(stream_ndjson(iter([self.ROW]), chunk_size=10)))
+        self.assertEqual(entry['last_name'], self.ROW[1])
+
+
+class ClientImportSerializerTests(SimpleTestCase):
+    def test_email_must_fit_the_username_column(self):
+        domain = '@example.com'
+        for length, valid in ((150, True), (151, False)):
+            row = {'email': 'a' * (length - len(domain)) + domain, 'first_name': 'Long', 'last_name': 'Address'}
+            with self.subTest(length=length):
+                serializer = ClientImportSerializer(data=row)
+                self.assertEqual(serializer.is_valid(), valid, serializer.errors)
+
+
+class CachedLookupTests(SimpleTestCase):
+    def setUp(self):
+        self.release = threading.Event()
+        self.loading = threading.Event()
+        self.loads = []
+
+        def loader(part):
+            self.loads.append(part)
+            if part == 'slow':
+                self.loading.set()
+                self.release.wait(5)
+            return part.upper()
+
+        self.lookup = CachedLookup('tests-lookup', loader, timeout=60)
+        self.addCleanup(self.release.set)
+        for part in ('slow', 'fast'):
+            self.addCleanup(self.lookup.invalidate, part)
+
+    def test_concurrent_misses_load_once(self):
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = [pool.submit(self.lookup.get, 'slow') for _ in range(4)]
+            self.assertTrue(self.loading.wait(5))
+            self.release.set()
+            self.assertEqual([result.result(5) for result in results], ['SLOW'] * 4)
+        self.assertEqual(self.loads, ['slow'])
+
+    def test_other_keys_do_not_wait_for_a_slow_load(self):
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            slow = pool.submit(self.lookup.get, 'slow')
+            self.assertTrue(self.loading.wait(5))
+            fast = pool.submit(self.lookup.get, 'fast')
+            self.assertEqual(fast.result(2), 'FAST')
+            self.release.set()
+            self.assertEqual(slow.result(5), 'SLOW')
+
+
+class ConcurrentSignupTests(TransactionTestCase):
+    """Duplicate signups racing each other: the DB constraints must let exactly one through."""
+
+    def test_parallel_duplicate_signups(self):
+        # The same address in different letter cases, so the LOWER(email) constraint is exercised too.
+        emails = [f'{"Dup" if i % 2 else "dup"}@example.com' for i in range(SIGNUP_THREADS)]
+        barrier = threading.Barrier(SIGNUP_THREADS)
+
+        def sign_up(email):
+            try:
+                barrier.wait()
+                return APIClient().post(reverse('sign_up'), {
+                    'email': email, 'password': PASSWORD, 'password2': PASSWORD,
+                    'first_name': 'Dee', 'last_name': 'Uplicate',
+                }, format='json')
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=SIGNUP_THREADS) as pool:
+            responses = list(pool.map(sign_up, emails))
+
+        statuses = sorted(response.status_code for response in responses)
+        self.assertEqual(statuses, [201] + [400] * (SIGNUP_THREADS - 1), [response.data for response in responses])
+        for response in responses:
+            if response.status_code == 400:
+                self.assertEqual(response.data, {'email': [EMAIL_IN_USE]})
+        self.assertEqual(K9User.objects.filter(email__iexact='dup@example.com').count(), 1)
+
+
+class SignupTests(TestCase):
+    def test_signed_up_user_can_log_in(self):
+        response = APIClient().post(reverse('sign_up'), {
+            'email': 'New.Client@Example.COM', 'password': PASSWORD, 'password2': PASSWORD,
+            'first_name': 'New', 'last_name': 'Client',
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        user = K9User.objects.get()
+        # Normalized like create_user: the domain is lowercased, the username is the address as given.
+        self.assertEqual((user.email, user.username), ('New.Client@example.com', 'New.Client@Example.COM'))
+        self.assertTrue(user.check_password(PASSWORD))
+
+
+class DuplicateEmailErrorTests(TestCase):
+    def setUp(self):
+        K9User.objects.create_user(username='taken@example.com', email='taken@example.com', password='x')
+
+    def integrity_error(self, **fields):
+        try:
+            with transaction.atomic():
+                K9User.objects.create(**fields)
+        except IntegrityError as e:
+            return e
+        self.fail("No IntegrityError")
+
+    def test_email_and_username_conflicts(self):
+        self.assertTrue(is_duplicate_email(self.integrity_error(username='other@example.com', email='TAKEN@example.com')))
+        self.assertTrue(is_duplicate_email(self.integrity_error(username='taken@example.com', email='other@example.com')))
+
+    def test_other_integrity_errors(self):
+        self.assertFalse(is_duplicate_email(self.integrity_error(username='new@example.com', email='new@example.com', first_name=None)))
+
+
+class AuthEndpointsLoadTests(TransactionTestCase):
+    """A short `loadtest_auth_endpoints` run checked against the committed baseline.
+
+    Only errors and queries/request are compared: timings depend on the machine, so
+    they're gated by `manage.py loadtest_auth_endpoints --baseline` where it's stable.
+    """
+
+    def test_no_errors_or_extra_queries_against_the_baseline(self):
+        baseline = loadtest.load_baseline(loadtest_auth_endpoints.BASELINE_PATH)
+        with mock.patch.dict(os.environ, {'OAUTHLIB_INSECURE_TRANSPORT': '1'}):
+            results = loadtest_auth_endpoints.Command().measure(
+                loadtest_auth_endpoints.ENDPOINTS, requests=10, concurrency=4, latency=0,
+            )
+        queries_only = {endpoint: {'queries': numbers['queries']} for endpoint, numbers in baseline.items()}
+        self.assertEqual(loadtest.compare(results, queries_only, max_regression=0), [])
@@ -1,6 +1,6 @@
 from django.urls import path
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
-from .views import RegisterView, UserDetailView
+from .views import RegisterView, UserDetailView, UserExportView, UserListView, UserSearchView
 # from .views import AdminUserCreate
 
 urlpatterns = [
@@ -10,5 +10,8 @@ urlpatterns = [
     path('signup/', RegisterView.as_view(), name="sign_up"),
     path('login/', TokenObtainPairView.as_view(), name="token_obtain_pair"),
     path('login/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
-    path('me/', UserDetailView.as_view(), name='user_detail')
+    path('me/', UserDetailView.as_view(), name='user_detail'),
+    path('export/', UserExportView.as_view(), name='user_export'),
+    path('search/', UserSearchView.as_view(), name='user_search'),
+    path('', UserListView.as_view(), name='user_list'),
 ]
\ No newline at end of file
@@ -1,8 +1,15 @@
-from rest_framework import permissions, status
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework import permissions, serializers, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 
+from .authentication import read_only_authentication_classes
+from .exports import CONTENT_TYPES, stream_export
+from .listing import InvalidCursor, decode_cursor, stream_page
+from .lookups import user_profile
 from .models import K9User
+from .search import typeahead
 from .serializers import RegisterSerializer, UserSerializer
 
 class RegisterView(APIView):
@@ -17,7 +24,6 @@ class RegisterView(APIView):
     def post(self, request):
         user_data = request.data.copy()
         user_data['username'] = user_data['email']
-        print(f"{user_data}")
         # 1. Initialize the serializer with request data
         serializer = RegisterSerializer(data=user_data)
 
@@ -28,6 +34,9 @@ class RegisterView(APIView):
         # 3. If validation is successful, save the new user.
         try:
             user = serializer.save()
+        except serializers.ValidationError:
+            # e.g. the email was taken by a concurrent signup; DRF turns this into a 400
+            raise
         except Exception as e:
             return Response({
                 "error": "An error occurred during registration.",
@@ -41,18 +50,100 @@ class RegisterView(APIView):
 class UserDetailView(APIView):
     """
     API view to retrieve the details of the currently authenticated user.
+    With STATELESS_JWT_AUTH, authentication doesn't load the user row (see
+    users_app.authentication) and the profile comes from the shared cache, so a warm
+    request costs no queries.
     """
+    authentication_classes = read_only_authentication_classes()
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
         """
         Handles GET requests and returns the authenticated user's data.
+
+        The serialized profile is read through the shared cache (see users_app.lookups),
+        which K9User/GoogleCredentials saves and deletes invalidate.
         """
-        user = request.user
+        data = user_profile.get(request.user.pk)
+        if data is None:
+            # Deleted since the token was issued and before the state cache noticed.
+            return Response({"detail": "User not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response(data, status=status.HTTP_200_OK)
+
+
+class UserListView(APIView):
+    """
+    Staff-only listing of every user, ordered like the admin (last name, first name).
+
+    Uses keyset pagination: pass the `next` value of a page back as `?cursor=` to get
+    the following one. Unlike offset pagination, every page costs the same single
+    indexed query however deep into the list it is. `page_size` is optional and capped
+    at USER_LIST['MAX_PAGE_SIZE'].
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        config = settings.USER_LIST
+        try:
+            page_size = min(int(request.query_params.get('page_size', config['PAGE_SIZE'])), config['MAX_PAGE_SIZE'])
+            if page_size < 1:
+                raise ValueError
+        except ValueError:
+            return Response({"page_size": "Must be a positive integer."}, status=status.HTTP_400_BAD_REQUEST)
+
+        cursor = request.query_params.get('cursor')
+        try:
+            after = decode_cursor(cursor) if cursor else None
+        except InvalidCursor:
+            return Response({"cursor": "Invalid cursor."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Rows are written to the client as they're read from the DB.
+        return StreamingHttpResponse(stream_page(after, page_size), content_type='application/json')
 
-        serializer = UserSerializer(user)
 
-        return Response(serializer.data, status=status.HTTP_200_OK)
+class UserExportView(APIView):
+    """
+    Staff-only export of every user as NDJSON (default) or CSV (`?output=csv`).
+
+    The response is streamed straight from a DB cursor (see users_app.exports), so
+    memory stays flat however many users there are. Columns: id, last_name, first_name,
+    email, phone_number, is_active, has_google_credentials.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        # Not `?format=`: DRF reserves that for picking a renderer.
+        fmt = request.query_params.get('output', 'ndjson')
+        if fmt not in CONTENT_TYPES:
+            return Response({"output": f"Must be one of: {', '.join(CONTENT_TYPES)}."}, status=status.HTTP_400_BAD_REQUEST)
+        response = StreamingHttpResponse(
+            stream_export(fmt, settings.USER_LIST['EXPORT_CHUNK_SIZE']), content_type=CONTENT_TYPES[fmt],
+        )
+        response['Content-Disposition'] = f'attachment; filename="clients.{fmt}"'
+        return response
+
+
+class UserSearchView(APIView):
+    """
+    Staff-only typeahead search over clients: `?q=` matched against last/first name,
+    email and phone digits; `?limit=` (default USER_SEARCH['LIMIT']) caps the results.
+
+    Prefix matches come first, then substring matches (see users_app.search); both are
+    index lookups, so each keystroke costs a few milliseconds even on large tables.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        config = settings.USER_SEARCH
+        try:
+            limit = min(int(request.query_params.get('limit', config['LIMIT'])), config['MAX_LIMIT'])
+            if limit < 1:
+                raise ValueError
+        except ValueError:
+            return Response({"limit": "Must be a positive integer."}, status=status.HTTP_400_BAD_REQUEST)
+        query = request.query_params.get('q', '')[:config['MAX_TERM_LENGTH']]
+        return Response({"results": typeahead(query, limit)}, status=status.HTTP_200_OK)
 
 
 
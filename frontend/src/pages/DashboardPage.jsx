@@ -81,8 +81,10 @@ function DashboardPage() {
              console.log("Fetching calendar events...");
              const response = await api.get('/calendar/events/');
              console.log("Events received:", response.data);
-             setCalendarEvents(response.data || []);
-             setGoogleStatus(prev => ({ ...prev, message: `Workspaceed ${response.data?.length || 0} events.` }));
+             // Paginated: { results: [...], next: cursor|null }; the first page is enough here.
+             const events = response.data?.results || [];
+             setCalendarEvents(events);
+             setGoogleStatus(prev => ({ ...prev, message: `Workspaceed ${events.length} events.` }));
          } catch (error) {
               console.error("Failed to fetch calendar events:", error.response?.data || error.message);
               let errorMsg = "Failed to fetch calendar events.";